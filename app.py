@@ -1,22 +1,65 @@
-from flask import Flask, render_template, request, jsonify, session, send_from_directory
-from stock_script_generator import StockScriptGenerator, StockDataError
+from flask import Flask, Response, render_template, request, jsonify, session, send_from_directory, send_file, make_response, stream_with_context
+from stock_script_generator import StockScriptGenerator, StockDataError, PERIOD_DAYS
+from database import get_generations_for_symbol, get_generation_version, search_generations
+from circuit_breaker import all_health
+from prefetch import start_prefetch
+from retention import start_retention
+from quote_feed import start_quote_feed
+import quote_feed
+from profiling import run_profiled, list_profiles, profile_file
+from downsample import downsample_ohlcv
+from deadline import Deadline
+from export import EXPORT_FORMATS, date_bounds, export_generations
 import os
+import gzip
 import json
 from datetime import datetime
 import io
+import numpy as np
 import sys
 from contextlib import redirect_stdout
 from dotenv import load_dotenv
 from flask_cors import CORS
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
+# Static files go through serve_static rather than Flask's built-in route
+app = Flask(__name__, static_folder=None)
 app.secret_key = os.urandom(24)
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 CORS(app)
 
+# Responses smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_MIMETYPES = {'application/json', 'text/html'}
+STATIC_DIR = os.path.join(app.root_path, 'static')
+# Column order and dtypes of binary /api/series payloads (little-endian, column after column)
+SERIES_BINARY_LAYOUT = (('t', '<u4'), ('o', '<f4'), ('h', '<f4'), ('l', '<f4'), ('c', '<f4'), ('v', '<f4'))
+
+@app.after_request
+def compress_response(response):
+    """Brotli- or gzip-compress large JSON and HTML responses the client accepts."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or response.mimetype not in COMPRESS_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if brotli is not None and request.accept_encodings['br']:
+        response.set_data(brotli.compress(data, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif request.accept_encodings['gzip']:
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
 class LogCapture:
     def __init__(self):
         self.log_buffer = io.StringIO()
@@ -47,11 +90,15 @@ class LogCapture:
 
 @app.route('/')
 def index():
-    return render_template('index.html', logs=[])
+    response = make_response(render_template('index.html', logs=[]))
+    response.add_etag(weak=True)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/static/<path:path>')
 def serve_static(path):
-    return send_from_directory('static', path)
+    # Revalidated with an ETag, so an unchanged file costs a 304
+    return send_from_directory(STATIC_DIR, path)
 
 @app.route('/search-stocks')
 def search_stocks():
@@ -92,6 +139,15 @@ def generate():
 
         symbol = data.get('symbol', '').strip().upper()
         period = data.get('period', '1mo')
+        # Optional list of periods to generate together from one data fetch
+        periods = data.get('periods') or []
+        # Optional sectioned generation; defaults to SCRIPT_SECTIONED
+        sectioned = data.get('sectioned')
+        # Optional latency budget in seconds; defaults to GENERATE_DEADLINE_SECONDS
+        deadline_seconds = data.get('deadline_seconds') or os.getenv('GENERATE_DEADLINE_SECONDS')
+        # Opt-in profiling via ?profile=1 or an X-Profile: 1 header
+        profile_requested = (request.args.get('profile', '').lower() in ('1', 'true')
+                             or request.headers.get('X-Profile', '').lower() in ('1', 'true'))
         
         if not symbol:
             return jsonify({
@@ -100,47 +156,50 @@ def generate():
             }), 400
 
         valid_periods = ['1mo', '3mo', '6mo', '1y']
-        if period not in valid_periods:
+        if period not in valid_periods or any(p not in valid_periods for p in periods):
             return jsonify({
                 'success': False,
                 'error': f'Invalid period. Must be one of: {", ".join(valid_periods)}'
             }), 400
             
+        try:
+            deadline = Deadline(float(deadline_seconds)) if deadline_seconds else None
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'deadline_seconds must be a number'
+            }), 400
+            
         # Create log capture
         log_capture = LogCapture()
         
         try:
-            # Generate script
             generator = StockScriptGenerator()
-            script = generator.generate_script(symbol, period)
-            
-            # Get the latest generation from the database
-            from database import get_generations_for_symbol
-            latest = get_generations_for_symbol(symbol, limit=1)
             
-            prompt = ""
-            impact_table = ""
+            def run(func, *args):
+                if profile_requested:
+                    return run_profiled(f"{symbol}-{'+'.join(periods) or period}", func, *args)
+                return func(*args), None
             
-            if latest:
-                latest_gen = latest[0]
-                prompt = latest_gen['prompt']
-                
-                # Extract the impact table from the prompt
-                # The table starts with "| Date |" and ends with a double newline
-                table_start = prompt.find("| Date |")
-                if table_start != -1:
-                    table_end = prompt.find("\n\n", table_start)
-                    if table_end == -1:  # If no double newline, go to end of string
-                        table_end = len(prompt)
-                    impact_table = prompt[table_start:table_end].strip()
+            if periods:
+                results, profile_id = run(generator.generate_scripts, symbol, periods, sectioned)
+                response = {
+                    'success': True,
+                    'results': {p: result.to_dict() for p, result in results.items()},
+                    'logs': log_capture.get_logs()
+                }
+            else:
+                # Generate script
+                result, profile_id = run(generator.generate_script, symbol, period, sectioned, deadline)
+                response = dict(
+                    result.to_dict(),
+                    success=True,
+                    logs=log_capture.get_logs()
+                )
             
-            return jsonify({
-                'success': True,
-                'script': script,
-                'prompt': prompt,
-                'impact_table': impact_table,
-                'logs': log_capture.get_logs()
-            })
+            if profile_id:
+                response['profile_id'] = profile_id
+            return jsonify(response)
             
         except StockDataError as e:
             error_msg = str(e)
@@ -181,7 +240,17 @@ def get_script_history(symbol):
     """Get the script generation history for a symbol."""
     try:
         limit = request.args.get('limit', default=10, type=int)
-        generations = get_generations_for_symbol(symbol.upper(), limit)
+        symbol = symbol.upper()
+        
+        # The history only changes when a generation is added or removed
+        latest_id, count = get_generation_version(symbol)
+        etag = f"history-{symbol}-{limit}-{latest_id}-{count}"
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+            response.set_etag(etag, weak=True)
+            return response
+        
+        generations = get_generations_for_symbol(symbol, limit)
         
         history = []
         for gen in generations:
@@ -195,17 +264,180 @@ def get_script_history(symbol):
                 'period': gen['period'],
                 'prompt': gen['prompt'],
                 'script': gen['script'],
+                'prompt_tokens': gen['prompt_tokens'],
+                'generation_seconds': gen['generation_seconds'],
                 'timestamp': formatted_time
             })
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'history': history
         })
+        response.set_etag(etag, weak=True)
+        response.cache_control.no_cache = True
+        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/search', methods=['GET'])
+def search_scripts():
+    """Full-text search across every stored script and prompt."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({
+            'success': False,
+            'error': 'Query parameter q is required'
+        }), 400
+    symbol = request.args.get('symbol', '').strip().upper() or None
+    period = request.args.get('period') or None
+    # SQLite reads a negative LIMIT as no limit at all
+    limit = max(1, min(request.args.get('limit', default=20, type=int), 100))
+    offset = max(0, request.args.get('offset', default=0, type=int))
+    try:
+        results = search_generations(query, symbol=symbol, period=period, limit=limit, offset=offset)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify({
+        'success': True,
+        'query': query,
+        'results': results
+    })
+
+@app.route('/api/series/<symbol>', methods=['GET'])
+def get_series(symbol):
+    """Get daily OHLCV bars for a period, downsampled to at most `points` bars.
+    
+    Returns columnar JSON ({t, o, h, l, c, v} arrays) or, with ?format=binary,
+    the same columns packed as described by the X-Series-Layout header.
+    """
+    period = request.args.get('period', '1y')
+    if period not in PERIOD_DAYS:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid period. Must be one of: {", ".join(PERIOD_DAYS)}'
+        }), 400
+    points = max(3, min(request.args.get('points', default=300, type=int), 5000))
+    symbol = symbol.upper()
+    
+    try:
+        candles = StockScriptGenerator().get_candles(symbol, PERIOD_DAYS[period])
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    if candles.empty:
+        return jsonify({
+            'success': False,
+            'error': f'No price series available for {symbol}'
+        }), 404
+    
+    series = downsample_ohlcv(
+        candles.index.asi8 // 10**9,
+        candles['Open'].to_numpy(dtype=float),
+        candles['High'].to_numpy(dtype=float),
+        candles['Low'].to_numpy(dtype=float),
+        candles['Close'].to_numpy(dtype=float),
+        candles['Volume'].to_numpy(dtype=float),
+        points
+    )
+    
+    if request.args.get('format') == 'binary':
+        payload = b''.join(np.asarray(series[name]).astype(dtype).tobytes() for name, dtype in SERIES_BINARY_LAYOUT)
+        response = make_response(payload)
+        response.mimetype = 'application/octet-stream'
+        response.headers['X-Series-Layout'] = ','.join(f"{name}:{dtype}" for name, dtype in SERIES_BINARY_LAYOUT)
+        response.headers['X-Series-Length'] = str(len(series['t']))
+        response.headers['Access-Control-Expose-Headers'] = 'X-Series-Layout, X-Series-Length'
+    else:
+        response = jsonify(dict(
+            {name: np.asarray(values).tolist() for name, values in series.items()},
+            success=True,
+            symbol=symbol,
+            period=period,
+            raw_points=len(candles)
+        ))
+    # Candles are cached for CANDLE_CACHE_TTL, so short browser caching is safe
+    response.cache_control.max_age = 300
+    return response
+
+@app.route('/api/export', methods=['GET'])
+def export_scripts():
+    """Stream the generation history as JSON lines or CSV, optionally gzipped.
+    
+    Filters: symbol, period, since and until (YYYY-MM-DD, inclusive).
+    Add gzip=true for a compressed download and prompt=false to leave out prompts.
+    """
+    fmt = request.args.get('format', 'jsonl')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid format. Must be one of: {", ".join(EXPORT_FORMATS)}'
+        }), 400
+    period = request.args.get('period') or None
+    if period is not None and period not in PERIOD_DAYS:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid period. Must be one of: {", ".join(PERIOD_DAYS)}'
+        }), 400
+    since = request.args.get('since') or None
+    until = request.args.get('until') or None
+    try:
+        date_bounds(since, until)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'since and until must be dates in YYYY-MM-DD format'
+        }), 400
+    symbol = request.args.get('symbol', '').strip().upper() or None
+    compress = request.args.get('gzip', 'false').lower() == 'true'
+    include_prompt = request.args.get('prompt', 'true').lower() != 'false'
+    
+    chunks = export_generations(fmt=fmt, compress=compress, symbol=symbol, period=period,
+                                since=since, until=until, include_prompt=include_prompt)
+    filename = f"scripts-{symbol or 'all'}.{fmt}" + ('.gz' if compress else '')
+    mimetype = 'application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@app.route('/api/profiles', methods=['GET'])
+def get_profiles():
+    """List stored generation profiles, newest first."""
+    limit = request.args.get('limit', default=50, type=int)
+    return jsonify({
+        'success': True,
+        'profiles': list_profiles(limit)
+    })
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """Download a stored profile as raw pstats data, or as a text summary with ?format=txt."""
+    fmt = request.args.get('format', 'prof')
+    path = profile_file(profile_id, fmt)
+    if path is None:
+        return jsonify({
+            'success': False,
+            'error': 'Profile not found'
+        }), 404
+    if fmt == 'txt':
+        return send_file(path, mimetype='text/plain')
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True)
+
+@app.route('/api/health/sources', methods=['GET'])
+def get_source_health():
+    """Get circuit breaker state and rolling health for each news provider."""
+    return jsonify({
+        'success': True,
+        'sources': all_health(),
+        'quote_feed': quote_feed.active_feed.status() if quote_feed.active_feed is not None else None
+    })
+
 if __name__ == '__main__':
     os.makedirs('scripts', exist_ok=True)
+    # The debug reloader imports the app twice; only warm data in the serving process
+    if os.getenv('PREFETCH_ENABLED', 'true').lower() == 'true' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_prefetch()
+    if os.getenv('RETENTION_ENABLED', 'false').lower() == 'true' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_retention()
+    if os.getenv('QUOTE_FEED_ENABLED', 'false').lower() == 'true' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_quote_feed()
     app.run(debug=True, port=5044)
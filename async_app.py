@@ -0,0 +1,154 @@
+"""
+Async server for script generation.
+
+Serves /generate with the same request and response shape as app.py, but
+every generation waits on provider I/O inside the event loop instead of
+holding a thread. Run it next to the Flask app: python async_app.py
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+
+import aiohttp
+from aiohttp import web
+from dotenv import load_dotenv
+
+from async_generator import AsyncStockScriptGenerator
+from circuit_breaker import all_health
+from database import get_generations_for_symbol
+from deadline import Deadline
+from stock_script_generator import StockDataError
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+VALID_PERIODS = ['1mo', '3mo', '6mo', '1y']
+
+
+async def generate(request):
+    """Generate a script for a stock symbol."""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data:
+        return web.json_response({
+            'success': False,
+            'error': 'Invalid request: no JSON data provided'
+        }, status=400)
+
+    symbol = data.get('symbol', '').strip().upper()
+    period = data.get('period', '1mo')
+    periods = data.get('periods') or []
+    sectioned = data.get('sectioned')
+    deadline_seconds = data.get('deadline_seconds') or os.getenv('GENERATE_DEADLINE_SECONDS')
+
+    if not symbol:
+        return web.json_response({
+            'success': False,
+            'error': 'Symbol is required'
+        }, status=400)
+
+    if period not in VALID_PERIODS or any(p not in VALID_PERIODS for p in periods):
+        return web.json_response({
+            'success': False,
+            'error': f'Invalid period. Must be one of: {", ".join(VALID_PERIODS)}'
+        }, status=400)
+
+    try:
+        deadline = Deadline(float(deadline_seconds)) if deadline_seconds else None
+    except (TypeError, ValueError):
+        return web.json_response({
+            'success': False,
+            'error': 'deadline_seconds must be a number'
+        }, status=400)
+
+    generator = request.app['generator']
+    try:
+        if periods:
+            results = await generator.generate_scripts(symbol, periods, sectioned)
+            return web.json_response({
+                'success': True,
+                'results': {p: result.to_dict() for p, result in results.items()}
+            })
+        result = await generator.generate_script(symbol, period, sectioned, deadline)
+        return web.json_response(dict(result.to_dict(), success=True))
+
+    except StockDataError as e:
+        error_msg = str(e)
+        if 'Missing required columns' in error_msg:
+            error_msg = 'Unable to retrieve complete stock data. Please try again.'
+        elif 'Invalid numeric data' in error_msg:
+            error_msg = 'Invalid stock data received. Please try again.'
+        elif 'Invalid current price' in error_msg:
+            error_msg = 'Invalid stock price data. Please verify the symbol and try again.'
+        return web.json_response({'success': False, 'error': error_msg})
+
+    except Exception as e:
+        error_msg = str(e)
+        if 'rate limit' in error_msg.lower():
+            error_msg = 'API rate limit exceeded. Please wait a moment and try again.'
+        elif isinstance(e, asyncio.TimeoutError) or 'timeout' in error_msg.lower():
+            error_msg = 'Request timed out. Please try again.'
+        logger.error(f"Async generation failed for {symbol}: {str(e)}")
+        return web.json_response({'success': False, 'error': error_msg})
+
+
+async def get_script_history(request):
+    """Get the script generation history for a symbol."""
+    symbol = request.match_info['symbol'].upper()
+    try:
+        limit = int(request.query.get('limit', 10))
+    except ValueError:
+        limit = 10
+    try:
+        generations = await asyncio.to_thread(get_generations_for_symbol, symbol, limit)
+    except Exception as e:
+        return web.json_response({'error': str(e)}, status=500)
+
+    history = []
+    for gen in generations:
+        timestamp = datetime.fromisoformat(gen['timestamp'])
+        history.append(dict(gen, timestamp=timestamp.strftime('%Y-%m-%d %I:%M %p')))
+    return web.json_response({
+        'success': True,
+        'history': history
+    })
+
+
+async def get_source_health(request):
+    """Get circuit breaker state and rolling health for each provider."""
+    return web.json_response({
+        'success': True,
+        'sources': all_health()
+    })
+
+
+async def open_session(app):
+    # One connection pool for every in-flight generation
+    connector = aiohttp.TCPConnector(limit=int(os.getenv('ASYNC_MAX_CONNECTIONS', '200')))
+    app['session'] = aiohttp.ClientSession(connector=connector)
+    app['generator'] = AsyncStockScriptGenerator(app['session'])
+
+
+async def close_session(app):
+    await app['session'].close()
+
+
+def create_app():
+    app = web.Application()
+    app.router.add_post('/generate', generate)
+    app.router.add_get('/api/history/{symbol}', get_script_history)
+    app.router.add_get('/api/health/sources', get_source_health)
+    app.on_startup.append(open_session)
+    app.on_cleanup.append(close_session)
+    return app
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    os.makedirs('scripts', exist_ok=True)
+    web.run_app(create_app(), port=int(os.getenv('ASYNC_PORT', '5045')))
@@ -0,0 +1,328 @@
+"""
+Async version of the script generation pipeline.
+
+Provider I/O (Finnhub and the Ollama HTTP API) goes through one shared aiohttp
+session. Everything else is StockScriptGenerator's: quotes, profiles and
+candles go through its live-feed and cache lookups, single-flight leases
+included, with an aiohttp fetch for misses; news planning, analysis, prompt
+building and the deadline fallbacks are its methods too. Those helpers block
+on the cache or SQLite, so they run in the default thread pool, never on the
+event loop. A cache miss holds a pool thread while its fetch runs on the loop;
+waits on the LLM, the longest by far, hold none.
+"""
+import asyncio
+import logging
+import os
+import time
+
+import aiohttp
+
+from circuit_breaker import get_breaker, CircuitOpenError
+from database import save_generation, save_generations, save_news_items, get_news_items
+from rate_limit import acquire_finnhub_async
+from stock_script_generator import (
+    StockScriptGenerator, PERIOD_DAYS, split_date_range, chunk_covered_from, covered_from_chunks,
+    section_token_cap, trim_to_sentence
+)
+
+logger = logging.getLogger(__name__)
+
+FINNHUB_API_URL = "https://finnhub.io/api/v1"
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+
+
+class AsyncStockScriptGenerator:
+    def __init__(self, session, generator=None, model='mistral', temperature=0.7):
+        """Create an async generator on a shared aiohttp.ClientSession."""
+        self.session = session
+        self.generator = generator or StockScriptGenerator()
+        self.model = model
+        self.temperature = temperature
+        self.llm_timeout = int(os.getenv('LLM_TIMEOUT', '300'))
+        self.news_semaphore = asyncio.Semaphore(self.generator.news_fetch_workers)
+        self.llm_semaphore = asyncio.Semaphore(self.generator.llm_concurrency)
+
+    async def finnhub_get(self, path, params, source=None):
+        """GET a Finnhub endpoint within the shared rate limit and, if given, the source's breaker.
+
+        Quotes and profiles go without one, as in StockScriptGenerator, so
+        failing news fetches never block them (or the other way round).
+        """
+        breaker = get_breaker(source) if source else None
+        if breaker and breaker.is_open():
+            raise CircuitOpenError(f"{source} is unavailable (circuit open)")
+        if not await acquire_finnhub_async(timeout=30):
+            raise RuntimeError("Finnhub rate limit budget exhausted")
+
+        async def request():
+            headers = {
+                "X-Finnhub-Token": self.generator.finnhub_token,
+                "Accept": "application/json"
+            }
+            async with self.session.get(f"{FINNHUB_API_URL}{path}", params=params, headers=headers,
+                                        timeout=aiohttp.ClientTimeout(total=10)) as response:
+                response.raise_for_status()
+                return await response.json()
+
+        return await breaker.call_async(request) if breaker else await request()
+
+    async def with_retry(self, func, source, max_retries=3, initial_wait=1, deadline=None):
+        """Await func() with exponential backoff, giving up as soon as the source's breaker opens.
+
+        With a deadline, retrying stops when the backoff would not fit its budget.
+        """
+        wait_time = initial_wait
+        for attempt in range(max_retries):
+            try:
+                return await func()
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                status = getattr(e, 'status', None)
+                if attempt == max_retries - 1 or get_breaker(source).is_open() or (
+                        status is not None and 400 <= status < 500 and status != 429) or (
+                        deadline is not None and not deadline.allows(wait_time)):
+                    raise
+                logger.info(f"{source} attempt {attempt + 1} failed ({str(e)}), retrying in {wait_time}s")
+            await asyncio.sleep(wait_time)
+            wait_time *= 2
+
+    def blocking(self, fetch):
+        """Wrap an async fetch so the shared sync helpers can call it from a worker thread.
+
+        The request still runs on the event loop; the worker only waits for it.
+        """
+        loop = asyncio.get_running_loop()
+        return lambda *args: asyncio.run_coroutine_threadsafe(fetch(*args), loop).result()
+
+    async def get_quote(self, symbol):
+        """Get the current quote through StockScriptGenerator.get_quote, fetching a missing one over aiohttp."""
+        fetch = self.blocking(lambda: self.finnhub_get('/quote', {'symbol': symbol}))
+        return await asyncio.to_thread(self.generator.get_quote, symbol, fetch=fetch)
+
+    async def get_company_name(self, symbol):
+        """Get the company name, falling back to the symbol."""
+        fetch = self.blocking(lambda: self.finnhub_get('/stock/profile2', {'symbol': symbol}))
+        return await asyncio.to_thread(self.generator.get_company_name, symbol, fetch=fetch)
+
+    async def get_candles(self, symbol, days):
+        """Get daily OHLCV candles for the last `days` days; empty if unavailable."""
+        fetch = self.blocking(lambda start_ts, end_ts: self.finnhub_get(
+            '/stock/candle', {'symbol': symbol, 'resolution': 'D', 'from': start_ts, 'to': end_ts},
+            source='finnhub_candles'
+        ))
+        return await asyncio.to_thread(self.generator.get_candles, symbol, days, fetch=fetch)
+
+    async def fetch_news_chunk(self, symbol, chunk, deadline=None):
+        """Fetch one date-range chunk of company news; returns (chunk, items or exception)."""
+        chunk_from, chunk_to = chunk
+        params = {'symbol': symbol, 'from': chunk_from, 'to': chunk_to}
+        async with self.news_semaphore:
+            try:
+                items = await self.with_retry(
+                    lambda: self.finnhub_get('/company-news', params, source='finnhub'), source='finnhub',
+                    deadline=deadline
+                )
+                return chunk, (items or [])[:self.generator.news_chunk_cap]
+            except Exception as e:
+                return chunk, e
+
+    async def fetch_news_range(self, symbol, range_from, range_to, deadline=None):
+        """Fetch a date range in concurrent chunks, storing each chunk as it arrives.
+
+        Like StockScriptGenerator.fetch_finnhub_news_range, returns the earliest
+        date fetched without gaps, or None, and abandons chunks still
+        outstanding when the deadline's spare budget runs out.
+        """
+        chunks = split_date_range(range_from, range_to, self.generator.news_chunk_days)
+        tasks = [asyncio.ensure_future(self.fetch_news_chunk(symbol, chunk, deadline)) for chunk in chunks]
+        covered = {}
+        try:
+            timeout = max(0.0, deadline.spare()) if deadline is not None else None
+            for next_chunk in asyncio.as_completed(tasks, timeout=timeout):
+                chunk, items = await next_chunk
+                if isinstance(items, Exception):
+                    logger.error(f"Finnhub news chunk {chunk[0]} to {chunk[1]} failed: {str(items)}")
+                    continue
+                await asyncio.to_thread(save_news_items, symbol, 'finnhub', items)
+                covered[chunk] = chunk_covered_from(chunk, items, self.generator.news_chunk_cap)
+        except asyncio.TimeoutError:
+            logger.warning(f"Deadline reached with {len(chunks) - len(covered)} news chunks outstanding")
+            deadline.degrade('news', f"abandoned {len(chunks) - len(covered)} of {len(chunks)} news chunks")
+        finally:
+            for task in tasks:
+                task.cancel()
+        return covered_from_chunks(chunks, covered)
+
+    async def get_news(self, symbol, days, deadline=None):
+        """Get formatted news for the last `days` days through the local news store."""
+        try:
+            ranges, since = await asyncio.to_thread(self.generator.plan_news_fetch, symbol, days, False, deadline)
+            for range_from, range_to in ranges:
+                covered_from = await self.fetch_news_range(symbol, range_from, range_to, deadline)
+                await asyncio.to_thread(self.generator.record_news_coverage, symbol, covered_from)
+            items = await asyncio.to_thread(get_news_items, symbol, 'finnhub', since)
+            return self.generator.format_news_items(items)
+        except Exception as e:
+            logger.error(f"Error in async get_news: {str(e)}")
+            return []
+
+    async def collect_market_data(self, symbol, days, deadline=None):
+        """Fetch the quote, company name, news and candles concurrently.
+
+        With a deadline, optional stages are cut or skipped (unless cached) as
+        in StockScriptGenerator.collect_market_data; the quote is required.
+        """
+        timings = {}
+
+        async def timed(name, awaitable):
+            start = time.perf_counter()
+            try:
+                return await awaitable
+            finally:
+                timings[name] = round(time.perf_counter() - start, 3)
+
+        async def candles():
+            if await asyncio.to_thread(self.generator.can_afford, deadline, 'candles', f"candles:{symbol}:{days}"):
+                return await self.get_candles(symbol, days)
+            deadline.degrade('candles', 'skipped candle history')
+            return self.generator.candles_to_frame(None)
+
+        async def company_name():
+            if await asyncio.to_thread(self.generator.can_afford, deadline, 'profile', f"profile:{symbol}"):
+                return await self.get_company_name(symbol)
+            deadline.degrade('profile', 'skipped company name lookup')
+            return symbol
+
+        quote, news, candles, company_name = await asyncio.gather(
+            timed('quote', self.get_quote(symbol)),
+            timed('news', self.get_news(symbol, days, deadline)),
+            timed('candles', candles()),
+            timed('profile', company_name())
+        )
+        return {
+            'stock_data': self.generator.quote_to_frame(quote),
+            'news': news,
+            'candles': candles,
+            'company_name': company_name,
+            'timings': timings
+        }
+
+    async def invoke_llm(self, prompt, num_predict=None):
+        """Generate text through the Ollama HTTP API, returning it and the seconds it took.
+
+        Every call waits for a slot in the generator's llm_concurrency-wide
+        semaphore, so sections and periods together never exceed it.
+        """
+        payload = {
+            'model': self.model,
+            'prompt': prompt,
+            'stream': False,
+            'options': {'temperature': self.temperature}
+        }
+        if num_predict:
+            payload['options']['num_predict'] = num_predict
+        async with self.llm_semaphore:
+            llm_start = time.perf_counter()
+            async with self.session.post(f"{OLLAMA_URL}/api/generate", json=payload,
+                                         timeout=aiohttp.ClientTimeout(total=self.llm_timeout)) as response:
+                response.raise_for_status()
+                data = await response.json()
+        generation_seconds = round(time.perf_counter() - llm_start, 3)
+        logger.info(f"LLM call finished in {generation_seconds:.1f}s")
+        return data['response'], generation_seconds
+
+    async def invoke_sections(self, sections):
+        """Generate script sections concurrently and stitch them in order, as StockScriptGenerator does."""
+        llm_start = time.perf_counter()
+        outputs = await asyncio.gather(*(
+            self.invoke_llm(section['prompt'], num_predict=section_token_cap(section['words']))
+            for section in sections
+        ))
+        parts = [trim_to_sentence(text.strip()) for text, _ in outputs]
+        generation_seconds = round(time.perf_counter() - llm_start, 3)
+        logger.info(f"{len(sections)} script sections generated in {generation_seconds:.1f}s")
+        return '\n\n'.join(part for part in parts if part), generation_seconds
+
+    async def run_llm(self, built):
+        """Generate the script for a built prompt, sectioned or in one call."""
+        if built.get('sections'):
+            return await self.invoke_sections(built['sections'])
+        return await self.invoke_llm(built['prompt'])
+
+    async def stale_if_over_budget(self, symbol, period, deadline):
+        """Return the newest stored script as a stale result if the LLM no longer fits the deadline."""
+        if deadline is None or deadline.spare() >= 0:
+            return None
+        return await asyncio.to_thread(self.generator.stale_result, symbol, period, deadline)
+
+    async def generate_script(self, symbol, period='1mo', sectioned=None, deadline=None):
+        """Generate a script for a symbol and period, returning a GenerationResult.
+
+        sectioned and deadline work as in StockScriptGenerator.generate_script.
+        """
+        logger.info(f"Starting async script generation for {symbol} ({period})")
+        if deadline is not None:
+            deadline.reserve = await asyncio.to_thread(self.generator.expected_llm_seconds, period)
+            stale = await self.stale_if_over_budget(symbol, period, deadline)
+            if stale is not None:
+                return stale
+
+        market_data = await self.collect_market_data(symbol, PERIOD_DAYS.get(period, 30), deadline)
+
+        stage_start = time.perf_counter()
+        built = await asyncio.to_thread(self.generator.build_prompt, symbol, period, market_data,
+                                        self.generator.sectioned if sectioned is None else sectioned)
+        prompt_seconds = round(time.perf_counter() - stage_start, 3)
+
+        stale = await self.stale_if_over_budget(symbol, period, deadline)
+        if stale is not None:
+            return stale
+        if deadline is not None and deadline.spare() < 0:
+            deadline.degrade('llm', 'no cached script to fall back on, generating over budget')
+
+        script, generation_seconds = await self.run_llm(built)
+
+        stage_start = time.perf_counter()
+        generation_id = await asyncio.to_thread(
+            save_generation, symbol, period, built['prompt'], script,
+            built['prompt_tokens'], generation_seconds,
+            built['template_name'], built['template'], built['prompt_params']
+        )
+        timings = dict(market_data['timings'], prompt=prompt_seconds, llm=generation_seconds,
+                       save=round(time.perf_counter() - stage_start, 3))
+        result = self.generator.make_result(symbol, period, built, script, timings, generation_id)
+        if deadline is not None:
+            result.degradations = deadline.degradations
+        return result
+
+    async def generate_scripts(self, symbol, periods, sectioned=None):
+        """Generate several periods from one data fetch; returns period -> GenerationResult."""
+        days = max(PERIOD_DAYS.get(period, 30) for period in periods)
+        market_data = await self.collect_market_data(symbol, days)
+        sectioned = self.generator.sectioned if sectioned is None else sectioned
+
+        def build_all():
+            return {period: self.generator.build_prompt(symbol, period, market_data, sectioned) for period in periods}
+
+        built = await asyncio.to_thread(build_all)
+        outputs = dict(zip(periods, await asyncio.gather(*(self.run_llm(built[period]) for period in periods))))
+        ids = await asyncio.to_thread(save_generations, [
+            {
+                'symbol': symbol,
+                'period': period,
+                'prompt': built[period]['prompt'],
+                'script': outputs[period][0],
+                'prompt_tokens': built[period]['prompt_tokens'],
+                'generation_seconds': outputs[period][1],
+                'template_name': built[period]['template_name'],
+                'template': built[period]['template'],
+                'prompt_params': built[period]['prompt_params']
+            }
+            for period in periods
+        ])
+        return {
+            period: self.generator.make_result(symbol, period, built[period], outputs[period][0],
+                                               dict(market_data['timings'], llm=outputs[period][1]), generation_id)
+            for period, generation_id in zip(periods, ids)
+        }
@@ -0,0 +1,280 @@
+"""
+Caches for provider data (quotes, company profiles, candles).
+
+TTLCache lives in the process: entries expire after a per-entry TTL and the
+least recently used entries are evicted once the cache is full. SQLiteCache
+has the same interface but keeps entries in a SQLite file, so every worker
+process on a host shares them. CACHE_BACKEND picks the one data_cache uses.
+
+get_or_compute runs the computation once per key however many threads (and,
+for SQLiteCache, processes) miss at the same time; the others wait for its
+result instead of calling the provider themselves.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def _cacheable(value):
+    return value is not None
+
+
+class _KeyLocks:
+    """Hands out one lock per key and forgets it once nobody holds or waits for it."""
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        with self._lock:
+            lock, users = self._locks.get(key, (threading.Lock(), 0))
+            self._locks[key] = (lock, users + 1)
+        lock.acquire()
+
+    def release(self, key):
+        with self._lock:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+        lock.release()
+
+
+class TTLCache:
+    def __init__(self, max_entries=2048):
+        """Create a thread-safe cache holding at most max_entries values."""
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = _KeyLocks()
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        """Cache value under key for ttl seconds."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_compute(self, key, compute, ttl, cacheable=_cacheable, force=False):
+        """Return the cached value for key, computing and caching it on a miss.
+
+        Concurrent misses for the same key wait for one computation. Its
+        result is cached only if cacheable(result) is true. With force, the
+        value is recomputed even if cached; the old entry stays until the
+        new value is stored, so a failed refresh leaves it in place.
+        """
+        value = None if force else self.get(key)
+        if value is not None:
+            return value
+        self._key_locks.acquire(key)
+        try:
+            value = None if force else self.get(key)
+            if value is not None:
+                return value
+            value = compute()
+            if cacheable(value):
+                self.set(key, value, ttl)
+            return value
+        finally:
+            self._key_locks.release(key)
+
+
+class SQLiteCache:
+    """A TTLCache shared between processes through a SQLite file.
+
+    Values are pickled. Recency is refreshed at most every touch_interval
+    seconds per entry, so reads rarely write, and least recently used entries
+    are evicted once more than max_entries are stored. A computing process
+    holds a lease on its key for up to lease_seconds; if it dies, the lease
+    expires and another process takes over.
+    """
+
+    def __init__(self, path, max_entries=2048, lease_seconds=30, poll_interval=0.05, touch_interval=10):
+        self.path = path
+        self.max_entries = max_entries
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self._key_locks = _KeyLocks()
+        self._owner = uuid.uuid4().hex
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed_at ON cache_entries (accessed_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_leases (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork so processes never share one
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired."""
+        conn = self._connect()
+        row = conn.execute("SELECT value, expires_at, accessed_at FROM cache_entries WHERE key = ?",
+                           (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at < now:
+            conn.execute("DELETE FROM cache_entries WHERE key = ? AND expires_at < ?", (key, now))
+            return None
+        if now - accessed_at > self.touch_interval:
+            conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+        try:
+            return pickle.loads(value)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable cache entry {key}: {str(e)}")
+            self.delete(key)
+            return None
+
+    def set(self, key, value, ttl):
+        """Cache value under key for ttl seconds."""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("""
+                INSERT INTO cache_entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at,
+                                               accessed_at = excluded.accessed_at
+            """, (key, data, now + ttl, now))
+            excess = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] - self.max_entries
+            if excess > 0:
+                # Expired entries go first, then the least recently used
+                conn.execute("""
+                    DELETE FROM cache_entries WHERE key IN (
+                        SELECT key FROM cache_entries ORDER BY expires_at >= ?, accessed_at LIMIT ?
+                    )
+                """, (now, excess))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM cache_entries")
+        conn.execute("DELETE FROM cache_leases")
+
+    def _acquire_lease(self, key):
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache_leases WHERE key = ? AND expires_at < ?", (key, now))
+            acquired = conn.execute("INSERT OR IGNORE INTO cache_leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                                    (key, self._owner, now + self.lease_seconds)).rowcount == 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return acquired
+
+    def _release_lease(self, key):
+        self._connect().execute("DELETE FROM cache_leases WHERE key = ? AND owner = ?", (key, self._owner))
+
+    def get_or_compute(self, key, compute, ttl, cacheable=_cacheable, force=False):
+        """Return the cached value for key, computing and caching it on a miss.
+
+        Only one thread on the host computes a missing key at a time; the
+        rest wait for its result. If the result isn't cacheable, or the
+        lease holder takes longer than lease_seconds, waiters compute it
+        themselves. With force, the value is recomputed even if cached and
+        the old entry is only replaced once the new one is ready.
+        """
+        value = None if force else self.get(key)
+        if value is not None:
+            return value
+        self._key_locks.acquire(key)
+        try:
+            give_up_at = time.time() + self.lease_seconds
+            while True:
+                value = None if force else self.get(key)
+                if value is not None:
+                    return value
+                if self._acquire_lease(key):
+                    try:
+                        value = compute()
+                        if cacheable(value):
+                            self.set(key, value, ttl)
+                        return value
+                    finally:
+                        self._release_lease(key)
+                if time.time() > give_up_at:
+                    logger.warning(f"Timed out waiting for another worker to compute {key}")
+                    return compute()
+                time.sleep(self.poll_interval)
+        finally:
+            self._key_locks.release(key)
+
+
+def create_cache():
+    """Create the cache selected by CACHE_BACKEND ('memory' or 'sqlite')."""
+    max_entries = int(os.getenv('CACHE_MAX_ENTRIES', '2048'))
+    backend = os.getenv('CACHE_BACKEND', 'memory').lower()
+    if backend == 'sqlite':
+        return SQLiteCache(os.getenv('CACHE_PATH', './cache.db'), max_entries=max_entries)
+    if backend != 'memory':
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+    return TTLCache(max_entries)
+
+
+# Shared by the request path, the prefetch scheduler and the quote feed
+data_cache = create_cache()
@@ -0,0 +1,190 @@
+"""
+Per-provider circuit breakers with rolling health statistics.
+
+A breaker opens after a run of consecutive failures and rejects calls for a
+cool-down window, so a dead source costs nothing. Once the window has passed
+a single half-open trial call decides whether it closes again.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_SETTINGS = {
+    'failure_threshold': 3,
+    'cooldown': 60,
+    'window': 50,
+}
+
+# Scraped sources break for long stretches when their layout or URLs change
+SOURCE_SETTINGS = {
+    'marketwatch': {'cooldown': 900},
+    'reuters': {'cooldown': 900},
+    'yfinance': {'cooldown': 900},
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the source's breaker is open"""
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, cooldown=60, window=50):
+        """Create a breaker that opens after failure_threshold consecutive failures."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.trial_in_flight = False
+        self.calls = deque(maxlen=window)
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go through now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self.trial_in_flight = False
+            # Half-open: let exactly one trial call through
+            if self.trial_in_flight:
+                self.rejected += 1
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def is_open(self):
+        """Return True if calls are currently being rejected."""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < self.cooldown
+
+    def record_success(self, latency):
+        with self._lock:
+            self.calls.append((True, latency))
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.name} closed after successful trial call")
+            self.state = CLOSED
+
+    def record_failure(self, latency, error):
+        with self._lock:
+            self.calls.append((False, latency))
+            self.consecutive_failures += 1
+            self.last_error = str(error)
+            self.trial_in_flight = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Circuit for {self.name} opened for {self.cooldown}s: {error}")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Give up the half-open trial slot without judging the source."""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def call(self, func):
+        """Run func through the breaker, raising CircuitOpenError if it is open."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        start = time.monotonic()
+        try:
+            result = func()
+        except Exception as e:
+            self.record_failure(time.monotonic() - start, e)
+            raise
+        except BaseException:
+            # Cancelled or interrupted: says nothing about the source, but must free the trial slot
+            self.release_trial()
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    async def call_async(self, func):
+        """Await func() through the breaker, raising CircuitOpenError if it is open."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        start = time.monotonic()
+        try:
+            result = await func()
+        except Exception as e:
+            self.record_failure(time.monotonic() - start, e)
+            raise
+        except BaseException:
+            # Cancelled or interrupted: says nothing about the source, but must free the trial slot
+            self.release_trial()
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    def health(self):
+        """Return the breaker state and rolling success-rate/latency statistics."""
+        with self._lock:
+            calls = list(self.calls)
+            state = self.state
+            retry_in = None
+            if state == OPEN:
+                retry_in = max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+            latencies = sorted(latency for _, latency in calls)
+            successes = sum(1 for ok, _ in calls if ok)
+            success_rate = successes / len(calls) if calls else None
+            return {
+                'source': self.name,
+                'state': state,
+                'consecutive_failures': self.consecutive_failures,
+                'rejected_calls': self.rejected,
+                'retry_in_seconds': round(retry_in, 1) if retry_in is not None else None,
+                'sample_size': len(calls),
+                'success_rate': round(success_rate, 3) if success_rate is not None else None,
+                'latency_p50_ms': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                'latency_max_ms': round(latencies[-1] * 1000, 1) if latencies else None,
+                'health_score': self._score(state, success_rate),
+                'last_error': self.last_error
+            }
+
+    @staticmethod
+    def _score(state, success_rate):
+        if state == OPEN:
+            return 0.0
+        if success_rate is None:
+            return 1.0
+        score = success_rate * (0.5 if state == HALF_OPEN else 1.0)
+        return round(score, 3)
+
+
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(source):
+    """Return the process-wide breaker for a source, creating it on first use."""
+    with _registry_lock:
+        breaker = _breakers.get(source)
+        if breaker is None:
+            settings = dict(DEFAULT_SETTINGS, **SOURCE_SETTINGS.get(source, {}))
+            breaker = CircuitBreaker(source, **settings)
+            _breakers[source] = breaker
+        return breaker
+
+
+def all_health():
+    """Return health information for every source seen so far."""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.health() for breaker in breakers}
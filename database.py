@@ -1,14 +1,35 @@
-"""Database utilities for storing scripts and prompts."""
+"""Database utilities for storing scripts and prompts.
+
+Generated scripts are stored zlib-compressed. Prompts are stored as the id of
+their template (content-addressed in prompt_templates) plus the compressed
+JSON parameters it was formatted with, and are rebuilt on read. Each
+generation's symbol, script and prompt are full-text indexed in the
+contentless generations_fts table, which is kept in step by the save and
+delete functions here.
+"""
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
+import hashlib
+import html
+import json
 import os
 import logging
+import re
+import zlib
 
 logger = logging.getLogger(__name__)
 
 # Database configuration
 DATABASE_PATH = "./scripts.db"
 
+# covered_from value for a news watermark whose window has no gap-free coverage yet
+NEWS_NOT_COVERED = "9999-12-31"
+# updated_at of a watermark whose first range hasn't finished yet
+NEWS_NEVER_UPDATED = "1970-01-01T00:00:00"
+
+# Columns of the generations_fts search index; a database indexed differently is reindexed on start
+FTS_COLUMNS = ['symbol', 'script', 'prompt']
+
 def init_db():
     """Initialize the database, creating tables if they don't exist."""
     conn = sqlite3.connect(DATABASE_PATH)
@@ -24,23 +45,321 @@ def init_db():
                 timestamp TEXT NOT NULL
             )
         """)
+        # Columns added after the table was first created
+        existing_columns = {row[1] for row in cursor.execute("PRAGMA table_info(script_generations)")}
+        for column, column_type in (('prompt_tokens', 'INTEGER'), ('generation_seconds', 'REAL'),
+                                    ('template_id', 'INTEGER'), ('prompt_data', 'BLOB'),
+                                    ('script_data', 'BLOB')):
+            if column not in existing_columns:
+                cursor.execute(f"ALTER TABLE script_generations ADD COLUMN {column} {column_type}")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS prompt_templates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL UNIQUE,
+                body TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        # Contentless, since stored text is compressed; rowid is the generation id
+        fts_columns = [row[1] for row in cursor.execute("PRAGMA table_info(generations_fts)")]
+        reindexing = fts_columns != FTS_COLUMNS
+        outdated_index = bool(fts_columns) and reindexing
+        if outdated_index:
+            # Built before symbols were indexed; rebuild it from the stored rows
+            cursor.execute("DROP TABLE generations_fts")
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS generations_fts
+            USING fts5({', '.join(FTS_COLUMNS)}, content='', tokenize='porter unicode61')
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS news_items (
+                symbol TEXT NOT NULL,
+                news_key TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                datetime INTEGER NOT NULL,
+                headline TEXT NOT NULL,
+                source TEXT,
+                url TEXT,
+                category TEXT,
+                related TEXT,
+                summary TEXT,
+                PRIMARY KEY (symbol, news_key)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_news_items_symbol_datetime
+            ON news_items (symbol, provider, datetime)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS news_watermarks (
+                symbol TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                newest_datetime INTEGER NOT NULL,
+                covered_from TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (symbol, provider)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_script_generations_symbol_timestamp
+            ON script_generations (symbol, timestamp)
+        """)
         conn.commit()
+        migrated = _compress_legacy_generations(conn)
+        if reindexing:
+            _index_existing_generations(conn)
+        # Incremental auto-vacuum only takes effect on an existing file after a full VACUUM
+        converting = conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+        if converting:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if migrated or converting or outdated_index:
+            conn.execute("VACUUM")
     finally:
         conn.close()
 
-def save_generation(symbol: str, period: str, prompt: str, script: str):
-    """Save a script generation to the database."""
+def _compress(text: str):
+    return zlib.compress(text.encode('utf-8'), 9)
+
+def _decompress(data):
+    return zlib.decompress(data).decode('utf-8')
+
+def _compress_legacy_generations(conn, batch_size: int = 500):
+    """Move rows written before compact storage into the compressed columns.
+    
+    Their prompt parameters are unknown, so the full prompt is compressed.
+    Returns the number of rows migrated.
+    """
+    migrated = 0
+    while True:
+        rows = conn.execute("""
+            SELECT id, prompt, script FROM script_generations
+            WHERE script_data IS NULL
+            LIMIT ?
+        """, (batch_size,)).fetchall()
+        if not rows:
+            break
+        conn.executemany("""
+            UPDATE script_generations
+            SET prompt_data = ?, script_data = ?, prompt = '', script = ''
+            WHERE id = ?
+        """, [(_compress(prompt), _compress(script), row_id) for row_id, prompt, script in rows])
+        conn.commit()
+        migrated += len(rows)
+    if migrated:
+        logger.info(f"Compressed {migrated} stored script generations")
+    return migrated
+
+def _template_id(cursor, name: str, body: str):
+    """Return the id of a template version, storing it on first use."""
+    checksum = hashlib.sha256(body.encode('utf-8')).hexdigest()
+    cursor.execute("SELECT id FROM prompt_templates WHERE checksum = ?", (checksum,))
+    row = cursor.fetchone()
+    if row:
+        return row[0]
+    cursor.execute("""
+        INSERT INTO prompt_templates (name, checksum, body, created_at)
+        VALUES (?, ?, ?, ?)
+    """, (name, checksum, body, datetime.utcnow().isoformat()))
+    return cursor.lastrowid
+
+def _pack_prompt(cursor, prompt: str, template_name: str = None, template: str = None, prompt_params: dict = None):
+    """Return (template_id, prompt_data) for storing a prompt.
+    
+    The prompt is stored as template parameters only when formatting the
+    template with the round-tripped parameters reproduces it exactly.
+    """
+    if template and prompt_params is not None:
+        params_json = json.dumps(prompt_params, default=lambda o: o.item() if hasattr(o, 'item') else str(o))
+        try:
+            if template.format(**json.loads(params_json)) == prompt:
+                return _template_id(cursor, template_name or 'unnamed', template), _compress(params_json)
+        except (KeyError, IndexError, ValueError):
+            pass
+        logger.warning("Prompt does not round-trip through its template; storing it in full")
+    return None, _compress(prompt)
+
+def _unpack_prompt(template_body, prompt_data, legacy_prompt: str):
+    if prompt_data is None:
+        return legacy_prompt
+    if template_body is None:
+        return _decompress(prompt_data)
+    return template_body.format(**json.loads(_decompress(prompt_data)))
+
+def save_generation(symbol: str, period: str, prompt: str, script: str,
+                    prompt_tokens: int = None, generation_seconds: float = None,
+                    template_name: str = None, template: str = None, prompt_params: dict = None):
+    """Save a script generation to the database, with its prompt size and LLM time.
+
+    Pass the template and parameters the prompt was formatted from to store
+    it compactly. Returns the id of the new row.
+    """
     conn = sqlite3.connect(DATABASE_PATH)
     try:
         cursor = conn.cursor()
         timestamp = datetime.utcnow().isoformat()
+        template_id, prompt_data = _pack_prompt(cursor, prompt, template_name, template, prompt_params)
         cursor.execute("""
-            INSERT INTO script_generations 
-            (symbol, period, prompt, script, timestamp)
-            VALUES (?, ?, ?, ?, ?)
-        """, (symbol, period, prompt, script, timestamp))
+            INSERT INTO script_generations
+            (symbol, period, prompt, script, timestamp, prompt_tokens, generation_seconds,
+             template_id, prompt_data, script_data)
+            VALUES (?, ?, '', '', ?, ?, ?, ?, ?, ?)
+        """, (symbol, period, timestamp, prompt_tokens, generation_seconds,
+              template_id, prompt_data, _compress(script)))
+        generation_id = cursor.lastrowid
+        _index_generation(cursor, generation_id, symbol, script, prompt)
         conn.commit()
         logger.info(f"Saved script generation for {symbol} to database")
+        return generation_id
+    finally:
+        conn.close()
+
+def save_generations(generations):
+    """Save several script generations in a single transaction.
+
+    Each generation is a dict with symbol, period, prompt and script, and
+    optionally prompt_tokens, generation_seconds, template_name, template and
+    prompt_params. Returns the new row ids.
+    """
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        cursor = conn.cursor()
+        timestamp = datetime.utcnow().isoformat()
+        ids = []
+        for gen in generations:
+            template_id, prompt_data = _pack_prompt(cursor, gen['prompt'], gen.get('template_name'),
+                                                    gen.get('template'), gen.get('prompt_params'))
+            cursor.execute("""
+                INSERT INTO script_generations
+                (symbol, period, prompt, script, timestamp, prompt_tokens, generation_seconds,
+                 template_id, prompt_data, script_data)
+                VALUES (?, ?, '', '', ?, ?, ?, ?, ?, ?)
+            """, (gen['symbol'], gen['period'], timestamp, gen.get('prompt_tokens'),
+                  gen.get('generation_seconds'), template_id, prompt_data, _compress(gen['script'])))
+            ids.append(cursor.lastrowid)
+            _index_generation(cursor, ids[-1], gen['symbol'], gen['script'], gen['prompt'])
+        conn.commit()
+        logger.info(f"Saved {len(ids)} script generations to database")
+        return ids
+    finally:
+        conn.close()
+
+# Columns read by _generation_from_row
+GENERATION_SELECT = """
+    SELECT g.id, g.symbol, g.period, g.prompt, g.script, g.timestamp, g.prompt_tokens,
+           g.generation_seconds, t.body, g.prompt_data, g.script_data
+    FROM script_generations g
+    LEFT JOIN prompt_templates t ON t.id = g.template_id
+"""
+
+def _generation_from_row(row):
+    return {
+        'id': row[0],
+        'symbol': row[1],
+        'period': row[2],
+        'prompt': _unpack_prompt(row[8], row[9], row[3]),
+        'script': _decompress(row[10]) if row[10] is not None else row[4],
+        'timestamp': row[5],
+        'prompt_tokens': row[6],
+        'generation_seconds': row[7]
+    }
+
+def _index_generation(cursor, generation_id, symbol, script, prompt):
+    cursor.execute("INSERT INTO generations_fts (rowid, symbol, script, prompt) VALUES (?, ?, ?, ?)",
+                   (generation_id, symbol, script, prompt))
+
+def _index_existing_generations(conn, batch_size: int = 500):
+    """Build the full-text index for rows stored before it existed."""
+    last_id = 0
+    indexed = 0
+    while True:
+        rows = conn.execute(GENERATION_SELECT + """
+            WHERE g.id > ?
+            ORDER BY g.id
+            LIMIT ?
+        """, (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        cursor = conn.cursor()
+        for row in rows:
+            generation = _generation_from_row(row)
+            _index_generation(cursor, generation['id'], generation['symbol'], generation['script'],
+                              generation['prompt'])
+        conn.commit()
+        last_id = rows[-1][0]
+        indexed += len(rows)
+    if indexed:
+        logger.info(f"Indexed {indexed} stored script generations for search")
+
+def _fts_query(text: str):
+    """Turn free text into an FTS5 query: quoted phrases and words, all required."""
+    terms = re.findall(r'"([^"]+)"|(\S+)', text)
+    phrases = [(phrase or word).replace('"', '""').strip() for phrase, word in terms]
+    return ' '.join(f'"{phrase}"' for phrase in phrases if phrase)
+
+def _snippet(text: str, query: str, width: int = 160):
+    """Return an HTML-escaped excerpt around the first match, with matches in <mark>."""
+    words = [w for w in re.findall(r'\w+', query.lower()) if len(w) > 1]
+    if not words:
+        return html.escape(text[:width])
+    # Match word prefixes so stemmed hits ("beats" for "beat") are highlighted too
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(w[:max(3, len(w) - 2)]) for w in words) + r')\w*', re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(0, match.start() - width // 3) if match else 0
+    if start:
+        # Start and end on word boundaries
+        start = text.find(' ', start, match.start()) + 1 or start
+    end = start + width
+    if end < len(text):
+        end = text.rfind(' ', start, end) if ' ' in text[start:end] else end
+    excerpt = text[start:end]
+    marked = pattern.sub(lambda m: f"\x00{m.group(0)}\x01", excerpt)
+    marked = html.escape(marked).replace('\x00', '<mark>').replace('\x01', '</mark>')
+    return ('…' if start else '') + marked + ('…' if end < len(text) else '')
+
+def search_generations(query: str, symbol: str = None, period: str = None, limit: int = 20, offset: int = 0):
+    """Full-text search over scripts, prompts and symbols, best matches first.
+    
+    Symbol and script matches weigh twice as much as prompt matches. Each
+    result has the generation fields plus its BM25 score and a script snippet.
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT g.id, g.symbol, g.period, g.prompt, g.script, g.timestamp, g.prompt_tokens,
+                   g.generation_seconds, t.body, g.prompt_data, g.script_data,
+                   bm25(generations_fts, 2.0, 2.0, 1.0) AS score
+            FROM generations_fts
+            JOIN script_generations g ON g.id = generations_fts.rowid
+            LEFT JOIN prompt_templates t ON t.id = g.template_id
+            WHERE generations_fts MATCH ?
+              AND (? IS NULL OR g.symbol = ?)
+              AND (? IS NULL OR g.period = ?)
+            ORDER BY score
+            LIMIT ? OFFSET ?
+        """, (match, symbol, symbol, period, period, limit, offset))
+        results = []
+        for row in cursor.fetchall():
+            generation = _generation_from_row(row)
+            generation['score'] = round(-row[11], 4)
+            generation['snippet'] = _snippet(generation['script'], query)
+            results.append(generation)
+        return results
+    finally:
+        conn.close()
+
+def get_generation_version(symbol: str):
+    """Get (latest generation id, generation count) for a symbol; changes whenever its history does."""
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(id), COUNT(*) FROM script_generations WHERE symbol = ?", (symbol,))
+        latest_id, count = cursor.fetchone()
+        return latest_id or 0, count
     finally:
         conn.close()
 
@@ -49,26 +368,239 @@ def get_generations_for_symbol(symbol: str, limit: int = 10):
     conn = sqlite3.connect(DATABASE_PATH)
     try:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, symbol, period, prompt, script, timestamp
-            FROM script_generations
-            WHERE symbol = ?
-            ORDER BY timestamp DESC
+        cursor.execute(GENERATION_SELECT + """
+            WHERE g.symbol = ?
+            ORDER BY g.timestamp DESC
             LIMIT ?
         """, (symbol, limit))
         
-        rows = cursor.fetchall()
-        generations = []
-        for row in rows:
-            generations.append({
-                'id': row[0],
-                'symbol': row[1],
-                'period': row[2],
-                'prompt': row[3],
-                'script': row[4],
-                'timestamp': row[5]
-            })
-        return generations
+        return [_generation_from_row(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def get_latest_generation(symbol: str, period: str):
+    """Get the most recent script generation for a symbol and period, or None."""
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(GENERATION_SELECT + """
+            WHERE g.symbol = ? AND g.period = ?
+            ORDER BY g.timestamp DESC
+            LIMIT 1
+        """, (symbol, period))
+        row = cursor.fetchone()
+        return _generation_from_row(row) if row else None
+    finally:
+        conn.close()
+
+def get_recent_generation_seconds(period: str, limit: int = 20):
+    """Get the LLM seconds of the most recent generations for a period, newest first."""
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT generation_seconds FROM script_generations
+            WHERE period = ? AND generation_seconds IS NOT NULL
+            ORDER BY id DESC
+            LIMIT ?
+        """, (period, limit))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def get_generations_by_ids(ids):
+    """Get script generations by id, oldest first."""
+    if not ids:
+        return []
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(ids))
+        cursor.execute(GENERATION_SELECT + f"""
+            WHERE g.id IN ({placeholders})
+            ORDER BY g.id
+        """, list(ids))
+        return [_generation_from_row(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def iter_generations(symbol: str = None, period: str = None, since: str = None, until: str = None,
+                     batch_size: int = 500):
+    """Yield script generations matching the filters, oldest first, one batch in memory at a time.
+    
+    since and until are ISO dates or timestamps; until is exclusive. Batches
+    are read by id (keyset pagination), so no read lock is held between them
+    and writers are never blocked for the length of the export.
+    """
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        last_id = 0
+        while True:
+            rows = conn.execute(GENERATION_SELECT + """
+                WHERE g.id > ?
+                  AND (? IS NULL OR g.symbol = ?)
+                  AND (? IS NULL OR g.period = ?)
+                  AND (? IS NULL OR g.timestamp >= ?)
+                  AND (? IS NULL OR g.timestamp < ?)
+                ORDER BY g.id
+                LIMIT ?
+            """, (last_id, symbol, symbol, period, period, since, since, until, until, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _generation_from_row(row)
+            last_id = rows[-1][0]
+    finally:
+        conn.close()
+
+def expired_generation_ids(keep_last: int = None, max_age_days: int = None, limit: int = 500):
+    """Get ids of generations outside the retention policy, oldest first.
+    
+    A generation is kept while it is among the keep_last newest for its
+    symbol and period, or younger than max_age_days. A policy left unset
+    does not keep anything; with both unset nothing expires.
+    """
+    if keep_last is None and max_age_days is None:
+        return []
+    cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).isoformat() if max_age_days is not None else '9999'
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id FROM (
+                SELECT id, timestamp, ROW_NUMBER() OVER (
+                    PARTITION BY symbol, period ORDER BY timestamp DESC, id DESC
+                ) AS recency
+                FROM script_generations
+            )
+            WHERE recency > ? AND timestamp < ?
+            ORDER BY id
+            LIMIT ?
+        """, (keep_last or 0, cutoff, limit))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def delete_generations(ids):
+    """Delete script generations by id in one short transaction."""
+    if not ids:
+        return 0
+    conn = sqlite3.connect(DATABASE_PATH, timeout=30)
+    try:
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(ids))
+        # Contentless FTS rows can only be removed by repeating the indexed text
+        cursor.execute(GENERATION_SELECT + f"WHERE g.id IN ({placeholders})", list(ids))
+        for generation in map(_generation_from_row, cursor.fetchall()):
+            cursor.execute("""
+                INSERT INTO generations_fts (generations_fts, rowid, symbol, script, prompt)
+                VALUES ('delete', ?, ?, ?, ?)
+            """, (generation['id'], generation['symbol'], generation['script'], generation['prompt']))
+        cursor.execute(f"DELETE FROM script_generations WHERE id IN ({placeholders})", list(ids))
+        deleted = cursor.rowcount
+        conn.commit()
+        return deleted
+    finally:
+        conn.close()
+
+def incremental_vacuum(pages: int = 200):
+    """Release up to `pages` free pages to the filesystem; returns the free pages left."""
+    conn = sqlite3.connect(DATABASE_PATH, timeout=30)
+    try:
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        conn.commit()
+        return conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+
+def news_key(provider: str, item: dict):
+    """Return the deduplication key for a provider news item (its id, else its URL)."""
+    if item.get('id'):
+        return f"{provider}:{item['id']}"
+    return item.get('url') or f"{provider}:{item.get('datetime')}:{item.get('headline', '')}"
+
+def save_news_items(symbol: str, provider: str, items, covered_from: str = None):
+    """Store provider news items and advance the symbol's high-water mark.
+    
+    covered_from is the earliest date (YYYY-MM-DD) the stored items are known
+    to be complete from; it only ever moves backwards. Leave it unset when
+    storing a partial fetch. Only a save with covered_from, made once a whole
+    range is stored, moves updated_at, so a half-finished fetch never makes
+    the store look freshly refreshed.
+    """
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        cursor = conn.cursor()
+        rows = []
+        newest = 0
+        for item in items:
+            if 'datetime' not in item or not item.get('headline'):
+                continue
+            newest = max(newest, int(item['datetime']))
+            rows.append((
+                symbol, news_key(provider, item), provider, int(item['datetime']),
+                item['headline'], item.get('source', ''), item.get('url', ''),
+                item.get('category', ''), item.get('related', ''), item.get('summary', '')
+            ))
+        cursor.executemany("""
+            INSERT OR IGNORE INTO news_items
+            (symbol, news_key, provider, datetime, headline, source, url, category, related, summary)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        inserted = cursor.rowcount if rows else 0
+        cursor.execute("""
+            INSERT INTO news_watermarks (symbol, provider, newest_datetime, covered_from, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (symbol, provider) DO UPDATE SET
+                newest_datetime = MAX(newest_datetime, excluded.newest_datetime),
+                covered_from = MIN(covered_from, excluded.covered_from),
+                updated_at = MAX(updated_at, excluded.updated_at)
+        """, (symbol, provider, newest, covered_from or NEWS_NOT_COVERED,
+              datetime.utcnow().isoformat() if covered_from else NEWS_NEVER_UPDATED))
+        conn.commit()
+        logger.info(f"Stored {inserted} new {provider} news items for {symbol}")
+    finally:
+        conn.close()
+
+def get_news_watermark(symbol: str, provider: str):
+    """Get the newest stored news timestamp, covered start date and last update for a symbol."""
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT newest_datetime, covered_from, updated_at
+            FROM news_watermarks
+            WHERE symbol = ? AND provider = ?
+        """, (symbol, provider))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return {'newest_datetime': row[0], 'covered_from': row[1], 'updated_at': row[2]}
+    finally:
+        conn.close()
+
+def get_news_items(symbol: str, provider: str, since: int, until: int = None):
+    """Get stored news items for a symbol newer than a Unix timestamp, newest first."""
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT news_key, datetime, headline, source, url, category, related, summary
+            FROM news_items
+            WHERE symbol = ? AND provider = ? AND datetime >= ? AND datetime <= ?
+            ORDER BY datetime DESC
+        """, (symbol, provider, since, until if until is not None else 2**62))
+        
+        return [{
+            'id': row[0],
+            'datetime': row[1],
+            'headline': row[2],
+            'source': row[3],
+            'url': row[4],
+            'category': row[5],
+            'related': row[6],
+            'summary': row[7]
+        } for row in cursor.fetchall()]
     finally:
         conn.close()
 
@@ -0,0 +1,38 @@
+"""
+Deadline budgets for a generation request.
+
+A Deadline is created when a request arrives and passed through every stage
+of generation. Optional stages ask it whether they can still afford to run,
+with a reserve held back for the LLM call, and record what they skipped or cut
+so the response can report it.
+"""
+import time
+
+
+class Deadline:
+    def __init__(self, seconds, reserve=0.0):
+        """Create a budget that expires `seconds` from now, holding back `reserve` seconds."""
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.reserve = reserve
+        self.degradations = []
+
+    def remaining(self):
+        """Return the seconds left before the deadline."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def spare(self):
+        """Return the seconds left after holding back the reserve."""
+        return self.remaining() - self.reserve
+
+    def allows(self, seconds):
+        """Return True if optional work taking `seconds` fits without eating into the reserve."""
+        return self.spare() >= seconds
+
+    def degrade(self, stage, action):
+        """Record that a stage skipped or cut work to stay within the deadline."""
+        self.degradations.append({
+            'stage': stage,
+            'action': action,
+            'remaining_seconds': round(self.remaining(), 2)
+        })
@@ -0,0 +1,61 @@
+"""
+Shape-preserving downsampling of price series for charts.
+
+Points are chosen with Largest-Triangle-Three-Buckets (LTTB) on the close,
+which keeps peaks, troughs and turns that an even stride would drop. OHLCV
+bars are then merged between the chosen points so highs, lows and volume
+totals survive the reduction.
+"""
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """Return the indices of `threshold` points of (x, y) chosen by LTTB, first and last included."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n) if threshold >= n else np.linspace(0, n - 1, max(threshold, 0), dtype=int)
+
+    # Bucket edges for the points between the fixed first and last point
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # The next bucket's average stands in for the point not chosen yet
+        next_start, next_end = edges[bucket + 1], edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_ohlcv(t, o, h, l, c, v, points):
+    """Reduce OHLCV columns to at most `points` bars.
+
+    Each output bar starts at an LTTB-selected bar (its time and open) and
+    covers the bars up to the next selected one: close is the last covered
+    bar's, high/low are their extremes and volume their total. Returns a
+    dict of arrays keyed t, o, h, l, c, v.
+    """
+    t, o, h, l, c, v = (np.asarray(col) for col in (t, o, h, l, c, v))
+    if points >= len(t):
+        return {'t': t, 'o': o, 'h': h, 'l': l, 'c': c, 'v': v}
+    starts = lttb_indices(t, c, points)
+    ends = np.append(starts[1:] - 1, len(t) - 1)
+    return {
+        't': t[starts],
+        'o': o[starts],
+        'h': np.maximum.reduceat(h, starts),
+        'l': np.minimum.reduceat(l, starts),
+        'c': c[ends],
+        'v': np.add.reduceat(v, starts)
+    }
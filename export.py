@@ -0,0 +1,119 @@
+"""
+Streaming export of the script generation history.
+
+Rows are read from scripts.db in small batches and turned into JSON-lines or
+CSV text chunk by chunk, optionally gzipped on the fly, so memory stays flat
+however many rows are exported. Used by the /api/export endpoint and runnable
+from the command line (python export.py --help).
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import zlib
+from datetime import datetime, timedelta
+
+from database import iter_generations
+
+EXPORT_FORMATS = ('jsonl', 'csv')
+EXPORT_FIELDS = ['id', 'symbol', 'period', 'timestamp', 'prompt_tokens', 'generation_seconds', 'script', 'prompt']
+
+# Text is handed to the gzip stream in chunks of about this many bytes
+CHUNK_BYTES = 64 * 1024
+
+
+def date_bounds(since=None, until=None):
+    """Turn YYYY-MM-DD dates into timestamp bounds; until is inclusive of its whole day."""
+    if since:
+        since = datetime.strptime(since, '%Y-%m-%d').isoformat()
+    if until:
+        until = (datetime.strptime(until, '%Y-%m-%d') + timedelta(days=1)).isoformat()
+    return since, until
+
+
+def export_lines(generations, fmt='jsonl', include_prompt=True):
+    """Yield one line of text per generation (after a CSV header row)."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    fields = EXPORT_FIELDS if include_prompt else [f for f in EXPORT_FIELDS if f != 'prompt']
+    if fmt == 'jsonl':
+        for generation in generations:
+            yield json.dumps({field: generation[field] for field in fields}) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for generation in generations:
+        writer.writerow([generation[field] for field in fields])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_chunks(lines, compress=False):
+    """Yield the lines as UTF-8 byte chunks of about CHUNK_BYTES, gzipped if compress."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            chunk = b''.join(pending)
+            pending, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b''.join(pending)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def export_generations(fmt='jsonl', compress=False, symbol=None, period=None, since=None, until=None,
+                       include_prompt=True):
+    """Stream an export of the matching generations as byte chunks."""
+    since, until = date_bounds(since, until)
+    generations = iter_generations(symbol=symbol, period=period, since=since, until=until)
+    return encode_chunks(export_lines(generations, fmt, include_prompt), compress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export script generation history as JSONL or CSV')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='jsonl', help='Output format')
+    parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+    parser.add_argument('--symbol', help='Only export this symbol')
+    parser.add_argument('--period', help='Only export this period (1mo, 3mo, 6mo, 1y)')
+    parser.add_argument('--since', help='Only export generations on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--until', help='Only export generations on or before this date (YYYY-MM-DD)')
+    parser.add_argument('--no-prompt', action='store_true', help='Leave out the prompts')
+    parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    args = parser.parse_args()
+
+    chunks = export_generations(
+        fmt=args.format,
+        compress=args.gzip,
+        symbol=args.symbol.upper() if args.symbol else None,
+        period=args.period,
+        since=args.since,
+        until=args.until,
+        include_prompt=not args.no_prompt
+    )
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Batch relevance and sentiment scoring for news headlines.
+
+A whole headline corpus is scored at once: recency decays exponentially with
+age, each source carries a weight, headlines that mention the ticker or the
+company name are boosted, and a finance word lexicon gives every headline a
+sentiment in [-1, 1]. Strongly worded headlines are treated as more
+informative than neutral ones. The best-scoring headlines go into the prompt.
+"""
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Relative weight of each signal in the final score
+SCORE_WEIGHTS = {
+    'recency': 1.0,
+    'mention': 1.0,
+    'sentiment': 0.5,
+}
+
+# Hours for a headline's recency signal to halve
+RECENCY_HALF_LIFE_HOURS = float(os.getenv('NEWS_RECENCY_HALF_LIFE_HOURS', '72'))
+
+# Multipliers for the outlets we see most; anything else counts as 1.0
+SOURCE_WEIGHTS = {
+    'reuters': 1.3,
+    'bloomberg': 1.3,
+    'the wall street journal': 1.2,
+    'wsj': 1.2,
+    'cnbc': 1.1,
+    'financial times': 1.2,
+    'marketwatch': 1.0,
+    'yahoo': 0.9,
+    'yahoo finance': 0.9,
+    'seekingalpha': 0.8,
+    'benzinga': 0.8,
+    'finnhub': 0.9,
+    'alpha vantage': 0.9,
+}
+
+# Small finance-oriented lexicon; words are matched whole and case-insensitively
+POSITIVE_WORDS = [
+    'beat', 'beats', 'surge', 'surges', 'soar', 'soars', 'jump', 'jumps', 'rally', 'rallies',
+    'gain', 'gains', 'rise', 'rises', 'record', 'upgrade', 'upgraded', 'outperform', 'strong',
+    'growth', 'profit', 'profits', 'raise', 'raises', 'raised', 'boost', 'boosts', 'bullish',
+    'expands', 'expansion', 'approval', 'approved', 'wins', 'win', 'partnership', 'buyback',
+    'dividend', 'exceeds', 'tops', 'rebound', 'rebounds', 'optimistic', 'breakthrough',
+]
+NEGATIVE_WORDS = [
+    'miss', 'misses', 'plunge', 'plunges', 'drop', 'drops', 'fall', 'falls', 'slump', 'slumps',
+    'tumble', 'tumbles', 'sink', 'sinks', 'loss', 'losses', 'downgrade', 'downgraded', 'weak',
+    'cut', 'cuts', 'lawsuit', 'sued', 'probe', 'investigation', 'recall', 'bearish', 'layoffs',
+    'warning', 'warns', 'decline', 'declines', 'fraud', 'fine', 'fined', 'halt', 'halted',
+    'bankruptcy', 'default', 'underperform', 'slowdown', 'concern', 'concerns', 'risk',
+]
+
+_POSITIVE_RE = r'\b(?:' + '|'.join(POSITIVE_WORDS) + r')\b'
+_NEGATIVE_RE = r'\b(?:' + '|'.join(NEGATIVE_WORDS) + r')\b'
+
+# Legal suffixes dropped from a company name before matching it in headlines
+_COMPANY_SUFFIX_RE = re.compile(
+    r'[\s,]+(?:inc|incorporated|corp|corporation|co|company|ltd|limited|plc|llc|holdings|group|sa|ag|nv)\.?$',
+    re.IGNORECASE
+)
+
+
+def company_aliases(company_name):
+    """Return the company name without legal suffixes, e.g. 'Apple Inc' -> 'Apple'."""
+    name = (company_name or '').strip()
+    while True:
+        stripped = _COMPANY_SUFFIX_RE.sub('', name).strip()
+        if stripped == name:
+            break
+        name = stripped
+    return name
+
+
+def sentiment_scores(titles):
+    """Score a Series of headlines from -1 (negative) to 1 (positive) with the word lexicon."""
+    lowered = titles.str.lower()
+    positive = lowered.str.count(_POSITIVE_RE).to_numpy(dtype=float)
+    negative = lowered.str.count(_NEGATIVE_RE).to_numpy(dtype=float)
+    return (positive - negative) / (positive + negative + 1)
+
+
+def score_news(titles, sources, timestamps, symbol, company_name=None, now=None, weights=None):
+    """Score a corpus of headlines at once; returns a dict of per-headline signal arrays and the score.
+
+    titles and sources are sequences of strings and timestamps are Unix
+    seconds, all the same length.
+    """
+    weights = weights or SCORE_WEIGHTS
+    titles = pd.Series(list(titles), dtype=object).fillna('').astype(str)
+    sources = pd.Series(list(sources), dtype=object).fillna('').astype(str).str.strip().str.lower()
+    timestamps = np.asarray(timestamps, dtype=float)
+    now = pd.Timestamp.now().timestamp() if now is None else now
+
+    age_hours = np.maximum(0.0, now - timestamps) / 3600
+    recency = np.exp2(-age_hours / RECENCY_HALF_LIFE_HOURS)
+
+    source_weight = sources.map(SOURCE_WEIGHTS).fillna(1.0).to_numpy(dtype=float)
+
+    # Tickers are matched case-sensitively so 'A' or 'ON' don't match ordinary words
+    mention = titles.str.contains(r'(?<![\w$])\$?' + re.escape(symbol.upper()) + r'\b', regex=True)
+    name = company_aliases(company_name)
+    if name and name.upper() != symbol.upper():
+        mention |= titles.str.contains(r'\b' + re.escape(name) + r'\b', case=False, regex=True)
+    mention = mention.to_numpy(dtype=float)
+
+    sentiment = sentiment_scores(titles)
+
+    score = source_weight * (weights['recency'] * recency
+                             + weights['mention'] * mention
+                             + weights['sentiment'] * np.abs(sentiment))
+    return {
+        'score': score,
+        'recency': recency,
+        'source_weight': source_weight,
+        'mention': mention,
+        'sentiment': sentiment,
+    }
+
+
+def rank_news(items, symbol, company_name=None, top=None, now=None, weights=None):
+    """Return news items (dicts with title, source and timestamp) best first.
+
+    Each returned item is a copy carrying its 'relevance' score and lexicon
+    'sentiment'. Ties go to the newer headline.
+    """
+    if not items:
+        return []
+    signals = score_news(
+        [item.get('title', '') for item in items],
+        [item.get('source', '') for item in items],
+        [item.get('timestamp', 0) for item in items],
+        symbol, company_name, now, weights
+    )
+    timestamps = np.array([item.get('timestamp', 0) for item in items], dtype=float)
+    order = np.lexsort((-timestamps, -signals['score']))
+    if top is not None:
+        order = order[:top]
+    return [
+        dict(items[idx],
+             relevance=round(float(signals['score'][idx]), 4),
+             sentiment=round(float(signals['sentiment'][idx]), 3))
+        for idx in order
+    ]
@@ -0,0 +1,115 @@
+"""
+Background prefetch scheduler that keeps watchlist quotes, profiles and news warm.
+
+The scheduler runs as a daemon thread inside the app process. It refreshes each
+watchlist symbol on a per-kind interval and spends at most a fixed number of
+provider calls per minute, leaving the rest of the quota to interactive requests.
+Every upstream call a refresh makes (a long news window fans out into many) is
+charged to that budget as well as to the shared Finnhub limiter.
+"""
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from quote_feed import live_quote
+from rate_limit import RateLimiter, charge_to
+
+logger = logging.getLogger(__name__)
+
+STOCKS_FILE = Path(__file__).parent / 'static' / 'stocks.json'
+
+DEFAULT_INTERVALS = {
+    'quote': 300,
+    'news': 900,
+    'profile': 86400,
+}
+
+
+def load_watchlist():
+    """Return the watchlist from PREFETCH_WATCHLIST, defaulting to static/stocks.json."""
+    configured = os.getenv('PREFETCH_WATCHLIST', '').strip()
+    if configured:
+        return [symbol.strip().upper() for symbol in configured.split(',') if symbol.strip()]
+    with open(STOCKS_FILE, 'r') as f:
+        return list(json.load(f).keys())
+
+
+def load_intervals():
+    """Return refresh intervals in seconds, overridable per kind via environment."""
+    return {
+        kind: int(os.getenv(f'PREFETCH_{kind.upper()}_INTERVAL', default))
+        for kind, default in DEFAULT_INTERVALS.items()
+    }
+
+
+class PrefetchScheduler(threading.Thread):
+    def __init__(self, generator, watchlist, intervals=None, calls_per_minute=30, news_days=365):
+        """Create a scheduler refreshing watchlist data through a StockScriptGenerator."""
+        super().__init__(name='prefetch-scheduler', daemon=True)
+        self.generator = generator
+        self.watchlist = watchlist
+        self.intervals = intervals or dict(DEFAULT_INTERVALS)
+        self.limiter = RateLimiter(calls_per_minute)
+        self.news_days = news_days
+        self._stop_event = threading.Event()
+        self._queue = []
+        self.last_refresh = {}
+
+        # Spread each kind's first refresh across its interval instead of bursting
+        now = time.monotonic()
+        for kind, interval in self.intervals.items():
+            spacing = min(interval, 60) / max(1, len(watchlist))
+            for idx, symbol in enumerate(watchlist):
+                heapq.heappush(self._queue, (now + idx * spacing, kind, symbol))
+
+    def stop(self):
+        self._stop_event.set()
+
+    def refresh(self, kind, symbol):
+        """Fetch one kind of data for a symbol; the generator stores it for later reads."""
+        if kind == 'quote':
+            # Symbols the live quote feed covers are kept current without REST calls
+            if live_quote(symbol) is not None:
+                return
+            self.generator.get_quote(symbol, refresh=True)
+        elif kind == 'profile':
+            self.generator.get_company_profile(symbol, refresh=True)
+        elif kind == 'news':
+            self.generator.get_finnhub_news(symbol, self.news_days, refresh=True)
+
+    def run(self):
+        logger.info(f"Prefetch scheduler started for {len(self.watchlist)} symbols")
+        while not self._stop_event.is_set() and self._queue:
+            due, kind, symbol = heapq.heappop(self._queue)
+            delay = due - time.monotonic()
+            if delay > 0 and self._stop_event.wait(delay):
+                break
+            try:
+                with charge_to(self.limiter):
+                    self.refresh(kind, symbol)
+                self.last_refresh[(kind, symbol)] = time.time()
+            except Exception as e:
+                logger.warning(f"Prefetch of {kind} for {symbol} failed: {str(e)}")
+            heapq.heappush(self._queue, (time.monotonic() + self.intervals[kind], kind, symbol))
+        logger.info("Prefetch scheduler stopped")
+
+
+def start_prefetch(generator=None):
+    """Start the prefetch scheduler configured from the environment and return it."""
+    if generator is None:
+        from stock_script_generator import StockScriptGenerator
+        generator = StockScriptGenerator()
+    scheduler = PrefetchScheduler(
+        generator,
+        load_watchlist(),
+        intervals=load_intervals(),
+        calls_per_minute=int(os.getenv('PREFETCH_CALLS_PER_MINUTE', '30')),
+        news_days=int(os.getenv('PREFETCH_NEWS_DAYS', '365'))
+    )
+    scheduler.start()
+    return scheduler
+
@@ -0,0 +1,324 @@
+"""
+Latency and quota probe for the providers script generation depends on.
+
+Each endpoint is called repeatedly, optionally from several threads at once,
+and the samples are summarized as latency percentiles, error and rate-limit
+(429) rates and the quota left according to the last response's headers.
+Reports are printed as JSON or in Prometheus text format, to help tune each
+provider's timeouts and concurrency.
+
+    python probe.py --samples 20 --concurrency 4
+    python probe.py --endpoints finnhub_quote,ollama --format prometheus
+
+API keys are sent in headers where the provider allows it and are redacted
+from error messages; they are never printed.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import numpy as np
+import requests
+from dotenv import load_dotenv
+
+from scrapers import DEFAULT_HEADERS, SCRAPER_SOURCES
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+
+PERCENTILES = (50, 90, 99)
+
+# Response headers that report the remaining request quota
+QUOTA_HEADERS = {
+    'limit': ('X-Ratelimit-Limit', 'X-RateLimit-Limit', 'RateLimit-Limit'),
+    'remaining': ('X-Ratelimit-Remaining', 'X-RateLimit-Remaining', 'RateLimit-Remaining'),
+    'reset': ('X-Ratelimit-Reset', 'X-RateLimit-Reset', 'RateLimit-Reset'),
+}
+
+
+@dataclass
+class Endpoint:
+    """One provider call to probe; build returns the keyword arguments for requests.request."""
+    name: str
+    provider: str
+    build: object
+    method: str = 'GET'
+    # Alpha Vantage signals its limit with a 200 and a note in the body
+    limited_in_body: tuple = ()
+    default: bool = True
+
+
+@dataclass
+class Sample:
+    latency: float
+    status: int = None
+    error: str = None
+    rate_limited: bool = False
+    quota: dict = field(default_factory=dict)
+
+
+def _finnhub(path, params):
+    def build(symbol):
+        return {
+            'url': f"https://finnhub.io/api/v1/{path}",
+            'params': params(symbol),
+            'headers': {'X-Finnhub-Token': os.getenv('FINNHUB_API_KEY', '').strip()}
+        }
+    return build
+
+
+def _news_window(symbol):
+    today = datetime.now()
+    return {
+        'symbol': symbol,
+        'from': (today - timedelta(days=7)).strftime('%Y-%m-%d'),
+        'to': today.strftime('%Y-%m-%d')
+    }
+
+
+def _candle_window(symbol):
+    now = int(time.time())
+    return {'symbol': symbol, 'resolution': 'D', 'from': now - 30 * 86400, 'to': now}
+
+
+def _alpha_vantage(symbol):
+    return {
+        'url': 'https://www.alphavantage.co/query',
+        'params': {
+            'function': 'NEWS_SENTIMENT',
+            'tickers': symbol,
+            'apikey': os.getenv('ALPHA_VANTAGE_API_KEY', 'demo'),
+            'limit': 10
+        }
+    }
+
+
+def _scraper(source):
+    def build(symbol):
+        return {'url': SCRAPER_SOURCES[source].url_for(symbol), 'headers': DEFAULT_HEADERS}
+    return build
+
+
+def _ollama_generate(symbol):
+    return {
+        'url': f"{OLLAMA_URL}/api/generate",
+        'json': {
+            'model': os.getenv('OLLAMA_MODEL', 'mistral'),
+            'prompt': f"One word about {symbol}.",
+            'stream': False,
+            'options': {'num_predict': 1}
+        }
+    }
+
+
+ENDPOINTS = {endpoint.name: endpoint for endpoint in [
+    Endpoint('finnhub_quote', 'finnhub', _finnhub('quote', lambda s: {'symbol': s})),
+    Endpoint('finnhub_profile', 'finnhub', _finnhub('stock/profile2', lambda s: {'symbol': s})),
+    Endpoint('finnhub_news', 'finnhub', _finnhub('company-news', _news_window)),
+    Endpoint('finnhub_candles', 'finnhub', _finnhub('stock/candle', _candle_window)),
+    Endpoint('alpha_vantage_news', 'alpha_vantage', _alpha_vantage, limited_in_body=('Note', 'Information')),
+    Endpoint('marketwatch', 'marketwatch', _scraper('marketwatch')),
+    Endpoint('reuters', 'reuters', _scraper('reuters')),
+    Endpoint('ollama', 'ollama', lambda symbol: {'url': f"{OLLAMA_URL}/api/tags"}),
+    # Loads the model and spends a token, so only probed when asked for
+    Endpoint('ollama_generate', 'ollama', _ollama_generate, method='POST', default=False),
+]}
+
+
+def _redact(message):
+    """Remove API keys and object addresses from an error message so equal errors group together."""
+    message = re.sub(r' at 0x[0-9a-f]+', '', message)
+    # Keys in request URLs, including ones passed explicitly rather than from the environment
+    message = re.sub(r'\b(token|apikey|api_key)=[^&\s\'")]+', r'\1=***', message, flags=re.IGNORECASE)
+    for name in ('FINNHUB_API_KEY', 'ALPHA_VANTAGE_API_KEY'):
+        secret = os.getenv(name, '').strip()
+        if secret:
+            message = message.replace(secret, '***')
+    return message
+
+
+def _quota(headers):
+    quota = {}
+    for key, names in QUOTA_HEADERS.items():
+        for name in names:
+            if name in headers:
+                try:
+                    quota[key] = float(headers[name])
+                except ValueError:
+                    pass
+                break
+    return quota
+
+
+def call_once(session, endpoint, symbol, timeout):
+    """Make one call to an endpoint and return its Sample."""
+    start = time.perf_counter()
+    try:
+        response = session.request(endpoint.method, timeout=timeout, **endpoint.build(symbol))
+        body = response.content
+        latency = time.perf_counter() - start
+    except requests.exceptions.RequestException as e:
+        return Sample(latency=time.perf_counter() - start, error=_redact(f"{type(e).__name__}: {str(e)}"))
+
+    rate_limited = response.status_code == 429
+    if endpoint.limited_in_body and response.ok:
+        try:
+            payload = json.loads(body)
+            rate_limited = isinstance(payload, dict) and any(key in payload for key in endpoint.limited_in_body)
+        except ValueError:
+            pass
+    error = None
+    if not response.ok:
+        error = f"HTTP {response.status_code}"
+    elif rate_limited:
+        error = 'rate limited'
+    return Sample(latency=latency, status=response.status_code, error=error,
+                  rate_limited=rate_limited, quota=_quota(response.headers))
+
+
+def probe_endpoint(endpoint, symbol='AAPL', samples=10, concurrency=1, interval=0.0, timeout=10):
+    """Call an endpoint `samples` times from `concurrency` threads and return its Sample list."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(concurrency, 1))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    def worker(count):
+        results = []
+        for idx in range(count):
+            if idx and interval:
+                time.sleep(interval)
+            results.append(call_once(session, endpoint, symbol, timeout))
+        return results
+
+    # Spread the samples over the workers as evenly as possible
+    shares = [samples // concurrency + (1 if i < samples % concurrency else 0) for i in range(concurrency)]
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return [sample for results in executor.map(worker, [s for s in shares if s]) for sample in results]
+    finally:
+        session.close()
+
+
+def summarize(endpoint, results, elapsed):
+    """Summarize an endpoint's samples into latency percentiles, error rates and quota."""
+    latencies = np.array([sample.latency for sample in results if sample.error is None])
+    count = len(results)
+    errors = sum(1 for sample in results if sample.error is not None)
+    limited = sum(1 for sample in results if sample.rate_limited)
+    statuses = {}
+    for sample in results:
+        key = str(sample.status) if sample.status is not None else 'error'
+        statuses[key] = statuses.get(key, 0) + 1
+    # Concurrent samples finish out of order, so the lowest remaining count is the latest
+    quota = {}
+    for sample in results:
+        for key, value in sample.quota.items():
+            quota[key] = min(quota[key], value) if key == 'remaining' and key in quota else value
+    error_messages = sorted({sample.error for sample in results if sample.error})[:5]
+    summary = {
+        'endpoint': endpoint.name,
+        'provider': endpoint.provider,
+        'samples': count,
+        'errors': errors,
+        'error_rate': round(errors / count, 3) if count else None,
+        'rate_limited': limited,
+        'rate_limited_rate': round(limited / count, 3) if count else None,
+        'statuses': statuses,
+        'throughput_per_second': round(count / elapsed, 2) if elapsed > 0 else None,
+        'latency_mean_ms': round(float(latencies.mean()) * 1000, 1) if latencies.size else None,
+        'latency_max_ms': round(float(latencies.max()) * 1000, 1) if latencies.size else None,
+        'quota': quota,
+        'error_messages': error_messages
+    }
+    for pct in PERCENTILES:
+        value = np.percentile(latencies, pct) * 1000 if latencies.size else None
+        summary[f'latency_p{pct}_ms'] = round(float(value), 1) if value is not None else None
+    return summary
+
+
+def run_probe(names=None, symbol='AAPL', samples=10, concurrency=1, interval=0.0, timeout=10):
+    """Probe the named endpoints (default: every default endpoint) one after another."""
+    names = names or [name for name, endpoint in ENDPOINTS.items() if endpoint.default]
+    reports = []
+    for name in names:
+        endpoint = ENDPOINTS[name]
+        logger.info(f"Probing {name}: {samples} samples, concurrency {concurrency}")
+        start = time.perf_counter()
+        results = probe_endpoint(endpoint, symbol, samples, concurrency, interval, timeout)
+        reports.append(summarize(endpoint, results, time.perf_counter() - start))
+    return reports
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def to_prometheus(reports):
+    """Render probe reports in the Prometheus text exposition format."""
+    metrics = [
+        ('provider_probe_requests_total', 'counter', 'Probe calls made', lambda r: [({}, r['samples'])]),
+        ('provider_probe_errors_total', 'counter', 'Probe calls that failed or were rate limited',
+         lambda r: [({}, r['errors'])]),
+        ('provider_probe_rate_limited_total', 'counter', 'Probe calls rejected by the provider rate limit',
+         lambda r: [({}, r['rate_limited'])]),
+        ('provider_probe_latency_seconds', 'summary', 'Latency of successful probe calls',
+         lambda r: [({'quantile': f"{pct / 100:g}"}, r[f'latency_p{pct}_ms'] / 1000)
+                    for pct in PERCENTILES if r[f'latency_p{pct}_ms'] is not None]),
+        ('provider_probe_quota_remaining', 'gauge', 'Requests left according to the provider headers',
+         lambda r: [({}, r['quota']['remaining'])] if 'remaining' in r['quota'] else []),
+        ('provider_probe_quota_limit', 'gauge', 'Request quota according to the provider headers',
+         lambda r: [({}, r['quota']['limit'])] if 'limit' in r['quota'] else []),
+    ]
+    lines = []
+    for name, kind, help_text, values in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for report in reports:
+            for extra, value in values(report):
+                labels = dict({'endpoint': report['endpoint'], 'provider': report['provider']}, **extra)
+                label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value:g}")
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure provider latency, error rates and quota')
+    parser.add_argument('--endpoints', help=f"Comma-separated endpoints (default: all but ollama_generate). "
+                                            f"Available: {', '.join(ENDPOINTS)}")
+    parser.add_argument('--symbol', default='AAPL', help='Symbol to request')
+    parser.add_argument('--samples', type=int, default=10, help='Calls per endpoint')
+    parser.add_argument('--concurrency', type=int, default=1, help='Concurrent calls per endpoint')
+    parser.add_argument('--interval', type=float, default=0.0, help='Seconds between calls on each thread')
+    parser.add_argument('--timeout', type=float, default=10, help='Per-call timeout in seconds')
+    parser.add_argument('--format', choices=('json', 'prometheus'), default='json', help='Output format')
+    parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    names = [name.strip() for name in args.endpoints.split(',')] if args.endpoints else None
+    unknown = [name for name in names or [] if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)}")
+
+    reports = run_probe(names, args.symbol.upper(), max(1, args.samples), max(1, args.concurrency),
+                        args.interval, args.timeout)
+    output = to_prometheus(reports) if args.format == 'prometheus' else json.dumps(reports, indent=2) + '\n'
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
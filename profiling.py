@@ -0,0 +1,87 @@
+"""
+Opt-in profiling of script generation runs.
+
+A profiled run executes under cProfile and stores the raw stats (loadable with
+pstats or snakeviz) plus a text summary under profiles/, keyed by a profile id.
+Work done on helper threads (parallel news chunks, concurrent LLM calls) shows
+up as wait time in the calling thread.
+"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import re
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROFILES_DIR = Path(__file__).parent / 'profiles'
+
+_PROFILE_ID_RE = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+def run_profiled(label, func, *args, **kwargs):
+    """Run func under cProfile and store the profile; returns (result, profile_id).
+
+    The profile is stored even if func raises.
+    """
+    PROFILES_DIR.mkdir(exist_ok=True)
+    safe_label = re.sub(r'[^A-Za-z0-9_-]+', '-', label).strip('-') or 'run'
+    profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{safe_label}_{uuid.uuid4().hex[:8]}"
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    error = None
+    try:
+        result = profiler.runcall(func, *args, **kwargs)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _store_profile(profile_id, label, profiler, elapsed, error)
+    return result, profile_id
+
+
+def _store_profile(profile_id, label, profiler, elapsed, error):
+    profiler.dump_stats(str(PROFILES_DIR / f"{profile_id}.prof"))
+
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats('cumulative').print_stats(40)
+    (PROFILES_DIR / f"{profile_id}.txt").write_text(summary.getvalue())
+
+    meta = {
+        'id': profile_id,
+        'label': label,
+        'created': datetime.utcnow().isoformat(),
+        'wall_seconds': round(elapsed, 3),
+        'error': str(error) if error else None
+    }
+    (PROFILES_DIR / f"{profile_id}.json").write_text(json.dumps(meta))
+    logger.info(f"Stored profile {profile_id} ({elapsed:.2f}s)")
+
+
+def list_profiles(limit=50):
+    """Return metadata for the most recent stored profiles, newest first."""
+    if not PROFILES_DIR.exists():
+        return []
+    metas = []
+    for path in sorted(PROFILES_DIR.glob('*.json'), reverse=True)[:limit]:
+        try:
+            metas.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return metas
+
+
+def profile_file(profile_id, fmt='prof'):
+    """Return the path of a stored profile file, or None if it does not exist."""
+    if fmt not in ('prof', 'txt') or not _PROFILE_ID_RE.match(profile_id):
+        return None
+    path = PROFILES_DIR / f"{profile_id}.{fmt}"
+    return path if path.exists() else None
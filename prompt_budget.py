@@ -0,0 +1,83 @@
+"""
+Token budgeting for script generation prompts.
+
+Estimates prompt size and trims the variable parts of a prompt (news lines and
+impact-table rows) so each template stays within its token budget.
+"""
+import logging
+import math
+import re
+
+logger = logging.getLogger(__name__)
+
+# Prompt token budgets per template, leaving the model's context for the script
+TEMPLATE_TOKEN_BUDGETS = {
+    'monthly_prompt.txt': 1200,
+    'long_term_prompt.txt': 2000,
+}
+DEFAULT_TOKEN_BUDGET = 1500
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Estimate the token count of text for a BPE-style tokenizer."""
+    if not text:
+        return 0
+    # Words and punctuation are roughly one token each; long words split further
+    pieces = _WORD_RE.findall(text)
+    return sum(max(1, math.ceil(len(piece) / 6)) for piece in pieces)
+
+
+def budget_for_template(template_name):
+    return TEMPLATE_TOKEN_BUDGETS.get(template_name, DEFAULT_TOKEN_BUDGET)
+
+
+def _row_magnitude(row):
+    """Absolute percentage move in a markdown impact-table row, 0 if none found."""
+    match = re.search(r"(-?\d+(?:\.\d+)?)%", row)
+    return abs(float(match.group(1))) if match else 0.0
+
+
+def select_within_budget(lines, ranks, budget):
+    """Keep the best-ranked lines that fit in budget tokens, preserving their original order."""
+    costs = [estimate_tokens(line) + 1 for line in lines]
+    keep = set()
+    used = 0
+    for idx in sorted(range(len(lines)), key=lambda i: ranks[i]):
+        if used + costs[idx] <= budget:
+            keep.add(idx)
+            used += costs[idx]
+    return [line for idx, line in enumerate(lines) if idx in keep], used
+
+
+def compact_impact_and_news(impact_table, news_lines, available_tokens):
+    """Trim impact-table rows and news lines to fit available_tokens.
+
+    News lines are expected in priority order. Table rows are ranked by the
+    size of their percentage move, and the header is always kept.
+    Returns (impact_table, news_lines, stats).
+    """
+    table_lines = [line for line in (impact_table or '').splitlines() if line.strip()]
+    header, rows = table_lines[:2], table_lines[2:]
+    header_cost = sum(estimate_tokens(line) + 1 for line in header)
+    news_lines = list(news_lines or [])
+
+    available = max(0, available_tokens - header_cost)
+    rows_cost = sum(estimate_tokens(row) + 1 for row in rows)
+    news_cost = sum(estimate_tokens(line) + 1 for line in news_lines)
+
+    if rows_cost + news_cost <= available:
+        kept_rows, kept_news = rows, news_lines
+    else:
+        # Price rows are the core of the script, but never let them starve the news entirely
+        rows_budget = max(available // 2, available - news_cost)
+        kept_rows, used = select_within_budget(rows, [-_row_magnitude(row) for row in rows], rows_budget)
+        kept_news, _ = select_within_budget(news_lines, list(range(len(news_lines))), available - used)
+
+    stats = {
+        'dropped_rows': len(rows) - len(kept_rows),
+        'dropped_news': len(news_lines) - len(kept_news)
+    }
+    table = '\n'.join(header + kept_rows) + '\n' if header else ''
+    return table, kept_news, stats
@@ -4,12 +4,62 @@ This module handles loading and formatting the script generation prompt.
 import logging
 import os
 from pathlib import Path
+from prompt_budget import estimate_tokens, budget_for_template, compact_impact_and_news
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Parts of a sectioned script, in order: (title, instructions, word budget)
+SCRIPT_SECTIONS = {
+    'monthly': [
+        ('Introduction', 'Open the video and briefly introduce the company and what it does.', 50),
+        ('Price Action', 'Explain the price movement, trading range and volatility over the period.', 80),
+        ('News and Drivers', 'Analyze the key news and factors that affected the stock.', 70),
+        ('Takeaways', 'Give actionable takeaways for investors and close the video.', 50),
+    ],
+    'long_term': [
+        ('Introduction', 'Open the video with a company overview and its sector context.', 90),
+        ('Price Trends', 'Analyze the long-term price trends, trading range, volume and volatility patterns.', 160),
+        ('Events and Drivers', 'Discuss the major events, news and technical and fundamental factors and their market impact.', 130),
+        ('Outlook', 'Give a balanced perspective on the future outlook, then close with actionable insights for investors.', 120),
+    ],
+}
+
 class PromptLoader:
+    @staticmethod
+    def template_name(period):
+        """Return the template file name used for a time period."""
+        return 'monthly_prompt.txt' if period == '1mo' else 'long_term_prompt.txt'
+
+    @staticmethod
+    def sections_for(period):
+        """Return the (title, instructions, word budget) sections used for a time period."""
+        return SCRIPT_SECTIONS['monthly' if period == '1mo' else 'long_term']
+    
+    @staticmethod
+    def create_section_prompts(period, prompt_params):
+        """Create one prompt per script section, sharing the data header of the full prompt.
+        
+        prompt_params are the parameters returned by render_prompt, so the
+        sections see the same trimmed impact table and news. Returns a list of
+        dicts with title, prompt and words, in script order.
+        """
+        template = (Path(__file__).parent / 'prompts' / 'section_prompt.txt').read_text()
+        sections = PromptLoader.sections_for(period)
+        return [{
+            'title': title,
+            'words': words,
+            'prompt': template.format(**dict(
+                prompt_params,
+                section_count=len(sections),
+                section_number=number,
+                section_title=title,
+                section_instructions=instructions,
+                section_words=words
+            ))
+        } for number, (title, instructions, words) in enumerate(sections, start=1)]
+    
     @staticmethod
     def load_prompt_template(period):
         """Load the appropriate prompt template based on the time period."""
@@ -21,10 +71,7 @@ class PromptLoader:
         prompts_dir.mkdir(exist_ok=True)
         
         # Determine template file path
-        if period == '1mo':
-            template_file = prompts_dir / 'monthly_prompt.txt'
-        else:
-            template_file = prompts_dir / 'long_term_prompt.txt'
+        template_file = prompts_dir / PromptLoader.template_name(period)
         
         try:
             # Check if template file exists
@@ -39,8 +86,19 @@ class PromptLoader:
             raise
     
     @staticmethod
-    def create_prompt(company_name, symbol, period, analysis, impact_table, additional_metrics=None):
-        """Create the final prompt by formatting the template with the data"""
+    def create_prompt(company_name, symbol, period, analysis, impact_table, additional_metrics=None, news=None, token_budget=None):
+        """Create the final prompt by formatting the template with the data."""
+        return PromptLoader.render_prompt(company_name, symbol, period, analysis, impact_table,
+                                          additional_metrics, news, token_budget)[0]
+    
+    @staticmethod
+    def render_prompt(company_name, symbol, period, analysis, impact_table, additional_metrics=None, news=None, token_budget=None):
+        """Create the final prompt, returning (prompt, template, params).
+        
+        News lines (most important first) and impact-table rows are trimmed so
+        the prompt fits the template's token budget. template.format(**params)
+        reproduces the prompt, so it can be stored as its parameters.
+        """
         template = PromptLoader.load_prompt_template(period)
         
         # Extract the first analysis if it's a list
@@ -58,25 +116,35 @@ class PromptLoader:
             'low': analysis['day_low'],
             'volatility': f"{analysis['range_percent']:.2f}%",
             'volume_trend': 'average',  # Default value since we don't have volume data
-            'impact_table': impact_table
+            'impact_table': impact_table,
+            'news_items': ''
         }
         
-        # Add additional metrics for long-term analysis if available
-        if additional_metrics:
-            prompt_params.update({
-                'avg_daily_volume': additional_metrics.get('avg_daily_volume', 'N/A'),
-                'avg_daily_range': additional_metrics.get('avg_daily_range', 'N/A'),
-                'high_volume_days': additional_metrics.get('high_volume_days', 'N/A')
-            })
+        # Add additional metrics for long-term analysis, N/A when unavailable
+        additional_metrics = additional_metrics or {}
+        prompt_params.update({
+            'avg_daily_volume': additional_metrics.get('avg_daily_volume', 'N/A'),
+            'avg_daily_range': additional_metrics.get('avg_daily_range', 'N/A'),
+            'high_volume_days': additional_metrics.get('high_volume_days', 'N/A')
+        })
         
         # Create the prompt by replacing placeholders
         try:
+            # Fit the impact table and news into what the fixed parts of the template leave over
+            budget = token_budget or budget_for_template(PromptLoader.template_name(period))
+            base_tokens = estimate_tokens(template.format(**dict(prompt_params, impact_table='')))
+            impact_table, news_lines, stats = compact_impact_and_news(impact_table, news, budget - base_tokens)
+            if stats['dropped_rows'] or stats['dropped_news']:
+                logger.info(f"Trimmed prompt to {budget} tokens: dropped {stats['dropped_rows']} impact rows and {stats['dropped_news']} news items")
+            prompt_params['impact_table'] = impact_table
+            prompt_params['news_items'] = '\n'.join(f"- {line}" for line in news_lines) or 'No recent news available'
+            
             logger.info(f"Formatting prompt with parameters: {prompt_params}")
             prompt = template.format(**prompt_params)
             
             # Log the final prompt with all variables
             logger.info("\n=== FINAL PROMPT WITH VARIABLES ===")
-            logger.info("Template File: %s", 'prompts/monthly_prompt.txt' if period == '1mo' else 'prompts/long_term_prompt.txt')
+            logger.info("Template File: prompts/%s", PromptLoader.template_name(period))
             logger.info("\nVariables:")
             for key, value in prompt_params.items():
                 if key == 'impact_table':
@@ -88,7 +156,7 @@ class PromptLoader:
             logger.info(prompt)
             logger.info("=== END OF PROMPT ===\n")
             
-            return prompt
+            return prompt, template, prompt_params
         except KeyError as e:
             logger.error(f"Missing key in prompt parameters: {e}")
             raise
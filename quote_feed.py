@@ -0,0 +1,262 @@
+"""
+Push-based quote feed over the Finnhub trade WebSocket.
+
+The feed runs an asyncio loop in a daemon thread, subscribes to the watchlist
+and folds every trade into the symbol's last quote: price, day high/low and
+change against the previous close. Updated quotes are written to the shared
+data cache, so get_quote serves them as memory reads, and are kept in the
+feed's own table for quiet symbols whose cache entry has expired.
+
+A quote needs a REST baseline (open and previous close) before trades can be
+applied to it; the feed seeds missing baselines itself, within a small call
+budget. Dropped connections are retried with exponential backoff and jitter.
+FINNHUB_WS_URL points the feed at a local stand-in (see tests/ws_stand_in.py).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+import aiohttp
+
+from cache import data_cache
+from rate_limit import RateLimiter, charge_to
+
+logger = logging.getLogger(__name__)
+
+FINNHUB_WS_URL = os.getenv('FINNHUB_WS_URL', 'wss://ws.finnhub.io')
+
+# The feed that get_quote reads from, set by start_quote_feed
+active_feed = None
+
+
+def apply_trade(quote, price, trade_ts):
+    """Return a copy of quote updated with one trade at price, Unix seconds trade_ts."""
+    updated = dict(quote)
+    if quote.get('t') and datetime.fromtimestamp(trade_ts).date() > datetime.fromtimestamp(quote['t']).date():
+        # First trade of a new session: yesterday's close becomes the baseline
+        updated.update(o=price, h=price, l=price, pc=quote['c'])
+    updated['c'] = price
+    updated['h'] = max(updated.get('h') or price, price)
+    updated['l'] = min(updated.get('l') or price, price)
+    if updated.get('pc'):
+        updated['d'] = round(price - updated['pc'], 4)
+        updated['dp'] = round((price - updated['pc']) / updated['pc'] * 100, 4)
+    updated['t'] = int(trade_ts)
+    return updated
+
+
+class QuoteFeed(threading.Thread):
+    def __init__(self, generator, symbols, url=None, token=None, quote_ttl=None, seed_calls_per_minute=30,
+                 initial_backoff=1, max_backoff=60):
+        """Create a feed for symbols that seeds baselines through a StockScriptGenerator."""
+        super().__init__(name='quote-feed', daemon=True)
+        self.generator = generator
+        self.symbols = list(symbols)
+        self.url = url or FINNHUB_WS_URL
+        self.token = token if token is not None else getattr(generator, 'finnhub_token', '')
+        self.quote_ttl = quote_ttl or getattr(generator, 'quote_ttl', 360)
+        self.seed_limiter = RateLimiter(seed_calls_per_minute)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.quotes = {}
+        # When each symbol's quote last changed, by seeding or a trade
+        self.received_at = {}
+        self.connected = False
+        self.connected_at = None
+        self.last_message_at = None
+        self.reconnects = 0
+        self.trades = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._loop = None
+        self._ws = None
+        self._seeding = None
+
+    def stop(self):
+        self._stop_event.set()
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+
+    def live_quote(self, symbol):
+        """Return the feed's current quote for symbol, or None if it can't vouch for one.
+
+        A quote that hasn't changed for quote_ttl seconds (a symbol that
+        doesn't trade, or the market is closed) is no fresher than a REST
+        quote would be, so it is left to the REST refresh.
+        """
+        if not self.connected:
+            return None
+        with self._lock:
+            quote = self.quotes.get(symbol)
+            received_at = self.received_at.get(symbol)
+        if not quote or time.time() - received_at > self.quote_ttl:
+            return None
+        return dict(quote)
+
+    def seed(self, symbol, quote):
+        """Use a REST quote as the baseline for a symbol's trades."""
+        if quote and quote.get('c'):
+            with self._lock:
+                self.quotes[symbol] = dict(quote)
+                self.received_at[symbol] = time.time()
+
+    def apply_trades(self, trades):
+        """Fold a batch of Finnhub trades ({s, p, t, v}) into the quote table and the cache."""
+        latest = {}
+        for trade in trades:
+            symbol, price, ts = trade.get('s'), trade.get('p'), trade.get('t')
+            if symbol and price and ts:
+                latest.setdefault(symbol, []).append((ts / 1000, float(price)))
+        with self._lock:
+            for symbol, ticks in latest.items():
+                key = f"quote:{symbol}"
+                # A REST refresh in the cache is at least as good as our own copy
+                quote = data_cache.get(key) or self.quotes.get(symbol)
+                if quote is None:
+                    continue
+                for ts, price in sorted(ticks):
+                    quote = apply_trade(quote, price, ts)
+                self.quotes[symbol] = quote
+                self.received_at[symbol] = time.time()
+                data_cache.set(key, quote, ttl=self.quote_ttl)
+                self.trades += len(ticks)
+
+    def handle_message(self, data):
+        message = json.loads(data)
+        self.last_message_at = time.time()
+        if message.get('type') == 'trade':
+            self.apply_trades(message.get('data') or [])
+        elif message.get('type') == 'error':
+            logger.warning(f"Quote feed error message: {message.get('msg')}")
+
+    def seed_missing(self):
+        """Fetch REST baselines for subscribed symbols that have none, within the seed budget."""
+        for symbol in self.symbols:
+            if self._stop_event.is_set():
+                return
+            with self._lock:
+                seeded = symbol in self.quotes
+            if seeded:
+                continue
+            try:
+                with charge_to(self.seed_limiter):
+                    self.seed(symbol, self.generator.get_quote(symbol))
+            except Exception as e:
+                logger.warning(f"Quote feed could not seed {symbol}: {str(e)}")
+
+    async def _listen(self, session):
+        # Finnhub only accepts the token in the query string; keep it out of the URL we might log
+        params = {'token': self.token} if self.token else None
+        async with session.ws_connect(self.url, params=params, heartbeat=30) as ws:
+            self._ws = ws
+            for symbol in self.symbols:
+                await ws.send_str(json.dumps({'type': 'subscribe', 'symbol': symbol}))
+            self.connected = True
+            self.connected_at = time.time()
+            logger.info(f"Quote feed connected, subscribed to {len(self.symbols)} symbols")
+            # Baselines come over REST, so fetch them without holding up the socket
+            if self._seeding is None or self._seeding.done():
+                self._seeding = asyncio.get_running_loop().run_in_executor(None, self.seed_missing)
+            try:
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        self.handle_message(msg.data)
+                    elif msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSED):
+                        break
+            finally:
+                self.connected = False
+                self._ws = None
+
+    async def _run(self):
+        backoff = self.initial_backoff
+        async with aiohttp.ClientSession() as session:
+            while not self._stop_event.is_set():
+                started = time.monotonic()
+                try:
+                    await self._listen(session)
+                except Exception as e:
+                    # Handshake errors embed the request URL, token included, so log only the type
+                    logger.warning(f"Quote feed connection to {self.url} failed: {type(e).__name__}")
+                # Only a connection that stayed up resets the backoff
+                if time.monotonic() - started > self.max_backoff:
+                    backoff = self.initial_backoff
+                if self._stop_event.is_set():
+                    break
+                self.reconnects += 1
+                delay = backoff * random.uniform(0.5, 1.0)
+                logger.info(f"Quote feed reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                backoff = min(self.max_backoff, backoff * 2)
+
+    def run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+        logger.info("Quote feed stopped")
+
+    def status(self):
+        return {
+            'connected': self.connected,
+            'connected_at': self.connected_at,
+            'last_message_at': self.last_message_at,
+            'reconnects': self.reconnects,
+            'trades': self.trades,
+            'symbols': len(self.symbols),
+            'seeded': len(self.quotes)
+        }
+
+
+def live_quote(symbol):
+    """Return the running feed's quote for symbol, or None without a connected feed."""
+    return active_feed.live_quote(symbol) if active_feed is not None else None
+
+
+def start_quote_feed(generator=None, symbols=None):
+    """Start the quote feed configured from the environment and return it."""
+    global active_feed
+    from prefetch import load_watchlist
+    if generator is None:
+        from stock_script_generator import StockScriptGenerator
+        generator = StockScriptGenerator()
+    symbols = symbols or load_watchlist()
+    # Finnhub's free plan allows 50 WebSocket subscriptions
+    max_symbols = int(os.getenv('QUOTE_FEED_MAX_SYMBOLS', '50'))
+    if len(symbols) > max_symbols:
+        logger.warning(f"Quote feed limited to the first {max_symbols} of {len(symbols)} symbols")
+        symbols = symbols[:max_symbols]
+    active_feed = QuoteFeed(
+        generator,
+        symbols,
+        seed_calls_per_minute=int(os.getenv('QUOTE_FEED_SEED_CALLS_PER_MINUTE', '30'))
+    )
+    active_feed.start()
+    return active_feed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream live quotes for a watchlist')
+    parser.add_argument('--symbols', help='Comma-separated symbols (default: the watchlist)')
+    parser.add_argument('--interval', type=float, default=5, help='Seconds between printed snapshots')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    symbols = [s.strip().upper() for s in args.symbols.split(',')] if args.symbols else None
+    feed = start_quote_feed(symbols=symbols)
+    try:
+        while True:
+            time.sleep(args.interval)
+            print(json.dumps({'status': feed.status(), 'quotes': {s: feed.live_quote(s) for s in feed.symbols}}))
+    except KeyboardInterrupt:
+        feed.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Token-bucket rate limiting for provider API calls.
+
+Every Finnhub call takes a token from the shared finnhub_limiter. Background
+jobs that must stay within a smaller share of the quota wrap their work in
+charge_to(limiter), so each call they make is also charged to that budget.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RateLimiter:
+    def __init__(self, calls_per_minute, burst=None):
+        """Allow calls_per_minute on average, with bursts of up to burst calls."""
+        self.rate = calls_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1, calls_per_minute // 6)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self):
+        """Take a token if one is available right now."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def refund(self):
+        """Return a token taken for a call that was never made."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def acquire(self, timeout=None):
+        """Block until a token is available; return False if timeout passes first."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout=None):
+        """Like acquire, but waits without blocking the event loop."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while not self.try_acquire():
+            with self._lock:
+                wait = max(0.01, (1 - self.tokens) / self.rate)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+        return True
+
+
+# Shared by every thread calling Finnhub; the free tier allows 60 calls per minute
+finnhub_limiter = RateLimiter(int(os.getenv('FINNHUB_CALLS_PER_MINUTE', '60')))
+
+# Extra budgets the current task's Finnhub calls are charged to
+_charged_budgets = contextvars.ContextVar('charged_budgets', default=())
+
+
+@contextmanager
+def charge_to(limiter):
+    """Charge every Finnhub call made inside the block to limiter as well as the shared budget."""
+    token = _charged_budgets.set(_charged_budgets.get() + (limiter,))
+    try:
+        yield
+    finally:
+        _charged_budgets.reset(token)
+
+
+def acquire_finnhub(timeout=30):
+    """Take a token for one Finnhub call from every budget it is charged to.
+
+    If any budget times out, the tokens already taken are refunded, since
+    the call won't be made.
+    """
+    taken = []
+    # Narrower budgets first, so waiting on them doesn't hold a shared token
+    for limiter in _charged_budgets.get() + (finnhub_limiter,):
+        if not limiter.acquire(timeout=timeout):
+            for held in taken:
+                held.refund()
+            return False
+        taken.append(limiter)
+    return True
+
+
+async def acquire_finnhub_async(timeout=30):
+    """Like acquire_finnhub, but waits without blocking the event loop."""
+    taken = []
+    for limiter in _charged_budgets.get() + (finnhub_limiter,):
+        if not await limiter.acquire_async(timeout=timeout):
+            for held in taken:
+                held.refund()
+            return False
+        taken.append(limiter)
+    return True
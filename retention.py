@@ -0,0 +1,148 @@
+"""
+Retention for the script generation history in scripts.db.
+
+Generations outside the retention policy are streamed, in small batches, to
+gzipped JSON-lines archive files and deleted. Freed pages are then returned
+to the filesystem with incremental vacuum steps, so writers are never blocked
+for more than one short transaction.
+
+Run once from the command line (python retention.py --help) or as a daemon
+thread in the app with RETENTION_ENABLED=true.
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from database import expired_generation_ids, get_generations_by_ids, delete_generations, incremental_vacuum
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path(os.getenv('RETENTION_ARCHIVE_DIR', Path(__file__).parent / 'archive'))
+
+
+def _optional_int(name):
+    value = os.getenv(name, '').strip()
+    return int(value) if value else None
+
+
+def load_policy():
+    """Return the retention policy from the environment; unset values keep nothing."""
+    return {
+        'keep_last': _optional_int('RETENTION_KEEP_LAST'),
+        'max_age_days': _optional_int('RETENTION_MAX_AGE_DAYS'),
+    }
+
+
+def run_retention(keep_last=None, max_age_days=None, archive=True, dry_run=False,
+                  batch_size=200, pause=0.05, vacuum_pages=200):
+    """Archive and delete generations outside the policy, then vacuum in small steps.
+
+    Returns a dict with the number of rows expired, the archive file (if any)
+    and the free pages left after vacuuming.
+    """
+    stats = {'expired': 0, 'archive': None, 'free_pages': None}
+    archive_file = None
+    try:
+        while True:
+            ids = expired_generation_ids(keep_last, max_age_days, limit=batch_size)
+            if not ids:
+                break
+            if dry_run:
+                # Nothing is deleted, so count the whole backlog in one go
+                stats['expired'] = len(expired_generation_ids(keep_last, max_age_days, limit=-1))
+                return stats
+            if archive:
+                if archive_file is None:
+                    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+                    path = ARCHIVE_DIR / f"generations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl.gz"
+                    archive_file = gzip.open(path, 'at', encoding='utf-8')
+                    stats['archive'] = str(path)
+                for generation in get_generations_by_ids(ids):
+                    archive_file.write(json.dumps(generation) + '\n')
+                # Rows are only deleted once they are safely in the archive
+                archive_file.flush()
+            stats['expired'] += delete_generations(ids)
+            time.sleep(pause)
+    finally:
+        if archive_file is not None:
+            archive_file.close()
+
+    if not dry_run:
+        stats['free_pages'] = vacuum(vacuum_pages, pause)
+    if stats['expired']:
+        logger.info(f"Retention expired {stats['expired']} generations (archive: {stats['archive']})")
+    return stats
+
+
+def vacuum(pages=200, pause=0.05):
+    """Release all free pages, `pages` at a time; returns the free pages left."""
+    remaining = incremental_vacuum(pages)
+    while remaining:
+        time.sleep(pause)
+        left = incremental_vacuum(pages)
+        if left >= remaining:
+            break
+        remaining = left
+    return remaining
+
+
+class RetentionTask(threading.Thread):
+    def __init__(self, policy, interval=86400):
+        """Create a daemon thread that applies the retention policy every `interval` seconds."""
+        super().__init__(name='retention', daemon=True)
+        self.policy = policy
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        logger.info(f"Retention task started with policy {self.policy}")
+        while not self._stop_event.is_set():
+            try:
+                run_retention(**self.policy)
+            except Exception as e:
+                logger.error(f"Retention run failed: {str(e)}")
+            self._stop_event.wait(self.interval)
+
+
+def start_retention():
+    """Start the background retention task configured from the environment, if any policy is set."""
+    policy = load_policy()
+    if policy['keep_last'] is None and policy['max_age_days'] is None:
+        logger.info("Retention enabled but no policy set; not starting")
+        return None
+    task = RetentionTask(policy, interval=int(os.getenv('RETENTION_INTERVAL', '86400')))
+    task.start()
+    return task
+
+
+def main():
+    policy = load_policy()
+    parser = argparse.ArgumentParser(description='Archive and delete old script generations')
+    parser.add_argument('--keep-last', type=int, default=policy['keep_last'],
+                        help='Keep the newest N generations per symbol and period')
+    parser.add_argument('--max-age-days', type=int, default=policy['max_age_days'],
+                        help='Keep every generation younger than this many days')
+    parser.add_argument('--no-archive', action='store_true', help='Delete without writing an archive file')
+    parser.add_argument('--dry-run', action='store_true', help='Only report how many generations would expire')
+    parser.add_argument('--vacuum-only', action='store_true', help='Only release free pages')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.vacuum_only:
+        print(f"Free pages left: {vacuum()}")
+        return
+    stats = run_retention(args.keep_last, args.max_age_days, archive=not args.no_archive, dry_run=args.dry_run)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
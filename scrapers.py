@@ -0,0 +1,196 @@
+"""
+Partial-page HTML scraping for the news sources that have no API.
+
+Each source describes where its article cards live. The engine streams the
+response body, stops reading once enough cards have arrived, and parses only
+the card subtrees (via a SoupStrainer) with the fastest available parser.
+"""
+import argparse
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml  # noqa: F401
+    FAST_PARSER = 'lxml'
+except ImportError:
+    FAST_PARSER = None
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
+}
+
+
+@dataclass
+class ScraperConfig:
+    """Where to find article cards on a source's page and how to parse them."""
+    name: str
+    url_template: str
+    card_tag: str
+    card_attrs: dict
+    # Raw bytes that open every card; used to stop streaming early
+    card_marker: bytes
+    title_tag: str
+    title_attrs: dict
+    time_tag: str
+    time_attrs: dict = field(default_factory=dict)
+    parser: str = 'lxml'
+    max_cards: int = 10
+    chunk_size: int = 64 * 1024
+    max_bytes: int = 4 * 1024 * 1024
+    timeout: int = 10
+
+    def url_for(self, symbol):
+        return self.url_template.format(lower=symbol.lower(), upper=symbol.upper())
+
+
+SCRAPER_SOURCES = {
+    'marketwatch': ScraperConfig(
+        name='MarketWatch',
+        url_template='https://www.marketwatch.com/investing/stock/{lower}',
+        card_tag='div',
+        card_attrs={'class': 'article__content'},
+        # The bare class name also occurs in variants (article__content--promo), counting a card twice
+        card_marker=b'class="article__content',
+        title_tag='a',
+        title_attrs={'class': 'link'},
+        time_tag='span',
+        time_attrs={'class': 'article__timestamp'},
+    ),
+    'reuters': ScraperConfig(
+        name='Reuters',
+        url_template='https://www.reuters.com/companies/{upper}.O',
+        card_tag='div',
+        card_attrs={'data-testid': 'MediaStoryCard'},
+        card_marker=b'data-testid="MediaStoryCard"',
+        title_tag='a',
+        title_attrs={'data-testid': 'Heading'},
+        time_tag='time',
+    ),
+}
+
+
+def resolve_parser(preferred):
+    """Return the preferred parser if it is installed, otherwise html.parser."""
+    if preferred == 'lxml' and FAST_PARSER is None:
+        return 'html.parser'
+    return preferred
+
+
+def stream_until_cards(response, config):
+    """Read the response body only until max_cards complete cards are buffered."""
+    buffer = bytearray()
+    # A card is complete once the next one starts, so wait for one extra marker
+    wanted = config.max_cards + 1
+    seen = 0
+    search_from = 0
+    try:
+        for chunk in response.iter_content(chunk_size=config.chunk_size):
+            if not chunk:
+                continue
+            buffer.extend(chunk)
+            pos = buffer.find(config.card_marker, search_from)
+            while pos != -1 and seen < wanted:
+                seen += 1
+                search_from = pos + 1
+                pos = buffer.find(config.card_marker, search_from)
+            if seen >= wanted:
+                logger.info(f"{config.name}: found {config.max_cards} cards after {len(buffer)} bytes, stopping read")
+                break
+            # Keep a marker split across chunks findable on the next pass
+            search_from = max(search_from, len(buffer) - len(config.card_marker) + 1)
+            if len(buffer) >= config.max_bytes:
+                logger.info(f"{config.name}: reached {config.max_bytes} byte limit, stopping read")
+                break
+    finally:
+        response.close()
+    encoding = response.encoding or 'utf-8'
+    return bytes(buffer).decode(encoding, errors='replace')
+
+
+def strainer_attrs(attrs):
+    """Make class values match any one of an element's classes, as find_all does.
+    
+    A SoupStrainer compares the whole class attribute, so on its own it would
+    drop cards that carry an extra class.
+    """
+    return {
+        name: re.compile(rf'(?:^|\s){re.escape(value)}(?:\s|$)') if name == 'class' and isinstance(value, str) else value
+        for name, value in attrs.items()
+    }
+
+
+def parse_cards(html, config):
+    """Parse only the card subtrees of an HTML document."""
+    strainer = SoupStrainer(config.card_tag, attrs=strainer_attrs(config.card_attrs))
+    soup = BeautifulSoup(html, resolve_parser(config.parser), parse_only=strainer)
+    return soup.find_all(config.card_tag, attrs=config.card_attrs, limit=config.max_cards)
+
+
+def fetch_html(config, symbol, session=None):
+    """Stream a source page for a symbol, stopping once enough cards are read."""
+    http = session or requests
+    response = http.get(config.url_for(symbol), headers=DEFAULT_HEADERS, timeout=config.timeout, stream=True)
+    response.raise_for_status()
+    return stream_until_cards(response, config)
+
+
+def card_fields(card, config):
+    """Return the (title, time) elements of a card, either may be None."""
+    title_elem = card.find(config.title_tag, attrs=config.title_attrs)
+    time_elem = card.find(config.time_tag, attrs=config.time_attrs)
+    return title_elem, time_elem
+
+
+def benchmark(source, paths, repeat=20):
+    """Compare a full html.parser tree against the strained parse on saved pages."""
+    config = SCRAPER_SOURCES[source]
+    for path in paths:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        html = raw.decode('utf-8', errors='replace')
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            soup = BeautifulSoup(html, 'html.parser')
+            full_cards = soup.find_all(config.card_tag, attrs=config.card_attrs)[:config.max_cards]
+        full_ms = (time.perf_counter() - start) * 1000 / repeat
+
+        # Simulate the early stop on the saved body
+        marker_positions = []
+        pos = raw.find(config.card_marker)
+        while pos != -1 and len(marker_positions) <= config.max_cards:
+            marker_positions.append(pos)
+            pos = raw.find(config.card_marker, pos + 1)
+        cutoff = marker_positions[config.max_cards] if len(marker_positions) > config.max_cards else len(raw)
+        partial = raw[:min(cutoff, config.max_bytes)].decode('utf-8', errors='replace')
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            cards = parse_cards(partial, config)
+        fast_ms = (time.perf_counter() - start) * 1000 / repeat
+
+        print(f"{path}: {len(raw)} bytes, read {len(partial)} chars, parser={resolve_parser(config.parser)}")
+        print(f"  full parse:     {full_ms:8.2f} ms ({len(full_cards)} cards)")
+        print(f"  strained parse: {fast_ms:8.2f} ms ({len(cards)} cards)")
+        if fast_ms > 0:
+            print(f"  speedup:        {full_ms / fast_ms:8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark news scrapers on saved HTML pages')
+    parser.add_argument('source', choices=sorted(SCRAPER_SOURCES), help='Scraper source configuration')
+    parser.add_argument('paths', nargs='+', help='Saved HTML files for the source')
+    parser.add_argument('--repeat', type=int, default=20, help='Parses per file')
+    args = parser.parse_args()
+    benchmark(args.source, args.paths, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
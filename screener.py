@@ -0,0 +1,235 @@
+"""
+Market screener that picks which symbols deserve a video today.
+
+Quotes and daily candles for the whole universe are ingested through the
+shared cache within a calls-per-minute budget, packed into a columnar table
+of NumPy arrays (one row per symbol, one column per trading day), and scored
+with array operations: today's move against each symbol's own volatility,
+volume against its median, and the day's range against its median range.
+The ranked candidates can be handed straight to batch script generation.
+
+Ingestion costs up to two provider calls per symbol that isn't cached, each
+drawn from the shared Finnhub budget (rate_limit.finnhub_limiter) like every
+other caller's, so a universe of thousands is rate-limit bound; scoring it
+takes milliseconds.
+"""
+import argparse
+import json
+import logging
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from circuit_breaker import get_breaker
+from prefetch import load_watchlist
+
+logger = logging.getLogger(__name__)
+
+# Relative weight of each signal in the final score
+SCORE_WEIGHTS = {
+    'move': 1.0,
+    'volume': 1.5,
+    'range': 1.0,
+}
+
+# Signals are capped so one extreme value (e.g. a near-zero median) can't dominate
+MAX_MOVE_Z = 10.0
+MAX_RATIO = 20.0
+
+
+def load_universe():
+    """Return the symbols to screen from SCREENER_UNIVERSE, defaulting to the prefetch watchlist."""
+    configured = os.getenv('SCREENER_UNIVERSE', '').strip()
+    if configured:
+        return [symbol.strip().upper() for symbol in configured.split(',') if symbol.strip()]
+    return load_watchlist()
+
+
+@dataclass
+class ScreenerTable:
+    """Columnar market data for a universe; 2-D arrays are (symbol, day), right-aligned, NaN-padded."""
+    symbols: np.ndarray
+    price: np.ndarray
+    change_pct: np.ndarray
+    day_high: np.ndarray
+    day_low: np.ndarray
+    closes: np.ndarray
+    highs: np.ndarray
+    lows: np.ndarray
+    volumes: np.ndarray
+
+    @classmethod
+    def from_snapshots(cls, snapshots, lookback_bars):
+        """Build a table from {symbol: (quote, candles DataFrame)}."""
+        symbols = sorted(snapshots)
+        n = len(symbols)
+        price, change_pct, day_high, day_low = (np.full(n, np.nan) for _ in range(4))
+        closes, highs, lows, volumes = (np.full((n, lookback_bars), np.nan) for _ in range(4))
+        for row, symbol in enumerate(symbols):
+            quote, candles = snapshots[symbol]
+            if quote:
+                price[row] = quote.get('c') or np.nan
+                change_pct[row] = quote.get('dp') if quote.get('dp') is not None else np.nan
+                day_high[row] = quote.get('h') or np.nan
+                day_low[row] = quote.get('l') or np.nan
+            if candles is not None and not candles.empty:
+                tail = candles.iloc[-lookback_bars:]
+                width = len(tail)
+                closes[row, -width:] = tail['Close'].to_numpy(dtype=float)
+                highs[row, -width:] = tail['High'].to_numpy(dtype=float)
+                lows[row, -width:] = tail['Low'].to_numpy(dtype=float)
+                volumes[row, -width:] = tail['Volume'].to_numpy(dtype=float)
+        return cls(np.array(symbols), price, change_pct, day_high, day_low, closes, highs, lows, volumes)
+
+
+def _fill_missing(values, universe_fallback):
+    """Replace NaN or non-positive per-symbol baselines with the median of the valid ones."""
+    valid = np.isfinite(values) & (values > 0)
+    fallback = np.median(values[valid]) if valid.any() else universe_fallback
+    if not fallback > 0:
+        # Nothing to compare against; fall back to raw units
+        fallback = 1.0
+    return np.where(valid, values, fallback)
+
+
+def score_table(table, weights=None):
+    """Score every symbol at once; returns a dict of per-symbol signal arrays and the score."""
+    weights = weights or SCORE_WEIGHTS
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        # Symbols without candle history produce all-NaN rows
+        warnings.simplefilter('ignore', RuntimeWarning)
+        returns = np.diff(table.closes, axis=1) / table.closes[:, :-1] * 100
+        volatility = np.nanstd(returns, axis=1)
+        # Without candle history, measure against the rest of the universe instead
+        volatility = _fill_missing(volatility, np.nanstd(table.change_pct))
+        move_z = np.abs(table.change_pct) / volatility
+
+        volume_ratio = table.volumes[:, -1] / np.nanmedian(table.volumes[:, :-1], axis=1)
+
+        ranges = (table.highs - table.lows) / table.closes * 100
+        today_range = (table.day_high - table.day_low) / table.price * 100
+        median_range = _fill_missing(np.nanmedian(ranges[:, :-1], axis=1), np.nanmedian(today_range))
+        range_ratio = today_range / median_range
+
+    move_z = np.clip(np.nan_to_num(move_z, nan=0.0, posinf=MAX_MOVE_Z), 0, MAX_MOVE_Z)
+    volume_ratio = np.clip(np.nan_to_num(volume_ratio, nan=1.0, posinf=MAX_RATIO), 0, MAX_RATIO)
+    range_ratio = np.clip(np.nan_to_num(range_ratio, nan=1.0, posinf=MAX_RATIO), 0, MAX_RATIO)
+
+    # Only above-normal volume and range add to the score
+    score = (weights['move'] * move_z
+             + weights['volume'] * np.log2(np.maximum(volume_ratio, 1.0))
+             + weights['range'] * np.log2(np.maximum(range_ratio, 1.0)))
+    score[np.isnan(table.price)] = -np.inf
+    return {
+        'score': score,
+        'move_z': move_z,
+        'volume_ratio': volume_ratio,
+        'range_ratio': range_ratio,
+    }
+
+
+def rank_candidates(table, top=10, weights=None):
+    """Return the `top` highest-scoring symbols with their signals and reasons, best first."""
+    signals = score_table(table, weights)
+    order = np.argsort(-signals['score'], kind='stable')[:top]
+    candidates = []
+    for row in order:
+        if not np.isfinite(signals['score'][row]) or signals['score'][row] <= 0:
+            break
+        change = float(table.change_pct[row])
+        reasons = [f"{'up' if change >= 0 else 'down'} {abs(change):.1f}% ({signals['move_z'][row]:.1f}σ)"]
+        if signals['volume_ratio'][row] >= 1.5:
+            reasons.append(f"volume {signals['volume_ratio'][row]:.1f}x median")
+        if signals['range_ratio'][row] >= 1.5:
+            reasons.append(f"range {signals['range_ratio'][row]:.1f}x median")
+        candidates.append({
+            'symbol': str(table.symbols[row]),
+            'score': round(float(signals['score'][row]), 3),
+            'price': float(table.price[row]),
+            'change_pct': round(change, 2),
+            'move_z': round(float(signals['move_z'][row]), 2),
+            'volume_ratio': round(float(signals['volume_ratio'][row]), 2),
+            'range_ratio': round(float(signals['range_ratio'][row]), 2),
+            'reasons': reasons
+        })
+    return candidates
+
+
+class Screener:
+    def __init__(self, generator, workers=4, lookback_days=60):
+        """Create a screener that ingests through the generator's cached, rate-limited quote and candle getters."""
+        self.generator = generator
+        self.workers = workers
+        self.lookback_days = lookback_days
+
+    def snapshot(self, symbol):
+        """Return (quote, candles) for one symbol; candles are skipped while their breaker is open."""
+        quote = self.generator.get_quote(symbol)
+        candles = None
+        if not get_breaker('finnhub_candles').is_open():
+            candles = self.generator.get_candles(symbol, self.lookback_days)
+        return quote, candles
+
+    def ingest(self, symbols):
+        """Fetch every symbol's quote and candles into a ScreenerTable; failed symbols are left out."""
+        snapshots = {}
+
+        def fetch(symbol):
+            try:
+                snapshots[symbol] = self.snapshot(symbol)
+            except Exception as e:
+                logger.warning(f"Screener skipped {symbol}: {str(e)}")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(fetch, symbols))
+        logger.info(f"Screener ingested {len(snapshots)}/{len(symbols)} symbols")
+        # Roughly 0.7 trading days per calendar day
+        return ScreenerTable.from_snapshots(snapshots, max(2, int(self.lookback_days * 0.7)))
+
+    def screen(self, symbols=None, top=10):
+        """Ingest the universe and return the ranked candidates."""
+        return rank_candidates(self.ingest(symbols or load_universe()), top)
+
+    def generate_for_candidates(self, candidates, periods=('1mo',)):
+        """Generate scripts for each candidate; returns symbol -> {period: GenerationResult}."""
+        results = {}
+        for candidate in candidates:
+            try:
+                results[candidate['symbol']] = self.generator.generate_scripts(candidate['symbol'], list(periods))
+            except Exception as e:
+                logger.error(f"Generation failed for candidate {candidate['symbol']}: {str(e)}")
+        return results
+
+
+def main():
+    from stock_script_generator import StockScriptGenerator
+
+    parser = argparse.ArgumentParser(description='Rank symbols by how unusual today\'s trading is')
+    parser.add_argument('--symbols', help='Comma-separated symbols (default: SCREENER_UNIVERSE or the watchlist)')
+    parser.add_argument('--top', type=int, default=10, help='Number of candidates to return')
+    parser.add_argument('--lookback-days', type=int, default=60, help='Days of candle history to score against')
+    parser.add_argument('--generate', action='store_true', help='Generate scripts for the candidates')
+    parser.add_argument('--periods', default='1mo', help='Comma-separated periods to generate with --generate')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    screener = Screener(
+        StockScriptGenerator(),
+        workers=int(os.getenv('SCREENER_WORKERS', '4')),
+        lookback_days=args.lookback_days
+    )
+    symbols = [s.strip().upper() for s in args.symbols.split(',')] if args.symbols else None
+    candidates = screener.screen(symbols, args.top)
+    print(json.dumps(candidates, indent=2))
+
+    if args.generate and candidates:
+        results = screener.generate_for_candidates(candidates, args.periods.split(','))
+        for symbol, by_period in results.items():
+            print(f"{symbol}: generated {', '.join(by_period)} (ids {[r.generation_id for r in by_period.values()]})")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,4 @@
 import requests
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import argparse
 import json
@@ -11,11 +10,28 @@ import pandas as pd
 import os
 import json
 from prompts import PromptLoader
+from prompt_budget import estimate_tokens
+from news_scoring import rank_news
+from quote_feed import live_quote
+from scrapers import SCRAPER_SOURCES, fetch_html, parse_cards, card_fields
+from circuit_breaker import get_breaker, CircuitOpenError
+from cache import data_cache
+from rate_limit import acquire_finnhub
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import logging
-from database import save_generation, get_generations_for_symbol
+from dataclasses import dataclass, field, asdict
+from database import save_generation, save_generations, get_generations_for_symbol, save_news_items, get_news_watermark, get_news_items
+from database import get_latest_generation, get_recent_generation_seconds
 import finnhub
 from dotenv import load_dotenv
 
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,6 +39,111 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Calendar days covered by each supported period
+PERIOD_DAYS = {
+    '1mo': 30,
+    '3mo': 90,
+    '6mo': 180,
+    '1y': 365
+}
+
+# Every LLM call in the process takes a slot, so concurrent sections of concurrent
+# periods (and concurrent requests) never exceed LLM_CONCURRENCY calls in total
+llm_slots = threading.BoundedSemaphore(int(os.getenv('LLM_CONCURRENCY', '4')))
+
+# Seconds of spare deadline budget an optional stage needs to be attempted
+STAGE_BUDGETS = {
+    'news': 5,
+    'candles': 2,
+    'profile': 1,
+}
+
+def split_date_range(from_day, to_day, chunk_days):
+    """Split an inclusive YYYY-MM-DD range into chunks of at most chunk_days, newest first."""
+    start = datetime.strptime(from_day, '%Y-%m-%d')
+    end = datetime.strptime(to_day, '%Y-%m-%d')
+    chunks = []
+    while end >= start:
+        chunk_start = max(start, end - timedelta(days=chunk_days - 1))
+        chunks.append((chunk_start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+        end = chunk_start - timedelta(days=1)
+    return chunks
+
+def chunk_covered_from(chunk, items, cap):
+    """Earliest YYYY-MM-DD date a fetched chunk's items are complete from.
+    
+    A chunk that hit the cap lost its oldest items, so it is only complete
+    from the day after its oldest kept item; if the cap was all one day's
+    news, that day is taken as covered, since no narrower request exists.
+    """
+    timestamps = [item['datetime'] for item in items if item.get('datetime')]
+    if len(items) < cap or not timestamps:
+        return chunk[0]
+    next_day = datetime.fromtimestamp(min(timestamps)).date() + timedelta(days=1)
+    return max(chunk[0], min(next_day.strftime('%Y-%m-%d'), chunk[1]))
+
+def covered_from_chunks(chunks, covered):
+    """Earliest date reached by the unbroken run of newest fetched chunks, or None.
+    
+    covered maps each fetched chunk to the date it is complete from (see
+    chunk_covered_from); a chunk complete only from after its start ends the run.
+    """
+    covered_from = None
+    for chunk in chunks:
+        if chunk not in covered:
+            break
+        covered_from = covered[chunk]
+        if covered_from != chunk[0]:
+            break
+    return covered_from
+
+def spread_across_period(items, count, start_ts, end_ts):
+    """Pick up to count newest-first items spread evenly over a Unix time window."""
+    if len(items) <= count:
+        return items
+    span = max(1, end_ts - start_ts)
+    newest_per_slice = {}
+    for item in items:
+        slot = min(count - 1, max(0, (item['datetime'] - start_ts) * count // span))
+        newest_per_slice.setdefault(slot, item)
+    picked = list(newest_per_slice.values())
+    # Quiet slices leave room for more of the most recent items
+    if len(picked) < count:
+        picked_ids = {id(item) for item in picked}
+        picked.extend([item for item in items if id(item) not in picked_ids][:count - len(picked)])
+    return sorted(picked, key=lambda item: item['datetime'], reverse=True)
+
+@dataclass
+class GenerationResult:
+    """Everything produced by one script generation, as served to callers."""
+    symbol: str
+    period: str
+    script: str
+    prompt: str
+    impact_table: str
+    analysis: dict
+    news: list
+    timings: dict = field(default_factory=dict)
+    prompt_tokens: int = None
+    generation_id: int = None
+    # Set when a deadline made stages skip work; stale means a stored script was served
+    degradations: list = field(default_factory=list)
+    stale: bool = False
+
+    def to_dict(self):
+        return asdict(self)
+
+def section_token_cap(words):
+    """Return the completion token cap for a section's word budget, with room to finish a sentence."""
+    return int(words * 1.3 * 1.5) + 20
+
+def trim_to_sentence(text):
+    """Drop a trailing partial sentence left by a completion that hit its token cap."""
+    if not text or text[-1] in '.!?"\')':
+        return text
+    end = max(text.rfind('. '), text.rfind('! '), text.rfind('? '), text.rfind('.\n'))
+    return text[:end + 1] if end > 0 else text
+
 class StockDataError(Exception):
     """Custom exception for stock data related errors"""
     pass
@@ -35,6 +156,8 @@ class StockScriptGenerator:
             callback_manager=CallbackManager([StreamingStdOutCallbackHandler()]),
             temperature=0.7
         )
+        # Concurrent calls would interleave their streamed tokens on stdout, so they use a quiet copy
+        self.quiet_llm = llm_provider or Ollama(model="mistral", temperature=0.7)
         self.max_retries = 3
         self.retry_delay = 2  # seconds
         self.finnhub_token = os.getenv('FINNHUB_API_KEY')
@@ -42,25 +165,66 @@ class StockScriptGenerator:
             raise ValueError("FINNHUB_API_KEY environment variable is not set")
         self.finnhub_token = self.finnhub_token.strip()  # Remove any whitespace
         self.finnhub_client = finnhub.Client(api_key=self.finnhub_token)
+        # How long prefetched or previously fetched data stays usable
+        self.quote_ttl = int(os.getenv('QUOTE_CACHE_TTL', '360'))
+        self.profile_ttl = int(os.getenv('PROFILE_CACHE_TTL', '86400'))
+        self.candle_ttl = int(os.getenv('CANDLE_CACHE_TTL', '3600'))
+        self.news_refresh_interval = int(os.getenv('NEWS_REFRESH_INTERVAL', '960'))
+        # Long news windows are fetched as parallel date-range chunks
+        self.news_chunk_days = int(os.getenv('NEWS_CHUNK_DAYS', '30'))
+        self.news_chunk_cap = int(os.getenv('NEWS_CHUNK_CAP', '100'))
+        self.news_fetch_workers = int(os.getenv('NEWS_FETCH_WORKERS', '4'))
+        # Best-scoring headlines offered to the prompt (its token budget may trim further)
+        self.news_prompt_items = int(os.getenv('NEWS_PROMPT_ITEMS', '15'))
+        # Threads per generation for concurrent LLM calls; llm_slots bounds the calls themselves
+        self.llm_concurrency = int(os.getenv('LLM_CONCURRENCY', '4'))
+        # Generate scripts as concurrently written sections (needs a multi-slot LLM backend)
+        self.sectioned = os.getenv('SCRIPT_SECTIONED', 'false').lower() == 'true'
+
+    def call_finnhub(self, func):
+        """Make one Finnhub REST call within the shared rate limit budget."""
+        if not acquire_finnhub(timeout=30):
+            raise RuntimeError("Finnhub rate limit budget exhausted")
+        return func()
 
-    def fetch_with_retry(self, func, max_retries=3, initial_wait=1):
-        """Execute a function with retry logic and improved error handling."""
+    def fetch_with_retry(self, func, max_retries=3, initial_wait=1, source=None, deadline=None):
+        """Execute a function with retry logic and improved error handling.
+        
+        When a source is given, every attempt goes through that source's circuit
+        breaker, and retrying stops as soon as the breaker opens. With a
+        deadline, retrying stops when the backoff would not fit its budget.
+        """
         last_error = None
         wait_time = initial_wait
+        breaker = get_breaker(source) if source else None
         
         for attempt in range(max_retries):
             try:
+                if breaker:
+                    return breaker.call(func)
                 return func()
+            except CircuitOpenError:
+                raise
             except requests.exceptions.RequestException as e:
                 print(f"Network error on attempt {attempt + 1}: {str(e)}")
                 last_error = e
-                if "429" in str(e):
+                status = getattr(e.response, 'status_code', None)
+                if status == 429 or "429" in str(e):
                     print("Rate limit hit, waiting longer...")
                     wait_time = wait_time * 2
+                elif status is not None and 400 <= status < 500:
+                    # Client errors such as 404 will not go away on retry
+                    break
             except Exception as e:
                 print(f"Error on attempt {attempt + 1}: {str(e)}")
                 last_error = e
             
+            if breaker and breaker.is_open():
+                print(f"Circuit for {source} is open, not retrying")
+                break
+            if deadline is not None and not deadline.allows(wait_time):
+                print("Deadline budget too low to retry")
+                break
             if attempt < max_retries - 1:
                 print(f"Retrying in {wait_time} seconds...")
                 time.sleep(wait_time)
@@ -74,23 +238,10 @@ class StockScriptGenerator:
             logger.info(f"[Step 1] Fetching stock data for {symbol}")
             
             # Get current quote
-            quote = self.finnhub_client.quote(symbol)
+            quote = self.get_quote(symbol)
             logger.info(f"[Step 2] Retrieved quote: {quote}")
             
-            if not quote or 'c' not in quote:
-                raise ValueError("Invalid quote response format")
-            
-            # Create a single-row DataFrame with the quote data
-            current_time = pd.Timestamp.now()
-            df = pd.DataFrame({
-                'Open': [quote['o']],
-                'High': [quote['h']],
-                'Low': [quote['l']],
-                'Close': [quote['c']],
-                'PreviousClose': [quote['pc']],
-                'Change': [quote['d']],
-                'PercentChange': [quote['dp']]
-            }, index=[current_time])
+            df = self.quote_to_frame(quote)
             
             logger.info(f"[Step 3] Successfully fetched quote data")
             return df
@@ -99,63 +250,270 @@ class StockScriptGenerator:
             logger.error(f"[Step E] Error fetching stock data: {str(e)}")
             raise
 
-    def get_company_name(self, symbol):
+    def quote_to_frame(self, quote):
+        """Convert a Finnhub quote into the single-row DataFrame the analysis expects."""
+        if not quote or 'c' not in quote:
+            raise ValueError("Invalid quote response format")
+        
+        # Create a single-row DataFrame with the quote data
+        current_time = pd.Timestamp.now()
+        return pd.DataFrame({
+            'Open': [quote['o']],
+            'High': [quote['h']],
+            'Low': [quote['l']],
+            'Close': [quote['c']],
+            'PreviousClose': [quote['pc']],
+            'Change': [quote['d']],
+            'PercentChange': [quote['dp']]
+        }, index=[current_time])
+
+    def get_quote(self, symbol, refresh=False, fetch=None):
+        """Get the current Finnhub quote, preferring a cached or live-feed one over a REST call.
+        
+        With refresh, a new quote is fetched; the cached one is only replaced if that succeeds.
+        fetch replaces the REST call (the async generator passes its own).
+        """
+        quote = None if refresh else live_quote(symbol)
+        if quote is not None:
+            logger.info(f"Using live quote for {symbol}")
+            return quote
+        fetch = fetch or (lambda: self.call_finnhub(lambda: self.finnhub_client.quote(symbol)))
+        return data_cache.get_or_compute(
+            f"quote:{symbol}", fetch, self.quote_ttl,
+            cacheable=lambda quote: bool(quote and quote.get('c')), force=refresh
+        )
+
+    def get_company_profile(self, symbol, refresh=False, fetch=None):
+        """Get the Finnhub company profile, preferring a cached one.
+        
+        With refresh, a new profile is fetched; the cached one is only replaced if that succeeds.
+        fetch replaces the REST call.
+        """
+        fetch = fetch or (lambda: self.call_finnhub(lambda: self.finnhub_client.company_profile2(symbol=symbol)))
+        return data_cache.get_or_compute(f"profile:{symbol}", fetch, self.profile_ttl, cacheable=bool, force=refresh)
+
+    def get_candles(self, symbol, days, fetch=None):
+        """Get daily OHLCV candles for the last `days` days; empty if unavailable.
+        
+        fetch(start_ts, end_ts) replaces the REST call and its circuit breaker.
+        """
+        fetch = fetch or (lambda start_ts, end_ts: get_breaker('finnhub_candles').call(
+            lambda: self.call_finnhub(lambda: self.finnhub_client.stock_candles(symbol, 'D', start_ts, end_ts))
+        ))
+        
+        def fetch_frame():
+            end_ts = int(time.time())
+            try:
+                res = fetch(end_ts - days * 86400, end_ts)
+            except Exception as e:
+                logger.warning(f"Candles unavailable for {symbol}: {type(e).__name__}")
+                return None
+            return self.candles_to_frame(res)
+        
+        # Failed fetches aren't cached, so the next call retries
+        candles = data_cache.get_or_compute(f"candles:{symbol}:{days}", fetch_frame, self.candle_ttl)
+        return candles if candles is not None else self.candles_to_frame(None)
+
+    def candles_to_frame(self, res):
+        """Convert a Finnhub candle response into an OHLCV DataFrame indexed by time."""
+        if not res or res.get('s') != 'ok':
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        return pd.DataFrame({
+            'Open': res['o'],
+            'High': res['h'],
+            'Low': res['l'],
+            'Close': res['c'],
+            'Volume': res['v']
+        }, index=pd.to_datetime(res['t'], unit='s'))
+
+    def get_company_name(self, symbol, fetch=None):
         """Get company name using Finnhub."""
         try:
-            profile = self.finnhub_client.company_profile2(symbol=symbol)
+            profile = self.get_company_profile(symbol, fetch=fetch)
             return profile.get('name', symbol)
         except:
             return symbol
 
-    def get_news(self, symbol):
-        """Get news using Finnhub."""
+    def get_news(self, symbol, days=30, deadline=None):
+        """Get news for the last `days` days using Finnhub."""
         try:
             logger.info(f"[Step 1] Starting news fetch for {symbol}")
             
-            # Get news from the last 30 days
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-            logger.info(f"[Step 2] Fetching news from {start_date} to {end_date}")
+            logger.info(f"[Step 2] Fetching news for the last {days} days")
             
-            news_items = self.finnhub_client.company_news(symbol, _from=start_date, to=end_date)
+            news_items = self.get_finnhub_news(symbol, days, deadline=deadline)
             logger.info(f"[Step 3] Retrieved {len(news_items) if news_items else 0} news items")
             
-            # Format news items with proper date handling
-            formatted_news = []
-            for idx, item in enumerate(news_items):
-                try:
-                    logger.info(f"[Step 4.{idx}] Processing news item: {json.dumps(item)}")
-                    # Finnhub returns timestamp in Unix format
-                    news_date = datetime.fromtimestamp(item['datetime'])
-                    logger.info(f"[Step 4.{idx}.1] Converted timestamp {item['datetime']} to date {news_date}")
-                    
-                    formatted_item = {
-                        'date': news_date,
-                        'title': item.get('headline', ''),
-                        'source': item.get('source', 'Finnhub'),
-                        'url': item.get('url', ''),
-                        'timestamp': item['datetime']
-                    }
-                    logger.info(f"[Step 4.{idx}.2] Formatted item: {json.dumps(formatted_item, default=str)}")
-                    formatted_news.append(formatted_item)
-                except (KeyError, ValueError) as e:
-                    logger.error(f"[Step 4.{idx}.E] Error processing news item: {str(e)}, Item: {json.dumps(item)}")
-                    continue
-            
-            logger.info(f"[Step 5] Successfully formatted {len(formatted_news)} news items")
-            return formatted_news
+            return self.format_news_items(news_items)
         except Exception as e:
             logger.error(f"[Step E] Error in get_news: {str(e)}")
             return []
 
+    def format_news_items(self, news_items):
+        """Format stored Finnhub news items with proper date handling."""
+        formatted_news = []
+        for idx, item in enumerate(news_items):
+            try:
+                logger.info(f"[Step 4.{idx}] Processing news item: {json.dumps(item)}")
+                # Finnhub returns timestamp in Unix format
+                news_date = datetime.fromtimestamp(item['datetime'])
+                logger.info(f"[Step 4.{idx}.1] Converted timestamp {item['datetime']} to date {news_date}")
+                
+                formatted_item = {
+                    'date': news_date,
+                    'title': item.get('headline', ''),
+                    'source': item.get('source', 'Finnhub'),
+                    'url': item.get('url', ''),
+                    'timestamp': item['datetime']
+                }
+                logger.info(f"[Step 4.{idx}.2] Formatted item: {json.dumps(formatted_item, default=str)}")
+                formatted_news.append(formatted_item)
+            except (KeyError, ValueError) as e:
+                logger.error(f"[Step 4.{idx}.E] Error processing news item: {str(e)}, Item: {json.dumps(item)}")
+                continue
+        
+        logger.info(f"[Step 5] Successfully formatted {len(formatted_news)} news items")
+        return formatted_news
+
+    def request_finnhub_news(self, symbol, from_date, to_date):
+        """Request Finnhub company news for an inclusive YYYY-MM-DD date range."""
+        url = "https://finnhub.io/api/v1/company-news"
+        params = {
+            "symbol": symbol,
+            "from": from_date,
+            "to": to_date
+        }
+        headers = {
+            "X-Finnhub-Token": self.finnhub_token,
+            "Accept": "application/json"
+        }
+        print(f"Finnhub request params: {params}")
+        response = self.call_finnhub(lambda: requests.get(url, params=params, headers=headers, timeout=10))
+        response.raise_for_status()
+        # Finnhub returns newest first; keep only the head of each chunk
+        return (response.json() or [])[:self.news_chunk_cap]
+
+    def fetch_finnhub_news_range(self, symbol, range_from, range_to, deadline=None):
+        """Fetch a date range in parallel chunks, storing each chunk as it arrives.
+        
+        Returns the earliest date from which the range was fetched without
+        gaps, or None if the newest chunk failed. A chunk that hit
+        news_chunk_cap ends the gapless run early; the next fetch back-fills
+        the rest. With a deadline, chunks still outstanding when its spare
+        budget runs out are abandoned.
+        """
+        chunks = split_date_range(range_from, range_to, self.news_chunk_days)
+        logger.info(f"Fetching Finnhub news for {symbol}: {range_from} to {range_to} in {len(chunks)} chunks")
+        
+        def fetch_chunk(chunk):
+            chunk_from, chunk_to = chunk
+            return self.fetch_with_retry(
+                lambda: self.request_finnhub_news(symbol, chunk_from, chunk_to),
+                source='finnhub',
+                deadline=deadline
+            )
+        
+        covered = {}
+        executor = ThreadPoolExecutor(max_workers=min(self.news_fetch_workers, len(chunks)))
+        try:
+            # Each chunk runs in a copy of this context, so its calls are charged to the caller's budgets
+            futures = {executor.submit(contextvars.copy_context().run, fetch_chunk, chunk): chunk for chunk in chunks}
+            timeout = max(0.0, deadline.spare()) if deadline is not None else None
+            for future in as_completed(futures, timeout=timeout):
+                chunk = futures[future]
+                try:
+                    items = future.result()
+                except Exception as e:
+                    logger.error(f"Finnhub news chunk {chunk[0]} to {chunk[1]} failed: {str(e)}")
+                    continue
+                # Merge each chunk into the store as soon as it lands
+                save_news_items(symbol, 'finnhub', items)
+                covered[chunk] = chunk_covered_from(chunk, items, self.news_chunk_cap)
+        except FuturesTimeoutError:
+            logger.warning(f"Deadline reached with {len(chunks) - len(covered)} news chunks outstanding")
+            deadline.degrade('news', f"abandoned {len(chunks) - len(covered)} of {len(chunks)} news chunks")
+        finally:
+            # Don't wait for abandoned chunks; their results are discarded
+            executor.shutdown(wait=deadline is None, cancel_futures=True)
+        
+        return covered_from_chunks(chunks, covered)
+
+    def get_finnhub_news(self, symbol, days, refresh=False, deadline=None):
+        """Get Finnhub company news for the last `days` days, newest first.
+        
+        Headlines are kept in the local news store. Only items after the
+        symbol's high-water mark (plus any part of the window older than what
+        is stored) are requested; the rest of the window is served locally.
+        The delta request is skipped if the store was refreshed recently,
+        unless refresh is True, or if the deadline can't afford it.
+        """
+        ranges, since = self.plan_news_fetch(symbol, days, refresh, deadline)
+        for range_from, range_to in ranges:
+            self.record_news_coverage(symbol, self.fetch_finnhub_news_range(symbol, range_from, range_to, deadline))
+        
+        return get_news_items(symbol, 'finnhub', since=since)
+
+    def plan_news_fetch(self, symbol, days, refresh=False, deadline=None):
+        """Plan the news ranges to fetch, dropping them if the deadline can't afford a fetch."""
+        ranges, since = self.plan_news_ranges(symbol, days, refresh)
+        if ranges and deadline is not None and not deadline.allows(STAGE_BUDGETS['news']):
+            deadline.degrade('news', 'skipped news fetch, served stored news only')
+            ranges = []
+        return ranges, since
+
+    def record_news_coverage(self, symbol, covered_from):
+        """Record how far back a fetched range is complete, marking the store refreshed.
+        
+        None means the range's newest chunk failed, so nothing is recorded and
+        the next request retries it.
+        """
+        if covered_from is None:
+            logger.error("Finnhub news fetch failed, serving stored news only")
+            return
+        save_news_items(symbol, 'finnhub', [], covered_from=covered_from)
+
+    def plan_news_ranges(self, symbol, days, refresh=False):
+        """Work out which date ranges the news store lacks for a window.
+        
+        Returns (ranges, since): the YYYY-MM-DD ranges to request and the
+        Unix timestamp the window starts at.
+        """
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        start_day = start_date.strftime('%Y-%m-%d')
+        end_day = end_date.strftime('%Y-%m-%d')
+        
+        watermark = get_news_watermark(symbol, 'finnhub')
+        if watermark is None or watermark['covered_from'] > end_day:
+            ranges = [(start_day, end_day)]
+        else:
+            # Finnhub filters by day, so the mark's own day is re-read; stored items are ignored on insert
+            updated_at = datetime.fromisoformat(watermark['updated_at'])
+            if watermark['newest_datetime']:
+                newest_day = datetime.fromtimestamp(watermark['newest_datetime']).strftime('%Y-%m-%d')
+            else:
+                # Nothing stored yet, but everything up to the last fetch is known to be empty
+                newest_day = (updated_at - timedelta(days=1)).strftime('%Y-%m-%d')
+            if not refresh and (datetime.utcnow() - updated_at).total_seconds() < self.news_refresh_interval:
+                # Refreshed recently (e.g. by the prefetch scheduler), no delta needed
+                logger.info(f"Stored Finnhub news for {symbol} is fresh, skipping delta fetch")
+                ranges = []
+            else:
+                ranges = [(max(newest_day, start_day), end_day)]
+            if start_day < watermark['covered_from']:
+                ranges.append((start_day, watermark['covered_from']))
+        
+        return ranges, int(start_date.timestamp())
+
     def fetch_news_from_yfinance(self, symbol, period='1mo'):
         """Fetch news from Yahoo Finance with improved error handling."""
         try:
+            if yf is None:
+                return []
             print(f"\n=== Starting Yahoo Finance news fetch for {symbol} ===")
-            stock = yf.Ticker(symbol)
             
             # Get news with specific parameters
-            news_data = stock.news
+            news_data = get_breaker('yfinance').call(lambda: yf.Ticker(symbol).news)
             if not news_data:
                 print(f"No Yahoo Finance news found for {symbol}")
                 return []
@@ -186,33 +544,19 @@ class StockScriptGenerator:
                     # Extract publisher
                     publisher = item.get('publisher', 'Yahoo Finance')
                     
-                    # Calculate relative time for relevance
-                    time_diff = datetime.now() - news_date
-                    
-                    # Calculate a relevance score (higher is more relevant)
-                    relevance_score = 0
-                    if 'type' in item and item['type'] == 'STORY':
-                        relevance_score += 1
-                    if time_diff.days < 1:  # News from last 24 hours
-                        relevance_score += 2
-                    if item.get('sentiment', {}).get('score', 0) > 0:
-                        relevance_score += 1
-                    
                     formatted_news.append({
                         'date': news_date,
                         'title': item['title'],
                         'source': publisher,
                         'url': item.get('link', ''),
-                        'timestamp': item['providerPublishTime'],
-                        'relevance': relevance_score,
-                        'sentiment': item.get('sentiment', {}).get('score', 0)
+                        'timestamp': item['providerPublishTime']
                     })
                 except Exception as e:
                     print(f"Error processing Yahoo Finance news item: {str(e)}")
                     continue
             
-            # Sort by relevance and timestamp
-            formatted_news.sort(key=lambda x: (x['relevance'], x['timestamp']), reverse=True)
+            # Score relevance and sentiment for the whole batch
+            formatted_news = rank_news(formatted_news, symbol)
             print(f"Successfully processed {len(formatted_news)} Yahoo Finance news items")
             return formatted_news
             
@@ -225,9 +569,6 @@ class StockScriptGenerator:
         """Fetch news from Finnhub with improved error handling."""
         try:
             print(f"\n=== Starting Finnhub news fetch for {symbol} ===")
-            # Finnhub API endpoint for company news
-            url = "https://finnhub.io/api/v1/company-news"
-            
             # Convert period to days
             days_lookup = {
                 '1mo': 30,
@@ -237,29 +578,7 @@ class StockScriptGenerator:
             }
             days = days_lookup.get(period, 30)
             
-            # Calculate date range based on period
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
-            
-            params = {
-                "symbol": symbol,
-                "from": start_date.strftime("%Y-%m-%d"),
-                "to": end_date.strftime("%Y-%m-%d"),
-                "token": os.getenv('FINNHUB_API_KEY')
-            }
-            
-            print(f"Finnhub request params: {params}")
-            
-            def get_news():
-                headers = {
-                    "X-Finnhub-Token": os.getenv('FINNHUB_API_KEY'),
-                    "Accept": "application/json"
-                }
-                response = requests.get(url, params=params, headers=headers, timeout=10)
-                response.raise_for_status()
-                return response.json()
-            
-            news_data = self.fetch_with_retry(get_news)
+            news_data = self.get_finnhub_news(symbol, days)
             
             if not news_data:
                 print(f"No Finnhub news found for {symbol}")
@@ -267,28 +586,19 @@ class StockScriptGenerator:
             
             print(f"Found {len(news_data)} Finnhub news items for {symbol}")
             
-            # Process and format the news
+            # Process and format the news, sampling across the whole period rather than only its newest days
+            end_ts = int(datetime.now().timestamp())
             formatted_news = []
-            for item in news_data[:10]:
+            for item in spread_across_period(news_data, 10, end_ts - days * 86400, end_ts):
                 try:
                     news_date = datetime.fromtimestamp(item['datetime'])
                     
-                    # Calculate a relevance score
-                    relevance_score = 0
-                    if item.get('category', '') == 'company news':
-                        relevance_score += 1
-                    if datetime.now() - news_date < timedelta(days=1):
-                        relevance_score += 2
-                    if 'related' in item and symbol.upper() in item['related'].split(','):
-                        relevance_score += 1
-                    
                     formatted_news.append({
                         'date': news_date,
                         'title': item['headline'].strip(),
                         'source': 'Finnhub',
                         'url': item.get('url', ''),
                         'timestamp': item['datetime'],
-                        'relevance': relevance_score,
                         'category': item.get('category', ''),
                         'related': item.get('related', '')
                     })
@@ -296,8 +606,8 @@ class StockScriptGenerator:
                     print(f"Error processing Finnhub news item: {str(e)}")
                     continue
             
-            # Sort by relevance and timestamp
-            formatted_news.sort(key=lambda x: (x['relevance'], x['timestamp']), reverse=True)
+            # Score relevance and sentiment for the whole batch
+            formatted_news = rank_news(formatted_news, symbol)
             print(f"Successfully processed {len(formatted_news)} Finnhub news items")
             return formatted_news
             
@@ -328,7 +638,7 @@ class StockScriptGenerator:
                 response.raise_for_status()
                 return response.json()
             
-            data = self.fetch_with_retry(get_news)
+            data = self.fetch_with_retry(get_news, source='alpha_vantage')
             
             if "feed" not in data or not data["feed"]:
                 return []
@@ -353,28 +663,18 @@ class StockScriptGenerator:
         """Fetch news by scraping MarketWatch."""
         try:
             print(f"\n=== Starting MarketWatch news fetch for {symbol} ===")
-            url = f"https://www.marketwatch.com/investing/stock/{symbol.lower()}"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
-            }
+            config = SCRAPER_SOURCES['marketwatch']
             
-            def get_news():
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                return response.text
+            html_content = self.fetch_with_retry(lambda: fetch_html(config, symbol), source='marketwatch')
             
-            html_content = self.fetch_with_retry(get_news)
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Find news articles in the MarketWatch layout
-            news_items = soup.find_all('div', class_='article__content')
+            # Parse only the article cards in the MarketWatch layout
+            news_items = parse_cards(html_content, config)
             if not news_items:
                 return []
             
             formatted_news = []
-            for item in news_items[:10]:
-                title_elem = item.find('a', class_='link')
-                time_elem = item.find('span', class_='article__timestamp')
+            for item in news_items:
+                title_elem, time_elem = card_fields(item, config)
                 
                 if title_elem and time_elem:
                     title = title_elem.text.strip()
@@ -406,28 +706,18 @@ class StockScriptGenerator:
         """Fetch news by scraping Reuters."""
         try:
             print(f"\n=== Starting Reuters news fetch for {symbol} ===")
-            url = f"https://www.reuters.com/companies/{symbol.upper()}.O"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
-            }
+            config = SCRAPER_SOURCES['reuters']
             
-            def get_news():
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                return response.text
-            
-            html_content = self.fetch_with_retry(get_news)
-            soup = BeautifulSoup(html_content, 'html.parser')
+            html_content = self.fetch_with_retry(lambda: fetch_html(config, symbol), source='reuters')
             
-            # Find news articles in the Reuters layout
-            news_items = soup.find_all('div', {'data-testid': 'MediaStoryCard'})
+            # Parse only the article cards in the Reuters layout
+            news_items = parse_cards(html_content, config)
             if not news_items:
                 return []
             
             formatted_news = []
-            for item in news_items[:10]:
-                title_elem = item.find('a', {'data-testid': 'Heading'})
-                time_elem = item.find('time')
+            for item in news_items:
+                title_elem, time_elem = card_fields(item, config)
                 
                 if title_elem and time_elem:
                     title = title_elem.text.strip()
@@ -478,11 +768,8 @@ class StockScriptGenerator:
             unique_news = self.deduplicate_news(all_news)
             print(f"Unique news items after deduplication: {len(unique_news)}")
             
-            # Sort by timestamp (most recent first)
-            sorted_news = sorted(unique_news, key=lambda x: x['timestamp'], reverse=True)
-            
-            # Get top 7 news items
-            top_news = sorted_news[:7]
+            # Keep the 7 best-scoring items
+            top_news = rank_news(unique_news, symbol, self.get_company_name(symbol), top=7)
             print(f"Selected top {len(top_news)} news items")
             
             # Format news for display with source attribution
@@ -618,25 +905,27 @@ class StockScriptGenerator:
             raise StockDataError(f"Failed to analyze price movement: {str(e)}")
 
     def format_impact_table(self, analysis):
-        """Format the analysis results into a table."""
+        """Format the analysis results (one dict or a list, one row each) into a table."""
         try:
             if not analysis:
                 return ""
+            if isinstance(analysis, dict):
+                analysis = [analysis]
                 
             # Create table header
             table = "| Date | Close Price | Price Change | Change % | Day Range | Impact |\n"
             table += "|------|-------------|--------------|----------|-----------|--------|\n"
             
-            # Format the single row with current data
-            date = analysis['date']
-            close = f"${analysis['current_price']:.2f}"
-            change = f"${analysis['price_change']:.2f}"
-            pct = f"{analysis['percent_change']:.2f}%"
-            day_range = f"${analysis['day_low']:.2f} - ${analysis['day_high']:.2f}"
-            description = analysis['description']
-            
-            # Add the row
-            table += f"| {date} | {close} | {change} | {pct} | {day_range} | {description} |\n"
+            for row in analysis:
+                date = row['date']
+                close = f"${row['current_price']:.2f}"
+                change = f"${row['price_change']:.2f}"
+                pct = f"{row['percent_change']:.2f}%"
+                day_range = f"${row['day_low']:.2f} - ${row['day_high']:.2f}"
+                description = row['description']
+                
+                # Add the row
+                table += f"| {date} | {close} | {change} | {pct} | {day_range} | {description} |\n"
             
             return table
             
@@ -659,56 +948,299 @@ class StockScriptGenerator:
         else:
             return "Strong bearish movement"
 
-    def generate_script(self, symbol, period='1mo'):
-        """Generate a script for the given stock symbol and period."""
+    def collect_market_data(self, symbol, days, deadline=None):
+        """Fetch the quote, company name, news and candles for the last `days` days in one pass.
+        
+        With a deadline, news, candles and the company name are cut or skipped
+        (unless cached) when its spare budget runs low; the quote is required.
+        """
+        timings = {}
+        
+        # Get stock data
+        logger.info("[Generate Step 2] Fetching stock data")
+        stage_start = time.perf_counter()
+        stock_data = self.get_stock_data(symbol)
+        timings['quote'] = round(time.perf_counter() - stage_start, 3)
+        logger.info(f"[Generate Step 2.1] Stock data shape: {stock_data.shape}")
+        
+        # Get news data
+        logger.info("[Generate Step 3] Fetching news data")
+        stage_start = time.perf_counter()
+        all_news = self.get_news(symbol, days, deadline=deadline)
+        timings['news'] = round(time.perf_counter() - stage_start, 3)
+        logger.info(f"[Generate Step 3.1] Retrieved {len(all_news)} news items")
+        if all_news:
+            logger.info(f"[Generate Step 3.2] Sample news item: {json.dumps(all_news[0], default=str)}")
+        
+        stage_start = time.perf_counter()
+        if self.can_afford(deadline, 'candles', f"candles:{symbol}:{days}"):
+            candles = self.get_candles(symbol, days)
+        else:
+            deadline.degrade('candles', 'skipped candle history')
+            candles = self.candles_to_frame(None)
+        timings['candles'] = round(time.perf_counter() - stage_start, 3)
+        
+        stage_start = time.perf_counter()
+        if self.can_afford(deadline, 'profile', f"profile:{symbol}"):
+            company_name = self.get_company_name(symbol)
+        else:
+            deadline.degrade('profile', 'skipped company name lookup')
+            company_name = symbol
+        timings['profile'] = round(time.perf_counter() - stage_start, 3)
+        
+        return {
+            'stock_data': stock_data,
+            'news': all_news,
+            'candles': candles,
+            'company_name': company_name,
+            'timings': timings
+        }
+
+    def can_afford(self, deadline, stage, cache_key=None):
+        """Return True if an optional stage fits the deadline, or is served from cache anyway."""
+        if deadline is None or deadline.allows(STAGE_BUDGETS[stage]):
+            return True
+        return cache_key is not None and data_cache.get(cache_key) is not None
+
+    def expected_llm_seconds(self, period):
+        """Estimate the LLM time for a period from recent generations (LLM_EXPECTED_SECONDS if none)."""
+        recent = sorted(get_recent_generation_seconds(period))
+        if recent:
+            return recent[len(recent) // 2]
+        return float(os.getenv('LLM_EXPECTED_SECONDS', '60'))
+
+    def stale_result(self, symbol, period, deadline):
+        """Return the newest stored script for a symbol and period as a stale result, or None."""
+        stored = get_latest_generation(symbol, period)
+        if stored is None:
+            return None
+        deadline.degrade('llm', f"served cached script from {stored['timestamp']}")
+        logger.info(f"Deadline too short for generation, serving cached script {stored['id']}")
+        return GenerationResult(
+            symbol=symbol,
+            period=period,
+            script=stored['script'],
+            prompt=stored['prompt'],
+            impact_table='',
+            analysis={},
+            news=[],
+            prompt_tokens=stored['prompt_tokens'],
+            generation_id=stored['id'],
+            degradations=deadline.degradations,
+            stale=True
+        )
+
+    def build_prompt(self, symbol, period, market_data, sectioned=False):
+        """Analyze a period's slice of the market data and create its prompt.
+        
+        When sectioned, the built prompt also carries one prompt per script
+        section, and 'prompt' holds them all (it is what gets stored).
+        """
+        cutoff = datetime.now() - timedelta(days=PERIOD_DAYS.get(period, 30))
+        news = [item for item in market_data['news'] if item['date'] >= cutoff]
+        candles = market_data['candles']
+        period_candles = candles[candles.index >= cutoff] if not candles.empty else candles
+        
+        # Analyze price movement
+        logger.info(f"[Generate Step 4] Analyzing price movement ({period})")
+        analysis = self.analyze_price_movement(market_data['stock_data'])
+        logger.info(f"[Generate Step 4.1] Analysis results: {json.dumps(analysis)}")
+        
+        # Format impact table
+        impact_table = self.format_impact_table([analysis])
+        logger.info("[Generate Step 5] Formatted impact table")
+        
+        # Best-scoring headlines first; the prompt budget drops from the end
+        news = rank_news(news, symbol, market_data['company_name'], top=self.news_prompt_items)
+        news_lines = [
+            f"[{item['date'].strftime('%Y-%m-%d')}] ({item['source']}) {self.clean_news_content(item['title'])}"
+            for item in news
+        ]
+        
+        # Create the prompt
+        prompt, template, prompt_params = PromptLoader.render_prompt(
+            company_name=market_data['company_name'],
+            symbol=symbol,
+            period=period,
+            analysis=[analysis],
+            impact_table=impact_table,
+            additional_metrics=self.calculate_additional_metrics(period_candles),
+            news=news_lines
+        )
+        sections = None
+        if sectioned:
+            sections = PromptLoader.create_section_prompts(period, prompt_params)
+            prompt = '\n\n'.join(section['prompt'] for section in sections)
+            template = prompt_params = None
+        prompt_tokens = estimate_tokens(prompt)
+        logger.info(f"[Generate Step 6] Created prompt (~{prompt_tokens} tokens)")
+        
+        return {
+            'prompt': prompt,
+            'prompt_tokens': prompt_tokens,
+            'impact_table': impact_table,
+            'analysis': analysis,
+            'news': news_lines,
+            'template_name': PromptLoader.template_name(period),
+            'template': template,
+            'prompt_params': prompt_params,
+            'sections': sections
+        }
+
+    def call_llm(self, prompt, quiet=False, **kwargs):
+        """Invoke the LLM once a process-wide slot is free; quiet calls don't stream to stdout."""
+        with llm_slots:
+            return (self.quiet_llm if quiet else self.llm).invoke(prompt, **kwargs)
+
+    def invoke_llm(self, prompt, quiet=False):
+        """Generate a script from a prompt, returning the script and the seconds it took."""
+        llm_start = time.perf_counter()
+        script = self.call_llm(prompt, quiet)
+        generation_seconds = time.perf_counter() - llm_start
+        logger.info(f"[Generate Step 7] Script generated successfully in {generation_seconds:.1f}s")
+        return script, round(generation_seconds, 3)
+
+    def invoke_sections(self, sections):
+        """Generate script sections concurrently and stitch them in order.
+        
+        Each section's completion is capped to its word budget. Returns the
+        script and the seconds it took, which is about the slowest section.
+        """
+        llm_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.llm_concurrency, len(sections))) as executor:
+            futures = [
+                executor.submit(self.call_llm, section['prompt'], quiet=True,
+                                num_predict=section_token_cap(section['words']))
+                for section in sections
+            ]
+            parts = [trim_to_sentence(future.result().strip()) for future in futures]
+        generation_seconds = time.perf_counter() - llm_start
+        logger.info(f"[Generate Step 7] {len(sections)} script sections generated in {generation_seconds:.1f}s")
+        return '\n\n'.join(part for part in parts if part), round(generation_seconds, 3)
+
+    def run_llm(self, built, quiet=False):
+        """Generate the script for a built prompt, sectioned or in one call."""
+        if built.get('sections'):
+            return self.invoke_sections(built['sections'])
+        return self.invoke_llm(built['prompt'], quiet)
+
+    def generate_script(self, symbol, period='1mo', sectioned=None, deadline=None):
+        """Generate a script for the given stock symbol and period.
+        
+        Returns a GenerationResult with the script, its prompt and inputs,
+        per-stage timings and the id of the saved database row. sectioned
+        defaults to SCRIPT_SECTIONED.
+        
+        With a Deadline, optional data stages are cut to keep enough budget
+        for the LLM, and if even the LLM no longer fits, the newest stored
+        script for the symbol and period is returned marked stale. The
+        result lists every degradation.
+        """
         try:
             logger.info(f"[Generate Step 1] Starting script generation for {symbol} ({period})")
             
-            # Get stock data
-            logger.info("[Generate Step 2] Fetching stock data")
-            stock_data = self.get_stock_data(symbol, period)
-            logger.info(f"[Generate Step 2.1] Stock data shape: {stock_data.shape}")
-            
-            # Get news data
-            logger.info("[Generate Step 3] Fetching news data")
-            all_news = self.get_news(symbol)
-            logger.info(f"[Generate Step 3.1] Retrieved {len(all_news)} news items")
-            if all_news:
-                logger.info(f"[Generate Step 3.2] Sample news item: {json.dumps(all_news[0], default=str)}")
-            
-            # Analyze price movement
-            logger.info("[Generate Step 4] Analyzing price movement")
-            analysis = self.analyze_price_movement(stock_data)
-            logger.info(f"[Generate Step 4.1] Analysis results: {json.dumps(analysis)}")
-            
-            # Format impact table
-            impact_table = self.format_impact_table([analysis])
-            logger.info("[Generate Step 5] Formatted impact table")
-            
-            # Create the prompt
-            prompt = PromptLoader.create_prompt(
-                company_name=self.get_company_name(symbol),
-                symbol=symbol,
-                period=period,
-                analysis=[analysis],
-                impact_table=impact_table
-            )
-            logger.info("[Generate Step 6] Created prompt")
+            if deadline is not None:
+                deadline.reserve = self.expected_llm_seconds(period)
+                if deadline.spare() < 0:
+                    stale = self.stale_result(symbol, period, deadline)
+                    if stale is not None:
+                        return stale
+            
+            market_data = self.collect_market_data(symbol, PERIOD_DAYS.get(period, 30), deadline)
+            stage_start = time.perf_counter()
+            built = self.build_prompt(symbol, period, market_data,
+                                      sectioned=self.sectioned if sectioned is None else sectioned)
+            prompt_seconds = round(time.perf_counter() - stage_start, 3)
+            
+            if deadline is not None and deadline.spare() < 0:
+                stale = self.stale_result(symbol, period, deadline)
+                if stale is not None:
+                    return stale
+                deadline.degrade('llm', 'no cached script to fall back on, generating over budget')
             
             # Generate the script using the LLM
-            script = self.llm.invoke(prompt)
-            logger.info("[Generate Step 7] Script generated successfully")
+            script, generation_seconds = self.run_llm(built)
             
             # Save to database
-            from database import save_generation
-            save_generation(symbol, period, prompt, script)
-            
-            return script
+            stage_start = time.perf_counter()
+            generation_id = save_generation(symbol, period, built['prompt'], script,
+                                            prompt_tokens=built['prompt_tokens'],
+                                            generation_seconds=generation_seconds,
+                                            template_name=built['template_name'],
+                                            template=built['template'],
+                                            prompt_params=built['prompt_params'])
+            
+            timings = dict(market_data['timings'], prompt=prompt_seconds, llm=generation_seconds,
+                           save=round(time.perf_counter() - stage_start, 3))
+            result = self.make_result(symbol, period, built, script, timings, generation_id)
+            if deadline is not None:
+                result.degradations = deadline.degradations
+            return result
             
         except Exception as e:
             logger.error(f"[Generate Step E] Error generating script: {str(e)}")
             raise
 
+    def generate_scripts(self, symbol, periods, sectioned=None):
+        """Generate scripts for several periods from a single data fetch.
+        
+        The largest window is fetched once and sliced per period, the LLM
+        calls run concurrently, and all results are saved in one transaction.
+        Returns a dict of period -> GenerationResult.
+        """
+        try:
+            logger.info(f"[Generate Step 1] Starting script generation for {symbol} ({', '.join(periods)})")
+            
+            days = max(PERIOD_DAYS.get(period, 30) for period in periods)
+            market_data = self.collect_market_data(symbol, days)
+            sectioned = self.sectioned if sectioned is None else sectioned
+            built = {period: self.build_prompt(symbol, period, market_data, sectioned) for period in periods}
+            
+            with ThreadPoolExecutor(max_workers=min(self.llm_concurrency, len(periods))) as executor:
+                futures = {period: executor.submit(self.run_llm, built[period], len(periods) > 1)
+                           for period in periods}
+                outputs = {period: future.result() for period, future in futures.items()}
+            
+            ids = save_generations([
+                {
+                    'symbol': symbol,
+                    'period': period,
+                    'prompt': built[period]['prompt'],
+                    'script': outputs[period][0],
+                    'prompt_tokens': built[period]['prompt_tokens'],
+                    'generation_seconds': outputs[period][1],
+                    'template_name': built[period]['template_name'],
+                    'template': built[period]['template'],
+                    'prompt_params': built[period]['prompt_params']
+                }
+                for period in periods
+            ])
+            
+            return {
+                period: self.make_result(symbol, period, built[period], outputs[period][0],
+                                         dict(market_data['timings'], llm=outputs[period][1]), generation_id)
+                for period, generation_id in zip(periods, ids)
+            }
+            
+        except Exception as e:
+            logger.error(f"[Generate Step E] Error generating scripts: {str(e)}")
+            raise
+
+    def make_result(self, symbol, period, built, script, timings, generation_id):
+        """Assemble a GenerationResult from a built prompt and its script."""
+        return GenerationResult(
+            symbol=symbol,
+            period=period,
+            script=script,
+            prompt=built['prompt'],
+            impact_table=built['impact_table'].strip(),
+            analysis=built['analysis'],
+            news=built['news'],
+            timings=timings,
+            prompt_tokens=built['prompt_tokens'],
+            generation_id=generation_id
+        )
+
     def find_relevant_news_for_dates(self, all_news, dates, days_before=3):
         """Find news items relevant to specific dates, including prior days."""
         relevant_news = []
@@ -726,26 +1258,18 @@ class StockScriptGenerator:
         
         return relevant_news
 
-    def calculate_additional_metrics(self, stock_data):
-        """Calculate additional metrics for long-term analysis."""
-        prices = stock_data['prices']
-        
-        # Calculate average daily volume
-        avg_daily_volume = sum(prices['volume']) / len(prices['volume'])
-        
-        # Calculate average daily range
-        daily_ranges = []
-        for i in range(len(prices['high'])):
-            daily_range = prices['high'][i] - prices['low'][i]
-            daily_ranges.append(daily_range)
-        avg_daily_range = sum(daily_ranges) / len(daily_ranges)
+    def calculate_additional_metrics(self, candles):
+        """Calculate additional metrics for long-term analysis from daily candles."""
+        if candles is None or candles.empty:
+            return {}
         
-        # Count high volume days
-        high_volume_days = sum(1 for vol in prices['volume'] if vol > avg_daily_volume)
+        avg_daily_volume = candles['Volume'].mean()
+        avg_daily_range = (candles['High'] - candles['Low']).mean()
+        high_volume_days = int((candles['Volume'] > avg_daily_volume).sum())
         
         return {
             'avg_daily_volume': int(avg_daily_volume),
-            'avg_daily_range': round(avg_daily_range, 2),
+            'avg_daily_range': round(float(avg_daily_range), 2),
             'high_volume_days': high_volume_days
         }
 
@@ -753,26 +1277,46 @@ def main():
     parser = argparse.ArgumentParser(description='Generate stock analysis video scripts')
     parser.add_argument('--symbol', required=True, help='Stock symbol (e.g., AAPL)')
     parser.add_argument('--period', default='1mo', help='Period to analyze (1mo, 3mo, 6mo, 1y)')
+    parser.add_argument('--periods', help='Comma-separated periods to generate from one data fetch (e.g., 1mo,3mo,6mo,1y)')
+    parser.add_argument('--profile', action='store_true', help='Profile the run and store it under profiles/')
+    parser.add_argument('--sectioned', action='store_true', help='Generate the script as concurrently written sections')
     args = parser.parse_args()
 
     # Load environment variables
     load_dotenv()
 
+    periods = [p.strip() for p in args.periods.split(',') if p.strip()] if args.periods else [args.period]
+
     generator = StockScriptGenerator()
+    
+    def run():
+        if len(periods) > 1:
+            return generator.generate_scripts(args.symbol, periods, args.sectioned or None)
+        return {periods[0]: generator.generate_script(args.symbol, periods[0], args.sectioned or None)}
+    
     try:
-        script = generator.generate_script(args.symbol, args.period)
+        if args.profile:
+            from profiling import run_profiled
+            results, profile_id = run_profiled(f"{args.symbol}-{'+'.join(periods)}", run)
+            print(f"Profile stored as {profile_id}")
+        else:
+            results = run()
     except StockDataError as e:
         print(f"Error: {str(e)}")
         return
     
-    # Save the script to a file
+    # Save the scripts to files; only several periods from one run need the period in the name
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"scripts/{args.symbol}_{timestamp}.txt"
-    
-    with open(filename, 'w') as f:
-        f.write(script)
-    
-    print(f"\nScript generated and saved to {filename}")
+    for period, result in results.items():
+        if len(results) > 1:
+            filename = f"scripts/{args.symbol}_{period}_{timestamp}.txt"
+        else:
+            filename = f"scripts/{args.symbol}_{timestamp}.txt"
+        
+        with open(filename, 'w') as f:
+            f.write(result.script)
+        
+        print(f"\nScript generated and saved to {filename}")
 
 if __name__ == "__main__":
     main()
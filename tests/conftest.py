@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# StockScriptGenerator refuses to start without a key; tests never reach Finnhub
+os.environ.setdefault('FINNHUB_API_KEY', 'test-key')
+
+import circuit_breaker
+from cache import data_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_data_cache():
+    data_cache.clear()
+    yield
+    data_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_breakers(monkeypatch):
+    """Give every test fresh circuit breakers, so one test's failures can't open another's."""
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point database.py at a fresh database file."""
+    import database
+    monkeypatch.setattr(database, 'DATABASE_PATH', str(tmp_path / 'scripts.db'))
+    database.init_db()
+    return database
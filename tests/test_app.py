@@ -0,0 +1,81 @@
+import re
+import sqlite3
+
+import pytest
+
+import app as app_module
+import database
+from stock_script_generator import GenerationResult, StockScriptGenerator
+
+
+@pytest.fixture
+def client(temp_db):
+    return app_module.app.test_client()
+
+
+def test_static_files_are_revalidated_with_etags(client):
+    response = client.get('/static/stocks.json')
+    assert response.status_code == 200 and response.headers['ETag']
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
+    cached = client.get('/static/stocks.json', headers={'If-None-Match': response.headers['ETag']})
+    assert cached.status_code == 304
+
+
+def test_history_is_conditional_on_the_latest_generation(client, temp_db):
+    temp_db.save_generation('AAPL', '1mo', 'prompt', 'Apple climbed.')
+    response = client.get('/api/history/AAPL')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert client.get('/api/history/AAPL', headers={'If-None-Match': etag}).status_code == 304
+    temp_db.save_generation('AAPL', '3mo', 'prompt', 'Apple climbed again.')
+    assert client.get('/api/history/AAPL', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_search_page_size_is_clamped(client, temp_db):
+    for i in range(105):
+        temp_db.save_generation('AAPL', '1mo', 'prompt', f"Apple guidance note {i}.")
+    search = lambda query: client.get('/api/search?q=guidance' + query).get_json()['results']
+    assert len(search('&limit=-1')) == 1
+    assert len(search('&limit=0')) == 1
+    assert len(search('&limit=500')) == 100
+    assert [r['id'] for r in search('&limit=3&offset=-5')] == [r['id'] for r in search('&limit=3')]
+
+
+class FakeLLM:
+    def invoke(self, prompt, **kwargs):
+        return 'Apple moved higher.'
+
+
+def test_generate_serves_the_result_without_reading_it_back(client, temp_db, monkeypatch):
+    generator = StockScriptGenerator(llm_provider=FakeLLM())
+    monkeypatch.setattr(generator, 'collect_market_data', lambda symbol, days, deadline=None: {
+        'stock_data': generator.quote_to_frame({'c': 100.0, 'o': 99.0, 'h': 101.0, 'l': 98.0, 'pc': 95.0,
+                                                'd': 5.0, 'dp': 5.2632}),
+        'news': [],
+        'candles': generator.candles_to_frame(None),
+        'company_name': 'Apple Inc',
+        'timings': {'quote': 0.1}
+    })
+    monkeypatch.setattr(app_module, 'StockScriptGenerator', lambda: generator)
+    results = []
+    generate_script = generator.generate_script
+    monkeypatch.setattr(generator, 'generate_script', lambda *args: results.append(generate_script(*args)) or results[-1])
+
+    statements = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+    monkeypatch.setattr(database.sqlite3, 'connect', traced_connect)
+
+    body = client.post('/generate', json={'symbol': 'AAPL'}).get_json()
+    request_statements = list(statements)
+    [result] = results
+    assert isinstance(result, GenerationResult)
+    assert {key: body[key] for key in result.to_dict()} == result.to_dict()
+    assert body['success'] and body['generation_id'] == temp_db.get_latest_generation('AAPL', '1mo')['id']
+    # The saved row is the only history the request touched: nothing was read back
+    history_reads = [sql for sql in request_statements if re.search(r'SELECT\b.*\bFROM script_generations', sql, re.S)]
+    assert history_reads == [] and any('INSERT INTO script_generations' in sql for sql in request_statements)
@@ -0,0 +1,169 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+import async_generator
+import circuit_breaker
+import quote_feed
+import rate_limit
+from async_generator import AsyncStockScriptGenerator
+from deadline import Deadline
+from prompts import PromptLoader
+from rate_limit import RateLimiter
+from stock_script_generator import StockScriptGenerator
+
+QUOTE = {'c': 100.0, 'o': 99.0, 'h': 101.0, 'l': 98.0, 'pc': 95.0, 'd': 5.0, 'dp': 5.2632, 't': 0}
+
+
+class ProviderStandIn:
+    """Finnhub REST and Ollama on one local aiohttp server, counting calls."""
+
+    def __init__(self):
+        self.calls = {}
+        self.llm_in_flight = 0
+        self.max_llm_in_flight = 0
+        self.quote_status = 200
+
+    def count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    async def quote(self, request):
+        self.count('quote')
+        await asyncio.sleep(0.05)
+        if self.quote_status != 200:
+            return web.json_response({'error': 'unavailable'}, status=self.quote_status)
+        return web.json_response(QUOTE)
+
+    async def profile(self, request):
+        self.count('profile')
+        return web.json_response({'name': 'Apple Inc'})
+
+    async def candles(self, request):
+        self.count('candles')
+        return web.json_response({'s': 'no_data'})
+
+    async def news(self, request):
+        self.count('news')
+        return web.json_response([])
+
+    async def generate(self, request):
+        self.count('llm')
+        self.llm_in_flight += 1
+        self.max_llm_in_flight = max(self.max_llm_in_flight, self.llm_in_flight)
+        try:
+            await asyncio.sleep(0.05)
+        finally:
+            self.llm_in_flight -= 1
+        return web.json_response({'response': 'Apple moved higher this month.'})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/quote', self.quote)
+        app.router.add_get('/stock/profile2', self.profile)
+        app.router.add_get('/stock/candle', self.candles)
+        app.router.add_get('/company-news', self.news)
+        app.router.add_post('/api/generate', self.generate)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+def run_with_providers(temp_db, monkeypatch):
+    """Run a coroutine function against the stand-in as (async generator, stand-in)."""
+    monkeypatch.setattr(rate_limit, 'finnhub_limiter', RateLimiter(60, burst=1000))
+    stand_in = ProviderStandIn()
+    generator = StockScriptGenerator(llm_provider=object())
+    generator.llm_concurrency = 2
+
+    def run(test):
+        async def main():
+            url = await stand_in.start()
+            monkeypatch.setattr(async_generator, 'FINNHUB_API_URL', url)
+            monkeypatch.setattr(async_generator, 'OLLAMA_URL', url)
+            try:
+                async with aiohttp.ClientSession() as session:
+                    return await test(AsyncStockScriptGenerator(session, generator), stand_in)
+            finally:
+                await stand_in.runner.cleanup()
+        return asyncio.run(main())
+    return run
+
+
+def test_concurrent_quote_misses_share_one_fetch(run_with_providers):
+    async def test(agen, stand_in):
+        quotes = await asyncio.gather(*(agen.get_quote('AAPL') for _ in range(5)))
+        assert quotes == [QUOTE] * 5
+        assert stand_in.calls == {'quote': 1}
+        assert await agen.get_quote('AAPL') == QUOTE
+        assert stand_in.calls == {'quote': 1}
+    run_with_providers(test)
+
+
+def test_live_quote_is_served_without_a_fetch(run_with_providers, monkeypatch):
+    class LiveFeed:
+        def live_quote(self, symbol):
+            return dict(QUOTE, c=123.0)
+    monkeypatch.setattr(quote_feed, 'active_feed', LiveFeed())
+
+    async def test(agen, stand_in):
+        assert (await agen.get_quote('AAPL'))['c'] == 123.0
+        assert 'quote' not in stand_in.calls
+    run_with_providers(test)
+
+
+def test_sectioned_periods_share_the_llm_concurrency_limit(run_with_providers):
+    async def test(agen, stand_in):
+        periods = ['1mo', '3mo', '6mo']
+        results = await agen.generate_scripts('AAPL', periods, sectioned=True)
+        assert stand_in.calls['llm'] == sum(len(PromptLoader.sections_for(period)) for period in periods)
+        assert stand_in.max_llm_in_flight == 2
+        assert all(result.script and result.generation_id for result in results.values())
+    run_with_providers(test)
+
+
+def test_deadline_too_short_for_the_llm_serves_the_stored_script(run_with_providers, temp_db):
+    temp_db.save_generation('AAPL', '1mo', 'prompt', 'Stored script', prompt_tokens=10, generation_seconds=30)
+
+    async def test(agen, stand_in):
+        deadline = Deadline(5)
+        result = await agen.generate_script('AAPL', '1mo', deadline=deadline)
+        assert result.stale and result.script == 'Stored script'
+        assert 'llm' not in stand_in.calls
+        assert deadline.degradations[0]['stage'] == 'llm'
+    run_with_providers(test)
+
+
+def test_deadline_skips_uncached_optional_stages(run_with_providers):
+    async def test(agen, stand_in):
+        deadline = Deadline(0.5)
+        data = await agen.collect_market_data('AAPL', 30, deadline)
+        assert data['company_name'] == 'AAPL' and data['candles'].empty
+        assert stand_in.calls == {'quote': 1}
+        assert {d['stage'] for d in deadline.degradations} == {'news', 'candles', 'profile'}
+    run_with_providers(test)
+
+
+def test_quote_failures_do_not_open_the_news_breaker(run_with_providers):
+    async def test(agen, stand_in):
+        stand_in.quote_status = 503
+        for _ in range(circuit_breaker.DEFAULT_SETTINGS['failure_threshold'] + 1):
+            with pytest.raises(aiohttp.ClientResponseError):
+                await agen.get_quote('AAPL')
+        assert stand_in.calls['quote'] == 4
+        assert not circuit_breaker.get_breaker('finnhub').is_open()
+        await agen.get_news('AAPL', 7)
+        assert stand_in.calls['news'] >= 1
+
+        # Nor does an open news breaker block quotes
+        for _ in range(circuit_breaker.DEFAULT_SETTINGS['failure_threshold']):
+            circuit_breaker.get_breaker('finnhub').record_failure(0.0, 'down')
+        stand_in.quote_status = 200
+        assert await agen.get_quote('AAPL') == QUOTE
+    run_with_providers(test)
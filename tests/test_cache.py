@@ -0,0 +1,124 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from cache import SQLiteCache, TTLCache
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    if request.param == 'memory':
+        return TTLCache(max_entries=3)
+    return SQLiteCache(str(tmp_path / 'cache.db'), max_entries=3, poll_interval=0.01)
+
+
+def test_set_get_delete_clear(cache):
+    cache.set('a', {'c': 1}, ttl=60)
+    assert cache.get('a') == {'c': 1}
+    cache.delete('a')
+    assert cache.get('a') is None
+    cache.set('b', 2, ttl=60)
+    cache.clear()
+    assert cache.get('b') is None
+
+
+def test_entries_expire(cache):
+    cache.set('a', 1, ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get('a') is None
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    if isinstance(cache, SQLiteCache):
+        # Make every read count as a touch
+        cache.touch_interval = 0
+    for key in ('a', 'b', 'c'):
+        cache.set(key, key, ttl=60)
+        time.sleep(0.01)
+    cache.get('a')
+    cache.set('d', 'd', ttl=60)
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in ('a', 'c', 'd')] == ['a', 'c', 'd']
+
+
+def test_get_or_compute_runs_once_for_concurrent_misses(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return 42
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute, 60)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [42] * 8
+    assert len(calls) == 1
+
+
+def test_get_or_compute_skips_uncacheable_results(cache):
+    assert cache.get_or_compute('k', lambda: None, 60) is None
+    assert cache.get_or_compute('k', lambda: {}, 60, cacheable=bool) == {}
+    assert cache.get('k') is None
+    assert cache.get_or_compute('k', lambda: {'name': 'x'}, 60, cacheable=bool) == {'name': 'x'}
+    assert cache.get('k') == {'name': 'x'}
+
+
+def test_forced_refresh_keeps_old_value_until_it_succeeds(cache):
+    cache.set('profile', {'name': 'old'}, ttl=60)
+
+    def failing():
+        raise RuntimeError('429')
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('profile', failing, 60, force=True)
+    assert cache.get('profile') == {'name': 'old'}
+    assert cache.get_or_compute('profile', lambda: {}, 60, cacheable=bool, force=True) == {}
+    assert cache.get('profile') == {'name': 'old'}
+    assert cache.get_or_compute('profile', lambda: {'name': 'new'}, 60, force=True) == {'name': 'new'}
+    assert cache.get('profile') == {'name': 'new'}
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), lease_seconds=0.1, poll_interval=0.01)
+    other = SQLiteCache(str(tmp_path / 'cache.db'), lease_seconds=0.1)
+    # Another worker took the lease and died without releasing it
+    assert other._acquire_lease('k')
+    start = time.monotonic()
+    assert cache.get_or_compute('k', lambda: 7, 60) == 7
+    assert time.monotonic() - start < 1
+
+
+def _compute_in_worker(path, log_path):
+    cache = SQLiteCache(path, poll_interval=0.01)
+
+    def compute():
+        with open(log_path, 'a') as f:
+            f.write('x')
+        time.sleep(0.3)
+        return 'value'
+    threads = [threading.Thread(target=cache.get_or_compute, args=('k', compute, 60)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_get_or_compute_runs_once_across_processes(tmp_path):
+    path, log_path = str(tmp_path / 'cache.db'), tmp_path / 'computes.log'
+    SQLiteCache(path)
+    # Spawned, not forked: other tests leave threads running whose locks a fork could copy held
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_compute_in_worker, args=(path, str(log_path))) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    assert [worker.exitcode for worker in workers] == [0, 0, 0]
+    assert log_path.read_text() == 'x'
+    assert SQLiteCache(path).get('k') == 'value'
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, 'time', clock)
+    return clock
+
+
+def fail():
+    raise ConnectionError('connection refused')
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+
+
+def test_opens_after_consecutive_failures_and_rejects(clock):
+    breaker = CircuitBreaker('news', failure_threshold=3, cooldown=60)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    # A success resets the run, so three more failures are needed
+    trip(breaker)
+    assert breaker.is_open()
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: calls.append(1))
+    assert calls == [] and breaker.health()['rejected_calls'] == 1
+
+
+def test_half_open_trial_closes_or_reopens(clock):
+    breaker = CircuitBreaker('news', failure_threshold=2, cooldown=60)
+    trip(breaker)
+    clock.now += 61
+    assert not breaker.is_open()
+    # A failed trial reopens for another full cooldown
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.is_open()
+    clock.now += 61
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == circuit_breaker.CLOSED and breaker.consecutive_failures == 0
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker('news', failure_threshold=1, cooldown=10)
+    trip(breaker)
+    clock.now += 11
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_async_calls_share_the_breaker(clock):
+    breaker = CircuitBreaker('news', failure_threshold=1, cooldown=10)
+
+    async def failing():
+        raise TimeoutError()
+
+    async def run():
+        with pytest.raises(TimeoutError):
+            await breaker.call_async(failing)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call_async(failing)
+    asyncio.run(run())
+
+
+def test_health_reports_rolling_stats(clock):
+    breaker = CircuitBreaker('news', failure_threshold=5, window=4)
+    for _ in range(3):
+        breaker.call(lambda: None)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    health = breaker.health()
+    # Only the last four calls are kept
+    assert health['sample_size'] == 4 and health['success_rate'] == 0.5
+    assert health['health_score'] == 0.5 and health['last_error'] == 'connection refused'
+    assert health['state'] == 'closed' and health['retry_in_seconds'] is None
+    breaker.record_failure(0.0, 'x')
+    breaker.record_failure(0.0, 'x')
+    breaker.record_failure(0.0, 'x')
+    clock.now += 15
+    assert breaker.health()['health_score'] == 0.0 and breaker.health()['retry_in_seconds'] == 45.0
+
+
+def test_registry_applies_source_settings():
+    assert get_breaker('reuters') is get_breaker('reuters')
+    assert get_breaker('reuters').cooldown == 900
+    assert get_breaker('finnhub').cooldown == circuit_breaker.DEFAULT_SETTINGS['cooldown']
+    assert set(circuit_breaker.all_health()) == {'reuters', 'finnhub'}
+
+
+def test_cancelled_trial_frees_the_half_open_slot(clock):
+    breaker = CircuitBreaker('news', failure_threshold=1, cooldown=10)
+    trip(breaker)
+    clock.now += 11
+
+    async def run():
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+        trial = asyncio.create_task(breaker.call_async(slow))
+        await started.wait()
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        # Cancelling is not a verdict on the source: the next call is the trial
+        assert breaker.state == circuit_breaker.HALF_OPEN and not breaker.trial_in_flight
+
+        async def ok():
+            return 'ok'
+        assert await breaker.call_async(ok) == 'ok'
+    asyncio.run(run())
+    assert breaker.state == circuit_breaker.CLOSED
@@ -0,0 +1,53 @@
+import pytest
+
+import deadline as deadline_module
+from deadline import Deadline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 500.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(deadline_module, 'time', clock)
+    return clock
+
+
+def test_remaining_and_spare_budget(clock):
+    deadline = Deadline(10, reserve=4)
+    clock.now += 3
+    assert deadline.remaining() == 7
+    assert deadline.spare() == 3
+    assert deadline.allows(3) and not deadline.allows(3.5)
+
+
+def test_remaining_never_goes_negative_but_spare_does(clock):
+    deadline = Deadline(2, reserve=5)
+    clock.now += 10
+    assert deadline.remaining() == 0.0
+    assert deadline.spare() == -5
+    assert not deadline.allows(0)
+
+
+def test_reserve_can_be_set_after_creation(clock):
+    deadline = Deadline(30)
+    assert deadline.allows(29)
+    deadline.reserve = 25
+    assert not deadline.allows(6)
+
+
+def test_degradations_record_stage_action_and_time_left(clock):
+    deadline = Deadline(8)
+    clock.now += 2.5
+    deadline.degrade('news', 'skipped news fetch')
+    deadline.degrade('candles', 'skipped candle history')
+    assert deadline.degradations == [
+        {'stage': 'news', 'action': 'skipped news fetch', 'remaining_seconds': 5.5},
+        {'stage': 'candles', 'action': 'skipped candle history', 'remaining_seconds': 5.5},
+    ]
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from downsample import downsample_ohlcv, lttb_indices
+
+
+def reference_lttb(x, y, threshold):
+    """Straightforward LTTB, one point at a time, as originally described by Steinarsson."""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = int((i + 1) * every) + 1, min(int((i + 2) * every) + 1, n)
+        avg_x = sum(x[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+@pytest.mark.parametrize('n, threshold', [(10, 3), (100, 10), (1000, 97), (1001, 500)])
+def test_lttb_matches_the_reference_algorithm(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype=float)
+    y = np.cumsum(rng.normal(size=n))
+    assert lttb_indices(x, y, threshold).tolist() == reference_lttb(x.tolist(), y.tolist(), threshold)
+
+
+def test_lttb_keeps_endpoints_order_and_spikes():
+    y = np.zeros(1000)
+    y[437] = 50.0
+    y[712] = -30.0
+    indices = lttb_indices(np.arange(1000), y, 20)
+    assert len(indices) == 20
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 437 in indices and 712 in indices
+
+
+def test_lttb_small_thresholds():
+    assert lttb_indices(range(5), range(5), 10).tolist() == [0, 1, 2, 3, 4]
+    assert lttb_indices(range(5), range(5), 2).tolist() == [0, 4]
+    assert lttb_indices(range(5), range(5), 0).tolist() == []
+
+
+def test_downsample_ohlcv_merges_bars_between_selected_points():
+    n = 500
+    rng = np.random.default_rng(0)
+    t = np.arange(n) * 86400
+    c = 100 + np.cumsum(rng.normal(size=n))
+    o = c + rng.normal(size=n)
+    h = np.maximum(o, c) + rng.random(n)
+    l = np.minimum(o, c) - rng.random(n)
+    v = rng.integers(1000, 5000, size=n).astype(float)
+
+    bars = downsample_ohlcv(t, o, h, l, c, v, 50)
+    starts = lttb_indices(t, c, 50)
+    assert len(bars['t']) == 50
+    assert bars['v'].sum() == pytest.approx(v.sum())
+    assert bars['h'].max() == h.max() and bars['l'].min() == l.min()
+    # A merged bar spans from its selected bar up to the next one
+    assert bars['h'][1] == h[starts[1]:starts[2]].max()
+    # It opens with its first bar and closes with its last
+    assert bars['o'][1] == o[starts[1]] and bars['c'][1] == c[starts[2] - 1]
+    np.testing.assert_array_equal(bars['c'][:-1], c[starts[1:] - 1])
+    assert bars['c'][-1] == c[-1]
+
+
+def test_downsample_ohlcv_returns_short_series_unchanged():
+    columns = [np.arange(5.0)] * 6
+    bars = downsample_ohlcv(*columns, points=10)
+    assert all(np.array_equal(bars[key], np.arange(5.0)) for key in 'tohlcv')
@@ -0,0 +1,52 @@
+import csv
+import gzip
+import io
+import json
+
+import export
+from export import encode_chunks, export_generations
+
+
+def test_chunks_hold_whole_lines_of_about_chunk_bytes(monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_BYTES', 100)
+    lines = [f"line {i} {'é' * 20}\n" for i in range(50)]
+    chunks = list(encode_chunks(iter(lines)))
+    assert b''.join(chunks).decode('utf-8') == ''.join(lines)
+    assert len(chunks) > 1
+    for chunk in chunks[:-1]:
+        assert 100 <= len(chunk) < 100 + len(lines[0].encode('utf-8'))
+        assert chunk.endswith(b'\n')
+
+
+def test_compressed_chunks_form_one_gzip_stream(monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_BYTES', 100)
+    lines = [json.dumps({'id': i, 'script': 'Apple moved higher.' * 5}) + '\n' for i in range(200)]
+    chunks = list(encode_chunks(lines, compress=True))
+    assert all(chunks)
+    assert gzip.decompress(b''.join(chunks)).decode('utf-8') == ''.join(lines)
+
+
+def test_no_lines():
+    assert list(encode_chunks([])) == []
+    assert gzip.decompress(b''.join(encode_chunks([], compress=True))) == b''
+
+
+def test_export_streams_matching_generations(temp_db):
+    temp_db.save_generation('AAPL', '1mo', 'prompt a', 'Apple, "quoted"\nover two lines')
+    temp_db.save_generation('MSFT', '1mo', 'prompt m', 'Microsoft script')
+    temp_db.save_generation('AAPL', '3mo', 'prompt b', 'Apple three months')
+
+    rows = [json.loads(line) for line in
+            gzip.decompress(b''.join(export_generations(compress=True, symbol='AAPL'))).decode().splitlines()]
+    assert sorted(row['script'] for row in rows) == ['Apple three months', 'Apple, "quoted"\nover two lines']
+    assert all(row['prompt'].startswith('prompt') for row in rows)
+
+    text = b''.join(export_generations(fmt='csv', period='1mo', include_prompt=False)).decode()
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert list(rows[0]) == [field for field in export.EXPORT_FIELDS if field != 'prompt']
+    assert sorted(row['symbol'] for row in rows) == ['AAPL', 'MSFT']
+
+
+def test_csv_export_without_rows_is_just_the_header(temp_db):
+    text = b''.join(export_generations(fmt='csv')).decode()
+    assert text.splitlines() == [','.join(export.EXPORT_FIELDS)]
@@ -0,0 +1,77 @@
+import re
+import sqlite3
+import sys
+
+import pytest
+
+import stock_script_generator
+from stock_script_generator import StockScriptGenerator
+
+QUOTE = {'c': 100.0, 'o': 99.0, 'h': 101.0, 'l': 98.0, 'pc': 95.0, 'd': 5.0, 'dp': 5.2632, 't': 0}
+
+
+class FakeLLM:
+    def invoke(self, prompt, **kwargs):
+        return 'Apple moved higher.'
+
+
+@pytest.fixture
+def generator(temp_db, monkeypatch):
+    generator = StockScriptGenerator(llm_provider=FakeLLM())
+    fetched = []
+
+    def collect_market_data(symbol, days, deadline=None):
+        fetched.append(days)
+        return {
+            'stock_data': generator.quote_to_frame(QUOTE),
+            'news': [],
+            'candles': generator.candles_to_frame(None),
+            'company_name': 'Apple Inc',
+            'timings': {'quote': 0.1}
+        }
+    monkeypatch.setattr(generator, 'collect_market_data', collect_market_data)
+    generator.fetched = fetched
+    return generator
+
+
+def test_periods_share_one_fetch_and_one_transaction(generator, temp_db, monkeypatch):
+    saves = []
+    save_generations = stock_script_generator.save_generations
+    monkeypatch.setattr(stock_script_generator, 'save_generations',
+                        lambda generations: saves.append(len(generations)) or save_generations(generations))
+
+    periods = ['1mo', '3mo', '1y']
+    results = generator.generate_scripts('AAPL', periods)
+    assert generator.fetched == [365]
+    assert saves == [3]
+    conn = sqlite3.connect(temp_db.DATABASE_PATH)
+    rows = conn.execute("SELECT id, period, timestamp FROM script_generations ORDER BY id").fetchall()
+    conn.close()
+    assert [row[1] for row in rows] == periods
+    # Written together, so they share one timestamp
+    assert len({row[2] for row in rows}) == 1
+    assert {period: result.generation_id for period, result in results.items()} == {row[1]: row[0] for row in rows}
+    assert all(result.script == 'Apple moved higher.' for result in results.values())
+
+
+def test_a_failed_save_writes_no_period(temp_db):
+    good = {'symbol': 'AAPL', 'period': '1mo', 'prompt': 'prompt', 'script': 'Apple climbed.'}
+    with pytest.raises(Exception):
+        temp_db.save_generations([good, dict(good, period='3mo', script=None)])
+    assert temp_db.get_latest_generation('AAPL', '1mo') is None
+
+
+@pytest.mark.parametrize('args, names', [
+    (['--period', '3mo'], [r'AAPL_\d{8}_\d{6}\.txt']),
+    (['--periods', '1mo,3mo'], [r'AAPL_1mo_\d{8}_\d{6}\.txt', r'AAPL_3mo_\d{8}_\d{6}\.txt']),
+])
+def test_cli_names_script_files_by_period_only_for_several(generator, tmp_path, monkeypatch, args, names):
+    monkeypatch.setattr(stock_script_generator, 'StockScriptGenerator', lambda: generator)
+    monkeypatch.setattr(stock_script_generator, 'load_dotenv', lambda: None)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'scripts').mkdir()
+    monkeypatch.setattr(sys, 'argv', ['stock_script_generator.py', '--symbol', 'AAPL'] + args)
+    stock_script_generator.main()
+    files = sorted(path.name for path in (tmp_path / 'scripts').iterdir())
+    assert len(files) == len(names)
+    assert all(re.fullmatch(name, file) for name, file in zip(names, files))
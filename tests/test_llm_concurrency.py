@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+import stock_script_generator
+from prompts import PromptLoader
+from stock_script_generator import StockScriptGenerator
+
+
+class FakeLLM:
+    """Records how many invocations overlap, and their keyword arguments."""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt, **kwargs):
+        with self._lock:
+            self.calls.append(kwargs)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        with self._lock:
+            self.in_flight -= 1
+        return 'The stock moved. Then it moved again'
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    monkeypatch.setattr(stock_script_generator, 'llm_slots', threading.BoundedSemaphore(2))
+    generator = StockScriptGenerator(llm_provider=FakeLLM())
+    generator.llm_concurrency = 4
+    generator.quiet_llm = FakeLLM()
+    return generator
+
+
+def sectioned(period):
+    sections = PromptLoader.sections_for(period)
+    return {'prompt': '', 'sections': [{'prompt': title, 'words': words} for title, _, words in sections]}
+
+
+def test_sections_of_concurrent_periods_share_the_process_limit(generator):
+    periods = ['1mo', '3mo', '6mo', '1y']
+    with stock_script_generator.ThreadPoolExecutor(max_workers=len(periods)) as executor:
+        scripts = list(executor.map(lambda period: generator.run_llm(sectioned(period), True), periods))
+    assert generator.quiet_llm.max_in_flight == 2
+    assert len(generator.quiet_llm.calls) == sum(len(PromptLoader.sections_for(p)) for p in periods)
+    # Each section is trimmed to its last full sentence and stitched in order
+    for (script, _), period in zip(scripts, periods):
+        assert script.split('\n\n') == ['The stock moved.'] * len(PromptLoader.sections_for(period))
+
+
+def test_only_a_lone_whole_script_call_streams(generator):
+    generator.invoke_llm('prompt')
+    assert len(generator.llm.calls) == 1 and not generator.quiet_llm.calls
+    generator.run_llm(sectioned('1mo'))
+    assert len(generator.llm.calls) == 1
+    assert all(call['num_predict'] > 0 for call in generator.quiet_llm.calls)
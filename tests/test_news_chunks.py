@@ -0,0 +1,117 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+import rate_limit
+import stock_script_generator
+from rate_limit import RateLimiter
+from stock_script_generator import StockScriptGenerator, chunk_covered_from, covered_from_chunks
+
+
+def day_ts(day, hour=12):
+    return int(datetime.strptime(day, '%Y-%m-%d').replace(hour=hour).timestamp())
+
+
+def news(day, count, start_id=0):
+    return [{'id': start_id + i, 'datetime': day_ts(day) - i, 'headline': f"Headline {start_id + i}"}
+            for i in range(count)]
+
+
+CHUNKS = [('2026-09-01', '2026-09-30'), ('2026-08-02', '2026-08-31'), ('2026-07-03', '2026-08-01')]
+
+
+def test_uncapped_chunk_is_covered_from_its_start():
+    assert chunk_covered_from(CHUNKS[0], news('2026-09-20', 3), cap=5) == '2026-09-01'
+
+
+def test_capped_chunk_is_covered_from_the_day_after_its_oldest_item():
+    assert chunk_covered_from(CHUNKS[0], news('2026-09-20', 5), cap=5) == '2026-09-21'
+    # A day with more news than the cap can't be split further
+    assert chunk_covered_from(CHUNKS[0], news('2026-09-30', 5), cap=5) == '2026-09-30'
+
+
+def test_coverage_stops_at_a_failed_or_capped_chunk():
+    assert covered_from_chunks(CHUNKS, {}) is None
+    assert covered_from_chunks(CHUNKS, {CHUNKS[0]: '2026-09-01', CHUNKS[2]: '2026-07-03'}) == '2026-09-01'
+    assert covered_from_chunks(CHUNKS, {c: c[0] for c in CHUNKS}) == '2026-07-03'
+    capped = {CHUNKS[0]: '2026-09-01', CHUNKS[1]: '2026-08-20', CHUNKS[2]: '2026-07-03'}
+    assert covered_from_chunks(CHUNKS, capped) == '2026-08-20'
+
+
+class FakeResponse:
+    def __init__(self, items):
+        self.items = items
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.items
+
+
+@pytest.fixture
+def generator(temp_db, monkeypatch):
+    monkeypatch.setattr(rate_limit, 'finnhub_limiter', RateLimiter(60, burst=1000))
+    generator = StockScriptGenerator(llm_provider=object())
+    generator.news_chunk_cap = 5
+    return generator
+
+
+def test_capped_chunk_is_back_filled_on_the_next_fetch(generator, temp_db, monkeypatch):
+    today = datetime.now().strftime('%Y-%m-%d')
+    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    requests_made = []
+    capped = [news(yesterday, 8)]
+
+    def get(url, params, **kwargs):
+        requests_made.append((params['from'], params['to']))
+        # Finnhub returns newest first; the first newest-chunk request has more than the cap
+        if params['to'] == today and capped:
+            return FakeResponse(capped.pop())
+        return FakeResponse([])
+    monkeypatch.setattr(stock_script_generator.requests, 'get', get)
+
+    generator.get_finnhub_news('AAPL', 60)
+    watermark = temp_db.get_news_watermark('AAPL', 'finnhub')
+    assert watermark['covered_from'] == today
+
+    requests_made.clear()
+    generator.get_finnhub_news('AAPL', 60)
+    start_day = (datetime.now() - timedelta(days=60)).strftime('%Y-%m-%d')
+    # Still fresh, so only the capped-off remainder is requested
+    assert min(r[0] for r in requests_made) == start_day and max(r[1] for r in requests_made) == today
+    assert temp_db.get_news_watermark('AAPL', 'finnhub')['covered_from'] == start_day
+
+
+def test_partial_saves_do_not_mark_the_store_refreshed(generator, temp_db):
+    temp_db.save_news_items('AAPL', 'finnhub', news('2026-09-20', 2), covered_from='2026-09-01')
+    refreshed_at = temp_db.get_news_watermark('AAPL', 'finnhub')['updated_at']
+    temp_db.save_news_items('AAPL', 'finnhub', news('2026-09-25', 2, start_id=10))
+    watermark = temp_db.get_news_watermark('AAPL', 'finnhub')
+    assert watermark['updated_at'] == refreshed_at
+    assert watermark['newest_datetime'] == day_ts('2026-09-25')
+
+
+def test_failed_newest_chunk_leaves_the_delta_due(generator, temp_db, monkeypatch):
+    today = datetime.now().strftime('%Y-%m-%d')
+    temp_db.save_news_items('AAPL', 'finnhub', [], covered_from=today)
+    conn = sqlite3.connect(temp_db.DATABASE_PATH)
+    with conn:
+        conn.execute("UPDATE news_watermarks SET updated_at = '2026-01-01T00:00:00'")
+    conn.close()
+
+    def get(url, params, **kwargs):
+        if params['to'] == today:
+            response = requests.Response()
+            response.status_code = 404
+            raise requests.exceptions.HTTPError('404 Not Found', response=response)
+        return FakeResponse(news(params['to'], 2))
+    monkeypatch.setattr(stock_script_generator.requests, 'get', get)
+
+    # The older chunks land and are stored, but the range isn't complete
+    generator.get_finnhub_news('AAPL', 90)
+    assert temp_db.get_news_watermark('AAPL', 'finnhub')['updated_at'] == '2026-01-01T00:00:00'
+    ranges, _ = generator.plan_news_ranges('AAPL', 90)
+    assert ranges[0][1] == today
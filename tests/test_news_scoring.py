@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from news_scoring import company_aliases, rank_news, sentiment_scores
+
+NOW = 1_760_000_000
+HOUR = 3600
+
+
+def item(title, source='Reuters', hours_old=1):
+    return {'title': title, 'source': source, 'timestamp': NOW - hours_old * HOUR}
+
+
+def test_company_aliases_drop_legal_suffixes():
+    assert company_aliases('Apple Inc.') == 'Apple'
+    assert company_aliases('Foo Holdings, Inc.') == 'Foo'
+    assert company_aliases(None) == ''
+
+
+def test_sentiment_counts_whole_lexicon_words():
+    scores = sentiment_scores(pd.Series(['Apple beats estimates', 'Shares plunge on probe',
+                                         'Profit rises despite lawsuit', 'Beaten down stock']))
+    assert scores.tolist() == pytest.approx([0.5, -2 / 3, 1 / 4, 0.0])
+
+
+def test_mentions_and_recency_outrank_generic_news():
+    ranked = rank_news([
+        item('Markets drift ahead of Fed', hours_old=1),
+        item('Apple unveils new iPhone', hours_old=1),
+        item('AAPL options volume climbs', hours_old=200),
+    ], 'AAPL', 'Apple Inc', now=NOW)
+    assert [r['title'] for r in ranked] == ['Apple unveils new iPhone', 'AAPL options volume climbs',
+                                            'Markets drift ahead of Fed']
+    assert ranked[0]['relevance'] > ranked[1]['relevance'] > ranked[2]['relevance']
+
+
+def test_tickers_match_case_sensitively():
+    ranked = rank_news([item('Stocks move on jobs data'), item('$ON jumps after earnings')], 'ON', now=NOW)
+    assert ranked[0]['title'] == '$ON jumps after earnings'
+    assert ranked[1]['relevance'] < ranked[0]['relevance'] - 0.9
+
+
+def test_source_weight_ties_and_top():
+    # Timestamps past `now` all count as brand new, so these two tie on score
+    items = [item('Apple news', source='Benzinga'), item('Apple update', hours_old=-1),
+             item('Apple report', hours_old=-2)]
+    ranked = rank_news(items, 'AAPL', 'Apple', now=NOW, top=2)
+    assert [r['title'] for r in ranked] == ['Apple report', 'Apple update']
+    assert ranked[0]['relevance'] == ranked[1]['relevance']
+    assert rank_news(items, 'AAPL', 'Apple', now=NOW)[-1]['source'] == 'Benzinga'
+    assert 'relevance' not in items[0]
+
+
+def test_rank_news_handles_empty_and_missing_fields():
+    assert rank_news([], 'AAPL') == []
+    ranked = rank_news([{'title': None}], 'AAPL', now=NOW)
+    assert ranked[0]['sentiment'] == 0.0
@@ -0,0 +1,64 @@
+import pytest
+
+import rate_limit
+import stock_script_generator
+from prefetch import PrefetchScheduler
+from rate_limit import RateLimiter
+from stock_script_generator import StockScriptGenerator
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return []
+
+
+@pytest.fixture
+def shared_limiter(monkeypatch):
+    limiter = RateLimiter(6, burst=100)
+    monkeypatch.setattr(rate_limit, 'finnhub_limiter', limiter)
+    return limiter
+
+
+def test_news_refresh_is_charged_per_upstream_call(temp_db, shared_limiter, monkeypatch):
+    calls = []
+    monkeypatch.setattr(stock_script_generator.requests, 'get',
+                        lambda url, **kwargs: calls.append(kwargs['params']) or FakeResponse())
+    generator = StockScriptGenerator(llm_provider=object())
+    scheduler = PrefetchScheduler(generator, ['AAPL'], news_days=365)
+    scheduler.limiter = RateLimiter(6, burst=100)
+
+    with rate_limit.charge_to(scheduler.limiter):
+        scheduler.refresh('news', 'AAPL')
+
+    # A year of news is fetched in 30-day chunks, each one a Finnhub call
+    assert len(calls) == 13
+    assert scheduler.limiter.tokens == pytest.approx(100 - 13, abs=0.5)
+    assert shared_limiter.tokens == pytest.approx(100 - 13, abs=0.5)
+
+
+def test_quote_and_profile_use_the_shared_limiter(shared_limiter, monkeypatch):
+    generator = StockScriptGenerator(llm_provider=object())
+    monkeypatch.setattr(generator.finnhub_client, 'quote', lambda symbol: {'c': 1.0})
+    monkeypatch.setattr(generator.finnhub_client, 'company_profile2', lambda symbol: {'name': 'Apple'})
+    generator.get_quote('AAPL')
+    generator.get_company_profile('AAPL')
+    # Cached reads cost nothing
+    generator.get_quote('AAPL')
+    generator.get_company_profile('AAPL')
+    assert shared_limiter.tokens == pytest.approx(98, abs=0.5)
+
+
+def test_failed_profile_refresh_keeps_the_cached_profile(shared_limiter, monkeypatch):
+    generator = StockScriptGenerator(llm_provider=object())
+    monkeypatch.setattr(generator.finnhub_client, 'company_profile2', lambda symbol: {'name': 'Apple'})
+    generator.get_company_profile('AAPL')
+
+    def rate_limited(symbol):
+        raise RuntimeError('429 Too Many Requests')
+    monkeypatch.setattr(generator.finnhub_client, 'company_profile2', rate_limited)
+    with pytest.raises(RuntimeError):
+        generator.get_company_profile('AAPL', refresh=True)
+    assert generator.get_company_profile('AAPL') == {'name': 'Apple'}
@@ -0,0 +1,72 @@
+import re
+
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+from probe import ENDPOINTS, Sample, _quota, _redact, summarize, to_prometheus
+
+SAMPLE_LINE = re.compile(r'^([a-z_]+)\{((?:[a-z_]+="(?:[^"\\]|\\.)*",?)+)\} (\S+)$')
+
+
+def test_redact_removes_keys_and_object_addresses(monkeypatch):
+    monkeypatch.setenv('FINNHUB_API_KEY', 'envsecret')
+    message = _redact("ConnectionError: HTTPSConnectionPool(host='x'): Max retries exceeded with url: "
+                      "/query?function=NEWS&apikey=AV123&limit=10 (Caused by <urllib3.Conn object at 0x7f3a2b>)")
+    assert 'AV123' not in message and 'apikey=***&limit=10' in message
+    assert '0x7f3a2b' not in message and '<urllib3.Conn object>' in message
+    assert _redact("/quote?symbol=AAPL&token=abc-123 failed") == "/quote?symbol=AAPL&token=*** failed"
+    assert _redact("401 for envsecret") == "401 for ***"
+    # Equal errors from different calls group together
+    assert _redact("Timeout at 0x1 token=a") == _redact("Timeout at 0x2 token=b")
+
+
+def test_quota_headers_are_parsed_in_any_spelling():
+    headers = CaseInsensitiveDict({'x-ratelimit-limit': '60', 'X-RateLimit-Remaining': '12',
+                                   'RateLimit-Reset': 'soon'})
+    assert _quota(headers) == {'limit': 60.0, 'remaining': 12.0}
+    assert _quota(CaseInsensitiveDict()) == {}
+
+
+def test_summarize_reports_latency_errors_and_latest_quota():
+    results = [Sample(latency=0.1 * i, status=200, quota={'limit': 60.0, 'remaining': 60.0 - i})
+               for i in range(1, 11)]
+    results += [Sample(latency=5.0, status=429, error='HTTP 429', rate_limited=True),
+                Sample(latency=9.0, error='ConnectTimeout: token=***')]
+    summary = summarize(ENDPOINTS['finnhub_quote'], results, elapsed=2.0)
+    assert summary['samples'] == 12 and summary['errors'] == 2 and summary['rate_limited'] == 1
+    assert summary['statuses'] == {'200': 10, '429': 1, 'error': 1}
+    # Failed calls don't count towards latency
+    assert summary['latency_max_ms'] == 1000.0 and summary['latency_p50_ms'] == 550.0
+    assert summary['quota'] == {'limit': 60.0, 'remaining': 50.0}
+    assert summary['throughput_per_second'] == 6.0
+
+
+def test_prometheus_output_is_well_formed():
+    good = summarize(ENDPOINTS['finnhub_quote'], [
+        Sample(latency=0.2, status=200, quota={'remaining': 10.0, 'limit': 60.0}),
+        Sample(latency=0.4, status=200, quota={'remaining': 9.0, 'limit': 60.0}),
+    ], elapsed=1.0)
+    # Every call failed: no latency quantiles or quota to report
+    down = summarize(ENDPOINTS['ollama'], [Sample(latency=1.0, error='ConnectionError')], elapsed=1.0)
+    down['endpoint'] = 'ollama "local"'
+    text = to_prometheus([good, down])
+
+    assert text.endswith('\n')
+    declared, samples = {}, []
+    for line in text.splitlines():
+        if line.startswith('# '):
+            kind, name = line.split()[1:3]
+            declared.setdefault(name, set()).add(kind)
+            continue
+        match = SAMPLE_LINE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        assert declared[name] == {'HELP', 'TYPE'}
+        samples.append((name, labels, float(value)))
+
+    assert ('provider_probe_requests_total', 'endpoint="finnhub_quote",provider="finnhub"', 2.0) in samples
+    assert ('provider_probe_errors_total', 'endpoint="ollama \\"local\\"",provider="ollama"', 1.0) in samples
+    quantiles = {labels: value for name, labels, value in samples if name == 'provider_probe_latency_seconds'}
+    assert quantiles['endpoint="finnhub_quote",provider="finnhub",quantile="0.5"'] == pytest.approx(0.3)
+    assert not any('ollama' in labels for labels in quantiles)
+    assert ('provider_probe_quota_remaining', 'endpoint="finnhub_quote",provider="finnhub"', 9.0) in samples
@@ -0,0 +1,76 @@
+import json
+import pstats
+import sys
+
+import pytest
+
+import app as app_module
+import profiling
+from stock_script_generator import GenerationResult
+
+
+@pytest.fixture
+def profiles_dir(tmp_path, monkeypatch):
+    path = tmp_path / 'profiles'
+    monkeypatch.setattr(profiling, 'PROFILES_DIR', path)
+    return path
+
+
+def busy_work(n):
+    return sum(i * i for i in range(n))
+
+
+class ProfileCheckingGenerator:
+    """Stands in for StockScriptGenerator and notes whether a profiler was active."""
+    profiler_active = None
+
+    def generate_script(self, symbol, period, sectioned=None, deadline=None):
+        ProfileCheckingGenerator.profiler_active = sys.getprofile() is not None
+        busy_work(1000)
+        return GenerationResult(symbol, period, 'Script.', 'Prompt.', '', {}, [])
+
+
+@pytest.fixture
+def client(temp_db, monkeypatch):
+    monkeypatch.setattr(app_module, 'StockScriptGenerator', ProfileCheckingGenerator)
+    return app_module.app.test_client()
+
+
+def test_profiling_off_is_a_passthrough(client, profiles_dir, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('run_profiled called without ?profile=1')
+    monkeypatch.setattr(app_module, 'run_profiled', fail)
+    response = client.post('/generate', json={'symbol': 'AAPL'})
+    assert response.status_code == 200
+    assert 'profile_id' not in response.get_json()
+    assert ProfileCheckingGenerator.profiler_active is False
+    assert not profiles_dir.exists()
+
+
+def test_profiled_generation_stores_a_loadable_profile(client, profiles_dir):
+    response = client.post('/generate?profile=1', json={'symbol': 'AAPL', 'period': '3mo'})
+    assert response.status_code == 200
+    profile_id = response.get_json()['profile_id']
+    assert ProfileCheckingGenerator.profiler_active is True
+    assert '_AAPL-3mo_' in profile_id
+
+    functions = {name for _, _, name in pstats.Stats(str(profiles_dir / f"{profile_id}.prof")).stats}
+    assert 'busy_work' in functions
+    assert 'busy_work' in (profiles_dir / f"{profile_id}.txt").read_text()
+    assert [meta['id'] for meta in client.get('/api/profiles').get_json()['profiles']] == [profile_id]
+    assert client.get(f'/api/profiles/{profile_id}').data == (profiles_dir / f"{profile_id}.prof").read_bytes()
+
+
+def test_profile_is_stored_when_the_run_fails(profiles_dir):
+    def failing():
+        busy_work(10)
+        raise ValueError('no quote')
+    with pytest.raises(ValueError):
+        profiling.run_profiled('AAPL 1mo/fail', failing)
+    [meta_path] = profiles_dir.glob('*.json')
+    meta = json.loads(meta_path.read_text())
+    assert meta['error'] == 'no quote' and meta['label'] == 'AAPL 1mo/fail'
+    # Labels are made safe for file names
+    assert '_AAPL-1mo-fail_' in meta['id']
+    assert profiling.profile_file(meta['id']) == profiles_dir / f"{meta['id']}.prof"
+    assert profiling.profile_file('../' + meta['id']) is None
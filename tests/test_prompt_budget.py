@@ -0,0 +1,62 @@
+from prompt_budget import compact_impact_and_news, estimate_tokens, select_within_budget
+
+HEADER = ['| Date | Event | Move |', '|---|---|---|']
+ROWS = [f"| 2024-01-{day:02d} | Session {day} | {move}% |"
+        for day, move in zip(range(1, 11), [0.4, -6.2, 1.1, 0.2, 3.5, -0.8, 9.1, 0.1, -2.4, 0.3])]
+NEWS = [f"- 2024-01-{day:02d}: Apple headline number {day} about supply and demand" for day in range(1, 21)]
+
+
+def cost(lines):
+    return sum(estimate_tokens(line) + 1 for line in lines)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens('') == 0 and estimate_tokens(None) == 0
+    assert estimate_tokens('Apple rose 2.5%.') == 7
+    # Long words count as several tokens
+    assert estimate_tokens('internationalization') == 4
+
+
+def test_select_keeps_the_best_ranked_lines_in_their_original_order():
+    lines = ['a b c', 'd', 'e f', 'g']
+    kept, used = select_within_budget(lines, [3, 0, 1, 2], budget=5)
+    assert kept == ['d', 'e f'] and used == 5
+    # A line too big to fit doesn't stop smaller, lower-ranked ones
+    kept, _ = select_within_budget(['d', 'a b c d', 'g'], [0, 1, 2], budget=4)
+    assert kept == ['d', 'g']
+
+
+def test_content_that_fits_is_left_alone():
+    table = '\n'.join(HEADER + ROWS) + '\n'
+    compacted, news, stats = compact_impact_and_news(table, NEWS, available_tokens=10000)
+    assert (compacted, news) == (table, NEWS)
+    assert stats == {'dropped_rows': 0, 'dropped_news': 0}
+
+
+def test_table_and_news_are_trimmed_to_the_budget():
+    budget = cost(HEADER) + cost(ROWS[:4]) + cost(NEWS[:3])
+    table, news, stats = compact_impact_and_news('\n'.join(HEADER + ROWS), NEWS, available_tokens=budget)
+    lines = table.splitlines()
+    assert lines[:2] == HEADER
+    assert cost(lines) + cost(news) <= budget
+    assert stats == {'dropped_rows': len(ROWS) - len(lines[2:]), 'dropped_news': len(NEWS) - len(news)}
+    # The biggest moves survive, in date order
+    kept_rows = lines[2:]
+    assert 0 < len(kept_rows) < len(ROWS)
+    biggest = sorted(ROWS, key=lambda row: -abs(float(row.split('|')[3].strip(' %'))))[:len(kept_rows)]
+    assert kept_rows == [row for row in ROWS if row in biggest]
+    # News is kept from the front of its priority order
+    assert news == NEWS[:len(news)] and news
+
+
+def test_rows_never_starve_the_news():
+    budget = cost(HEADER) + cost(ROWS)
+    table, news, _ = compact_impact_and_news('\n'.join(HEADER + ROWS), NEWS, available_tokens=budget)
+    # Half the budget is held for news even though the rows alone would fill it
+    assert cost(news) >= (budget - cost(HEADER)) // 2 - cost(NEWS[:1])
+    assert '9.1%' in table
+
+
+def test_no_table():
+    table, news, stats = compact_impact_and_news('', NEWS, available_tokens=cost(NEWS[:2]))
+    assert table == '' and news == NEWS[:2] and stats['dropped_news'] == len(NEWS) - 2
@@ -0,0 +1,125 @@
+import time
+
+import pytest
+
+import quote_feed
+from cache import data_cache
+from prefetch import PrefetchScheduler
+from quote_feed import QuoteFeed, apply_trade
+from ws_stand_in import TradeStandIn, wait_for
+
+BASELINE = {'c': 100.0, 'o': 99.0, 'h': 101.0, 'l': 98.0, 'pc': 95.0, 'd': 5.0, 'dp': 5.2632,
+            't': int(time.time()) - 60}
+
+
+class FakeGenerator:
+    finnhub_token = 'secret-token'
+    quote_ttl = 60
+
+    def __init__(self):
+        self.quote_calls = []
+
+    def get_quote(self, symbol, refresh=False):
+        self.quote_calls.append(symbol)
+        return dict(BASELINE)
+
+
+@pytest.fixture
+def stand_in():
+    server = TradeStandIn().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def feed(stand_in):
+    generator = FakeGenerator()
+    feed = QuoteFeed(generator, ['AAPL', 'MSFT'], url=stand_in.url, initial_backoff=0.05, max_backoff=0.2)
+    quote_feed.active_feed = feed
+    feed.start()
+    assert wait_for(lambda: feed.connected and len(feed.quotes) == 2)
+    yield feed
+    quote_feed.active_feed = None
+    feed.stop()
+    feed.join(5)
+
+
+def test_apply_trade_updates_price_range_and_change():
+    quote = apply_trade(BASELINE, 103.0, BASELINE['t'] + 1)
+    assert quote['c'] == 103.0
+    assert quote['h'] == 103.0 and quote['l'] == 98.0
+    assert quote['d'] == 8.0
+    assert quote['dp'] == pytest.approx(8.4211, abs=1e-4)
+    assert BASELINE['c'] == 100.0
+
+
+def test_apply_trade_starts_new_session_on_next_day():
+    quote = apply_trade(BASELINE, 97.0, BASELINE['t'] + 86400)
+    assert quote['pc'] == 100.0
+    assert quote['o'] == quote['h'] == quote['l'] == 97.0
+    assert quote['d'] == -3.0
+
+
+def test_seed_missing_seeds_only_unseeded_symbols():
+    generator = FakeGenerator()
+    feed = QuoteFeed(generator, ['AAPL', 'MSFT'])
+    feed.seed('AAPL', dict(BASELINE, c=111.0))
+    feed.seed_missing()
+    assert generator.quote_calls == ['MSFT']
+    assert feed.quotes['AAPL']['c'] == 111.0
+    assert feed.quotes['MSFT']['c'] == 100.0
+    feed.seed_missing()
+    assert generator.quote_calls == ['MSFT']
+
+
+def test_quotes_without_trades_go_stale_after_the_quote_ttl():
+    feed = QuoteFeed(FakeGenerator(), ['AAPL', 'HALT'], quote_ttl=0.1)
+    feed.connected = True
+    feed.seed('AAPL', dict(BASELINE))
+    feed.seed('HALT', dict(BASELINE))
+    assert feed.live_quote('HALT')['c'] == 100.0
+    time.sleep(0.15)
+    feed.apply_trades([{'s': 'AAPL', 'p': 101.0, 't': int(time.time() * 1000), 'v': 1}])
+    # The seeded quote never traded, so REST has to refresh it
+    assert feed.live_quote('HALT') is None
+    assert feed.live_quote('AAPL')['c'] == 101.0
+
+
+def test_trades_from_stand_in_reach_live_quote(feed, stand_in):
+    assert stand_in.tokens == ['secret-token']
+    assert sorted(stand_in.subscriptions) == ['AAPL', 'MSFT']
+    now_ms = int(time.time() * 1000)
+    stand_in.send_trades([
+        {'s': 'AAPL', 'p': 104.0, 't': now_ms, 'v': 10},
+        {'s': 'AAPL', 'p': 102.5, 't': now_ms + 5, 'v': 10},
+        {'s': 'TSLA', 'p': 200.0, 't': now_ms, 'v': 10},
+    ])
+    assert wait_for(lambda: feed.trades == 2)
+    quote = quote_feed.live_quote('AAPL')
+    assert quote['c'] == 102.5 and quote['h'] == 104.0
+    assert data_cache.get('quote:AAPL')['c'] == 102.5
+    # Unsubscribed symbols without a baseline are ignored
+    assert quote_feed.live_quote('TSLA') is None
+
+
+def test_feed_reconnects_and_resubscribes(feed, stand_in):
+    stand_in.drop_connections()
+    assert wait_for(lambda: feed.reconnects == 1 and feed.connected)
+    assert stand_in.connections == 2
+    assert sorted(stand_in.subscriptions) == ['AAPL', 'AAPL', 'MSFT', 'MSFT']
+    stand_in.send_trades([{'s': 'MSFT', 'p': 90.0, 't': int(time.time() * 1000), 'v': 1}])
+    assert wait_for(lambda: (quote_feed.live_quote('MSFT') or {}).get('c') == 90.0)
+
+
+def test_live_quote_is_withheld_while_disconnected(feed, stand_in):
+    stand_in.stop()
+    assert wait_for(lambda: not feed.connected)
+    assert quote_feed.live_quote('AAPL') is None
+
+
+def test_prefetch_skips_quotes_the_feed_covers(feed):
+    generator = FakeGenerator()
+    scheduler = PrefetchScheduler(generator, ['AAPL', 'NVDA'])
+    scheduler.refresh('quote', 'AAPL')
+    scheduler.refresh('quote', 'NVDA')
+    assert generator.quote_calls == ['NVDA']
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+
+import rate_limit
+from rate_limit import RateLimiter, acquire_finnhub, acquire_finnhub_async, charge_to
+
+
+def test_burst_then_refill():
+    limiter = RateLimiter(600, burst=3)
+    assert [limiter.try_acquire() for _ in range(4)] == [True, True, True, False]
+    start = time.monotonic()
+    assert limiter.acquire(timeout=1)
+    # 600/min refills one token every 0.1s
+    assert 0.05 < time.monotonic() - start < 0.5
+
+
+def test_acquire_times_out():
+    limiter = RateLimiter(1, burst=1)
+    assert limiter.acquire(timeout=0)
+    start = time.monotonic()
+    assert not limiter.acquire(timeout=0.1)
+    assert time.monotonic() - start < 0.5
+
+
+def test_acquire_async():
+    limiter = RateLimiter(600, burst=1)
+    assert limiter.try_acquire()
+    assert asyncio.run(limiter.acquire_async(timeout=1))
+    assert not asyncio.run(limiter.acquire_async(timeout=0.01))
+
+
+def test_tokens_are_shared_between_threads():
+    limiter = RateLimiter(60, burst=5)
+    granted = []
+    threads = [threading.Thread(target=lambda: granted.append(limiter.try_acquire())) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert granted.count(True) == 5
+
+
+def test_charge_to_draws_from_both_budgets(monkeypatch):
+    shared = RateLimiter(60, burst=10)
+    monkeypatch.setattr(rate_limit, 'finnhub_limiter', shared)
+    background = RateLimiter(60, burst=2)
+    with charge_to(background):
+        assert acquire_finnhub(timeout=0)
+        assert acquire_finnhub(timeout=0)
+        # The background share is spent even though the shared budget isn't
+        assert not acquire_finnhub(timeout=0)
+    assert acquire_finnhub(timeout=0)
+    assert shared.tokens < 8
+
+
+def test_charge_to_applies_to_async_calls(monkeypatch):
+    monkeypatch.setattr(rate_limit, 'finnhub_limiter', RateLimiter(60, burst=10))
+    background = RateLimiter(60, burst=1)
+
+    async def calls():
+        with charge_to(background):
+            return [await acquire_finnhub_async(timeout=0) for _ in range(2)]
+    assert asyncio.run(calls()) == [True, False]
+
+
+def test_budget_tokens_are_refunded_when_the_shared_budget_times_out(monkeypatch):
+    shared = RateLimiter(1, burst=1)
+    assert shared.try_acquire()
+    monkeypatch.setattr(rate_limit, 'finnhub_limiter', shared)
+    background = RateLimiter(1, burst=2)
+    with charge_to(background):
+        assert not acquire_finnhub(timeout=0.01)
+        assert not asyncio.run(acquire_finnhub_async(timeout=0.01))
+    # Neither failed call spent the background share
+    assert background.tokens > 1.9
+    assert [background.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+def test_refund_never_exceeds_capacity():
+    limiter = RateLimiter(60, burst=2)
+    limiter.refund()
+    assert limiter.tokens == 2
@@ -0,0 +1,61 @@
+import gzip
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import retention
+
+
+@pytest.fixture
+def history(temp_db):
+    """Four AAPL 1mo generations aged 40, 20, 10 and 1 days, plus one fresh MSFT one."""
+    ids = [temp_db.save_generation('AAPL', '1mo', 'prompt', f"script {age}") for age in (40, 20, 10, 1)]
+    ids.append(temp_db.save_generation('MSFT', '1mo', 'prompt', 'script msft'))
+    conn = sqlite3.connect(temp_db.DATABASE_PATH)
+    with conn:
+        for generation_id, age in zip(ids, (40, 20, 10, 1)):
+            timestamp = (datetime.utcnow() - timedelta(days=age)).isoformat()
+            conn.execute("UPDATE script_generations SET timestamp = ? WHERE id = ?", (timestamp, generation_id))
+    conn.close()
+    return ids
+
+
+def test_nothing_expires_without_a_policy(history, temp_db):
+    assert temp_db.expired_generation_ids() == []
+
+
+def test_keep_last_is_per_symbol_and_period(history, temp_db):
+    assert temp_db.expired_generation_ids(keep_last=2) == history[:2]
+    assert temp_db.expired_generation_ids(keep_last=1) == history[:3]
+
+
+def test_max_age_days(history, temp_db):
+    assert temp_db.expired_generation_ids(max_age_days=15) == history[:2]
+
+
+def test_either_policy_keeps_a_generation(history, temp_db):
+    # The 20-day-old one is too old but among the newest three
+    assert temp_db.expired_generation_ids(keep_last=3, max_age_days=15) == history[:1]
+    assert temp_db.expired_generation_ids(keep_last=1, max_age_days=15) == history[:2]
+
+
+def test_limit_returns_the_oldest_first(history, temp_db):
+    assert temp_db.expired_generation_ids(keep_last=1, limit=2) == history[:2]
+
+
+def test_run_retention_archives_before_deleting(history, temp_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(retention, 'ARCHIVE_DIR', tmp_path / 'archive')
+    assert retention.run_retention(keep_last=1, dry_run=True)['expired'] == 3
+    assert len(temp_db.get_generations_by_ids(history)) == 5
+
+    stats = retention.run_retention(keep_last=1, batch_size=2, pause=0)
+    assert stats['expired'] == 3
+    with gzip.open(stats['archive'], 'rt', encoding='utf-8') as f:
+        archived = [json.loads(line) for line in f]
+    assert [generation['id'] for generation in archived] == history[:3]
+    assert archived[0]['script'] == 'script 40'
+    assert [g['id'] for g in temp_db.get_generations_by_ids(history)] == history[3:]
+    # Deleted scripts leave the search index too
+    assert sorted(g['id'] for g in temp_db.search_generations('script')) == history[3:]
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+import scrapers
+from scrapers import SCRAPER_SOURCES, card_fields, parse_cards, stream_until_cards
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+PAGES = {'marketwatch': 'marketwatch_aapl.html', 'reuters': 'reuters_aapl.html'}
+PARSERS = ['html.parser'] + (['lxml'] if scrapers.FAST_PARSER else [])
+
+
+class StreamedResponse:
+    """A streamed requests response serving a saved page in fixed-size chunks."""
+
+    def __init__(self, raw, chunk_size):
+        self.raw = raw
+        self.chunk_size = chunk_size
+        self.encoding = 'utf-8'
+        self.bytes_served = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size=None):
+        for start in range(0, len(self.raw), self.chunk_size):
+            chunk = self.raw[start:start + self.chunk_size]
+            self.bytes_served += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+def fields(cards, config):
+    extracted = []
+    for card in cards:
+        title, when = card_fields(card, config)
+        extracted.append((title.get_text(strip=True) if title else None, when.get_text(strip=True) if when else None))
+    return extracted
+
+
+@pytest.mark.parametrize('source', sorted(PAGES))
+@pytest.mark.parametrize('parser', PARSERS)
+# Small chunks split card markers across chunk boundaries
+@pytest.mark.parametrize('chunk_size', [7, 1000, 4096])
+def test_streamed_strained_parse_matches_full_parse(source, parser, chunk_size, monkeypatch):
+    config = SCRAPER_SOURCES[source]
+    monkeypatch.setattr(config, 'parser', parser)
+    raw = (FIXTURES / PAGES[source]).read_bytes()
+    full = BeautifulSoup(raw.decode('utf-8'), 'html.parser').find_all(config.card_tag, attrs=config.card_attrs)
+    expected = fields(full[:config.max_cards], config)
+
+    response = StreamedResponse(raw, chunk_size)
+    cards = parse_cards(stream_until_cards(response, config), config)
+
+    assert fields(cards, config) == expected
+    assert len(expected) == config.max_cards
+    # The page holds more cards than needed, so reading stopped before its end
+    assert response.bytes_served < len(raw) and response.closed
+
+
+def test_fixtures_cover_missing_timestamps_and_extra_classes():
+    config = SCRAPER_SOURCES['marketwatch']
+    html = (FIXTURES / PAGES['marketwatch']).read_text()
+    extracted = fields(parse_cards(html, config), config)
+    assert extracted[0][0].startswith('Promoted')
+    assert (None in {when for _, when in extracted})
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from screener import ScreenerTable, _fill_missing, rank_candidates, score_table
+
+DAYS = 20
+
+
+def candles(days=DAYS, last_volume=1000.0):
+    """Calm daily bars: closes alternating 100/101, 2% ranges, flat volume."""
+    closes = np.array([100.0 if day % 2 == 0 else 101.0 for day in range(days)])
+    volumes = np.full(days, 1000.0)
+    volumes[-1] = last_volume
+    return pd.DataFrame({
+        'Open': closes, 'High': closes * 1.01, 'Low': closes * 0.99, 'Close': closes, 'Volume': volumes
+    }, index=pd.date_range('2024-01-01', periods=days))
+
+
+def quote(change_pct, price=100.0):
+    return {'c': price, 'dp': change_pct, 'h': price * 1.01, 'l': price * 0.99}
+
+
+def test_short_histories_are_right_aligned_and_nan_padded():
+    table = ScreenerTable.from_snapshots({
+        'LONG': (quote(1.0), candles(days=30)),
+        'SHORT': (quote(1.0), candles(days=3)),
+        'NONE': (None, None),
+    }, lookback_bars=DAYS)
+    assert list(table.symbols) == ['LONG', 'NONE', 'SHORT']
+    assert table.closes.shape == (3, DAYS)
+    # Only the latest lookback_bars are kept
+    np.testing.assert_array_equal(table.closes[0], candles(days=30)['Close'].to_numpy()[-DAYS:])
+    assert np.isnan(table.closes[2, :-3]).all()
+    np.testing.assert_array_equal(table.closes[2, -3:], [100.0, 101.0, 100.0])
+    assert np.isnan(table.closes[1]).all() and np.isnan(table.price[1])
+
+
+def test_missing_or_non_positive_baselines_fall_back_to_the_median():
+    filled = _fill_missing(np.array([2.0, np.nan, 4.0, 0.0, -1.0, 6.0]), universe_fallback=99.0)
+    np.testing.assert_array_equal(filled, [2.0, 4.0, 4.0, 4.0, 4.0, 6.0])
+    # With no valid baseline at all, the universe-wide value is used, and 1.0 without one
+    np.testing.assert_array_equal(_fill_missing(np.array([np.nan, 0.0]), 3.0), [3.0, 3.0])
+    np.testing.assert_array_equal(_fill_missing(np.array([np.nan]), np.nan), [1.0])
+
+
+def test_symbols_without_history_are_measured_against_the_universe():
+    table = ScreenerTable.from_snapshots({
+        'OLD': (quote(5.0), candles()),
+        'NEW': (quote(5.0), None),
+    }, lookback_bars=DAYS)
+    signals = score_table(table)
+    old, new = list(table.symbols).index('OLD'), list(table.symbols).index('NEW')
+    assert signals['move_z'][new] == pytest.approx(signals['move_z'][old])
+    assert signals['volume_ratio'][new] == 1.0 and signals['range_ratio'][new] == 1.0
+
+
+def test_candidates_are_ranked_by_how_unusual_the_day_is():
+    table = ScreenerTable.from_snapshots({
+        'CALM': (quote(0.5), candles()),
+        'FLAT': (quote(0.0), candles()),
+        'MOVER': (quote(-5.0), candles()),
+        'VOLUME': (quote(0.5), candles(last_volume=4000.0)),
+        'STALE': (None, candles()),
+    }, lookback_bars=DAYS)
+    candidates = rank_candidates(table, top=10)
+    # A symbol with nothing unusual, or no quote, is never a candidate
+    assert [c['symbol'] for c in candidates] == ['MOVER', 'VOLUME', 'CALM']
+    mover, volume, _ = candidates
+    assert mover['reasons'] == [f"down 5.0% ({mover['move_z']:.1f}σ)"]
+    assert volume['volume_ratio'] == 4.0 and 'volume 4.0x median' in volume['reasons']
+    assert volume['score'] == pytest.approx(volume['move_z'] + 1.5 * 2, abs=0.01)
+    assert [c['symbol'] for c in rank_candidates(table, top=1)] == ['MOVER']
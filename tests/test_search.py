@@ -0,0 +1,67 @@
+import pytest
+
+from database import _fts_query
+
+
+@pytest.fixture
+def scripts(temp_db):
+    return {
+        'beat': temp_db.save_generation('AAPL', '1mo', 'prompt', 'Apple beat earnings estimates on iPhone sales.'),
+        'miss': temp_db.save_generation('AAPL', '3mo', 'prompt', 'Apple missed estimates; earnings earnings earnings fell.'),
+        'msft': temp_db.save_generation('MSFT', '1mo', 'prompt', 'Microsoft earnings beat on cloud growth.'),
+        'tsla': temp_db.save_generation('TSLA', '1mo', 'prompt', 'Tesla deliveries slowed <sharply> this quarter.'),
+    }
+
+
+def test_fts_query_requires_every_word_and_phrase():
+    assert _fts_query('apple  earnings') == '"apple" "earnings"'
+    assert _fts_query('"beat earnings" cloud') == '"beat earnings" "cloud"'
+    # Quotes and FTS operators are matched literally
+    assert _fts_query('a"b OR') == '"a""b" "OR"'
+    assert _fts_query('   ') == ''
+
+
+def test_all_words_must_match(scripts, temp_db):
+    assert {g['id'] for g in temp_db.search_generations('earnings')} == {scripts['beat'], scripts['miss'], scripts['msft']}
+    assert {g['id'] for g in temp_db.search_generations('earnings cloud')} == {scripts['msft']}
+    assert temp_db.search_generations('   ') == []
+
+
+def test_phrases_match_in_order(scripts, temp_db):
+    assert [g['id'] for g in temp_db.search_generations('"beat earnings"')] == [scripts['beat']]
+    assert [g['id'] for g in temp_db.search_generations('"earnings beat"')] == [scripts['msft']]
+
+
+def test_stemmed_words_match(scripts, temp_db):
+    assert {g['id'] for g in temp_db.search_generations('beats')} == {scripts['beat'], scripts['msft']}
+    assert [g['id'] for g in temp_db.search_generations('delivery slow')] == [scripts['tsla']]
+
+
+def test_best_matches_come_first(scripts, temp_db):
+    results = temp_db.search_generations('earnings')
+    assert results[0]['id'] == scripts['miss']
+    assert [r['score'] for r in results] == sorted((r['score'] for r in results), reverse=True)
+
+
+def test_symbol_period_filters_and_paging(scripts, temp_db):
+    assert [g['id'] for g in temp_db.search_generations('earnings', symbol='AAPL', period='1mo')] == [scripts['beat']]
+    assert {g['id'] for g in temp_db.search_generations('earnings', period='1mo')} == {scripts['beat'], scripts['msft']}
+    everything = [g['id'] for g in temp_db.search_generations('earnings')]
+    assert [g['id'] for g in temp_db.search_generations('earnings', limit=2)] == everything[:2]
+    assert [g['id'] for g in temp_db.search_generations('earnings', limit=2, offset=2)] == everything[2:]
+
+
+def test_snippets_mark_matches_and_escape_html(scripts, temp_db):
+    [result] = temp_db.search_generations('deliveries')
+    assert result['snippet'] == 'Tesla <mark>deliveries</mark> slowed &lt;sharply&gt; this quarter.'
+    [result] = temp_db.search_generations('beats', symbol='AAPL')
+    assert '<mark>beat</mark>' in result['snippet']
+
+
+def test_long_scripts_are_cut_around_the_first_match(temp_db):
+    script = ' '.join(['filler'] * 100) + ' guidance raised ' + ' '.join(['tail'] * 100)
+    temp_db.save_generation('NVDA', '1y', 'prompt', script)
+    [result] = temp_db.search_generations('guidance')
+    snippet = result['snippet']
+    assert snippet.startswith('…filler') and snippet.endswith('tail…')
+    assert '<mark>guidance</mark>' in snippet and len(snippet) < 200
@@ -0,0 +1,54 @@
+import sqlite3
+
+import database
+
+TEMPLATE = "Write a script about {company} ({symbol}).\n\nImpact:\n{impact}"
+
+
+def test_generations_round_trip_from_compact_storage(temp_db):
+    params = {'company': 'Apple', 'symbol': 'AAPL', 'impact': '| 1mo | +4.2% |'}
+    prompt = TEMPLATE.format(**params)
+    generation_id = temp_db.save_generation('AAPL', '1mo', prompt, 'Apple climbed.', prompt_tokens=12,
+                                            template_name='monthly', template=TEMPLATE, prompt_params=params)
+    conn = sqlite3.connect(temp_db.DATABASE_PATH)
+    stored = conn.execute("SELECT prompt, script, prompt_data IS NOT NULL, script_data IS NOT NULL "
+                          "FROM script_generations").fetchone()
+    conn.close()
+    assert stored == ('', '', 1, 1)
+    generation = temp_db.get_latest_generation('AAPL', '1mo')
+    assert generation['id'] == generation_id
+    assert (generation['prompt'], generation['script']) == (prompt, 'Apple climbed.')
+
+
+def test_script_matches_rank_above_prompt_matches(temp_db):
+    in_prompt = temp_db.save_generation('AAPL', '1mo', 'Mention the guidance.', 'Apple beat earnings.')
+    in_script = temp_db.save_generation('MSFT', '1mo', 'Write a script.', 'Microsoft raised guidance.')
+    assert [g['id'] for g in temp_db.search_generations('guidance')] == [in_script, in_prompt]
+    # The symbol is indexed alongside the script and prompt
+    assert [g['id'] for g in temp_db.search_generations('aapl beat')] == [in_prompt]
+
+
+def test_index_without_symbols_is_rebuilt_on_start(tmp_path, monkeypatch):
+    path = str(tmp_path / 'scripts.db')
+    monkeypatch.setattr(database, 'DATABASE_PATH', path)
+    database.init_db()
+    legacy_id = database.save_generation('MSFT', '1mo', 'prompt', 'Microsoft guidance cut.')
+    conn = sqlite3.connect(path)
+    with conn:
+        # The index as it was first built, without symbols
+        conn.execute("DROP TABLE generations_fts")
+        conn.execute("CREATE VIRTUAL TABLE generations_fts "
+                     "USING fts5(script, prompt, content='', tokenize='porter unicode61')")
+    conn.close()
+
+    database.init_db()
+    conn = sqlite3.connect(path)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(generations_fts)")]
+    conn.close()
+    assert columns == database.FTS_COLUMNS
+    assert [g['id'] for g in database.search_generations('guidance')] == [legacy_id]
+
+    # Rows indexed by the rebuild can still be removed from the index
+    assert database.delete_generations([legacy_id]) == 1
+    database.save_generation('MSFT', '3mo', 'prompt', 'Microsoft raised guidance.')
+    assert [g['period'] for g in database.search_generations('guidance')] == ['3mo']
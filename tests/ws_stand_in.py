@@ -0,0 +1,98 @@
+"""
+A local stand-in for the Finnhub trade WebSocket.
+
+Runs an aiohttp server on its own event loop thread, records every client's
+token and subscriptions, and lets a test push trade messages or drop all
+connections to exercise reconnects.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from aiohttp import web
+
+
+class TradeStandIn:
+    def __init__(self):
+        self.tokens = []
+        self.subscriptions = []
+        self.connections = 0
+        self._clients = set()
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self.url = None
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.tokens.append(request.query.get('token'))
+        self.connections += 1
+        self._clients.add(ws)
+        try:
+            async for msg in ws:
+                message = json.loads(msg.data)
+                if message.get('type') == 'subscribe':
+                    self.subscriptions.append(message['symbol'])
+        finally:
+            self._clients.discard(ws)
+        return ws
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get('/', self._handle)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/"
+        self._started.set()
+        self._loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+        self._started.wait(5)
+        return self
+
+    def stop(self):
+        if not self._loop.is_running():
+            return
+        self.drop_connections()
+        self._run(self._runner.cleanup())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(5)
+
+    def send_trades(self, trades):
+        """Send one Finnhub trade message ({s, p, t, v} items) to every connected client."""
+        message = json.dumps({'type': 'trade', 'data': trades})
+
+        async def send():
+            for ws in list(self._clients):
+                await ws.send_str(message)
+        self._run(send())
+
+    def drop_connections(self):
+        async def close():
+            for ws in list(self._clients):
+                await ws.close()
+        self._run(close())
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll condition until it is truthy; return its last value."""
+    deadline = time.monotonic() + timeout
+    while True:
+        value = condition()
+        if value or time.monotonic() > deadline:
+            return value
+        time.sleep(0.02)